@@ -11,7 +11,16 @@ from Acspy.Util.BaciHelper             import addProperty
 from ACSImpl.DevIO                     import DevIO
 
 # Local Package Imports
+from AstroConfig import Config
+from AstroMetrics import Metrics
 from astrocam.api import AstrocamAPI
+from astrocam.prefetch import FramePrefetcher
+
+# Component attributes (CDB) and their values when missing
+DEFAULT_CONFIG = {
+    "imageSource": "skyview",   # one of AstrocamAPI.SOURCES
+    **Metrics.DEFAULT_CONFIG,   # metrics, metricsInterval, metricsFile
+}
 
 class AstrocamDevIO(DevIO):
     """DevIO that returns a timestamp with its data."""
@@ -39,6 +48,8 @@ class AstrocamComponent(CAMERA_MODULE__POA.Camera, CharacteristicComponent, Cont
         CharacteristicComponent.__init__(self)
         ContainerServices.__init__(self)
         self.api = None
+        self.metrics = None
+        self.prefetcher = None
         self.shtspeed_devio = None
         self.isospeed_devio = None
 
@@ -51,24 +62,42 @@ class AstrocamComponent(CAMERA_MODULE__POA.Camera, CharacteristicComponent, Cont
         self.mount = self.getComponent("TELESCOPE_CONTROL")
 
     def execute(self):
-        self.api = AstrocamAPI()
+        config = Config.componentConfig(self, DEFAULT_CONFIG)
+        self.metrics = Metrics.fromConfig(config, self.getLogger())
+        self.api = AstrocamAPI(source=config["imageSource"])
+        self.prefetcher = FramePrefetcher(self.api)
         self.shtspeed_devio.setApi(self.api)
         self.isospeed_devio.setApi(self.api)
 
     def cleanUp(self):
-        self.api = None
+        self._shutdown()
         self.releaseComponent(self.mount.name)
         self.mount = None
 
     def aboutToAbort(self):
-        self.api = None
+        self._shutdown()
         self.mount = None
 
+    def _shutdown(self):
+        """Stops the prefetching and closes the metrics."""
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+        if self.metrics is not None:
+            self.metrics.close()
+        self.prefetcher = None
+        self.metrics = None
+        self.api = None
+
     # Component Operations
+    @Metrics.componentCall("AstrocamComponent", "getFrame")
     def getFrame(self, exposureTime, iso):
         alt = self.mount.actualAltitude.get_sync()[0]
         azm = self.mount.actualAzimuth.get_sync()[0]
-        return self.api.retrieve_raw_image(alt, azm)
+        coord = self.api.altazm_to_icrs(alt, azm)
+        frame = self.prefetcher.take(alt, azm, coord)
+        if frame is None:
+            frame = self.api.raw_image(coord)
+        return frame
     
     def on(self):
         pass
@@ -76,4 +105,8 @@ class AstrocamComponent(CAMERA_MODULE__POA.Camera, CharacteristicComponent, Cont
     def off(self):
         pass
 
+    def prefetch(self, targets):
+        """Starts acquiring the sky at the targets' fixed alt/az, see FramePrefetcher."""
+        self.prefetcher.prefetch([(t.coordinates.el, t.coordinates.az, None) for t in targets])
+
     # Other methods
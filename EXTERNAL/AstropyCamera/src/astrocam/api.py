@@ -1,14 +1,17 @@
-import numpy as np
+import math
+from pathlib import Path
 
-from astroquery.simbad import Simbad
-from astroquery.skyview import SkyView
+from AstroMetrics import Metrics
+from astrocam.tilecache import TileCache
+from astrocam.norm import Normalizer, normalize
+from astrocam.transform import AltAzTransform
 
-import astropy.units as u
-from astropy.io import fits
-from astropy.time import Time
-from astropy.coordinates import SkyCoord, AltAz, EarthLocation
-from astropy.visualization import simple_norm
-import matplotlib.pyplot as plt
+# astropy, astroquery and matplotlib take seconds to import, so they are
+# imported where they are first needed rather than when the component loads.
+
+FETCH = Metrics.operation("astrocam_fetch", "Sky image fetches, tile cache included")
+TRANSFORM = Metrics.operation("astrocam_transform", "AltAz to ICRS conversions")
+NORMALIZE = Metrics.operation("astrocam_normalize", "Frame normalizations")
 
 class AstrocamAPI:
     LAT=51.2993
@@ -17,40 +20,118 @@ class AstrocamAPI:
     FOV = 0.2
     ASPECT = [1920, 1080]
     PIXELS = [1920, 1080]
-    def __init__(self, fov=FOV, aspect=ASPECT, pixels=PIXELS):
-        SkyView.TIMEOUT = 10
-        self.simbad = Simbad()
-        self.simbad.add_votable_fields("ra", "dec")
-        self.location = EarthLocation(lat=AstrocamAPI.LAT*u.deg, lon=AstrocamAPI.LON*u.deg, height=AstrocamAPI.ALT*u.m)
-        self.w_fov = fov * (aspect[0] / aspect[1]) * u.deg
-        self.h_fov = fov * u.deg
+    TILE_DIR = Path.home() / ".cache" / "astrocam" / "tiles"
+    SOURCES = ("skyview", "synthetic")
+    def __init__(self, fov=FOV, aspect=ASPECT, pixels=PIXELS, tile_dir=TILE_DIR, fetcher=None, source="skyview"):
+        self._simbad = None
+        self._location = None
+        self.transform = AltAzTransform(AstrocamAPI.LAT, AstrocamAPI.LON, AstrocamAPI.ALT)
+        # deg
+        self.w_fov = fov * (aspect[0] / aspect[1])
+        self.h_fov = fov
         self.pixels = [int(x / 5) for x in pixels]
+        if source not in AstrocamAPI.SOURCES:
+            raise ValueError(f"Unknown image source '{source}', expected one of {AstrocamAPI.SOURCES}")
+        if source != "skyview" and fetcher is not None:
+            raise ValueError(f"fetcher= only replaces SkyView, not the '{source}' image source")
+        self.source = source
+        self.fetcher = fetcher or self.skyview_fetch
+        if source == "synthetic":
+            # Rendered locally in milliseconds, nothing worth caching
+            from astrocam.synthetic import SyntheticSky
+            self.fetcher = SyntheticSky().fetch
+            tile_dir = None
+        # Cutouts are cached locally; fetcher defaults to SkyView
+        self.tiles = None
+        if tile_dir is not None:
+            self.tiles = TileCache(self.fetcher, tile_dir)
+        self.normalizer = Normalizer(stretch='linear')
+
+    @property
+    def simbad(self):
+        # Created on first use: setting it up already queries the service
+        if self._simbad is None:
+            from astroquery.simbad import Simbad
+            self._simbad = Simbad()
+            self._simbad.add_votable_fields("ra", "dec")
+        return self._simbad
+
+    @property
+    def location(self):
+        if self._location is None:
+            import astropy.units as u
+            from astropy.coordinates import EarthLocation
+            self._location = EarthLocation(lat=AstrocamAPI.LAT*u.deg, lon=AstrocamAPI.LON*u.deg, height=AstrocamAPI.ALT*u.m)
+        return self._location
 
     def resolve_object(self, name):
+        from astropy.coordinates import SkyCoord
         result = self.simbad.query_object(name)
         ra = result['ra'][0]
         dec = result['dec'][0]
         coord = SkyCoord(ra, dec, unit='deg')
         return coord
 
-    def fetch_sky_image(self, coord, survey="DSS"):
-        #images = SkyView.get_images(position=coord, survey=[survey], pixels=self.pixels, radius=self.h_fov)
-        images = SkyView.get_images(position=coord, survey=[survey], pixels=self.pixels, width=self.w_fov, height=self.h_fov)
+    @staticmethod
+    def skyview_fetch(coord, survey, width, height, pixels):
+        import astropy.units as u
+        from astroquery.skyview import SkyView
+        SkyView.TIMEOUT = 10
+        width = u.Quantity(width, u.deg)
+        height = u.Quantity(height, u.deg)
+        images = SkyView.get_images(position=coord, survey=[survey], pixels=pixels, width=width, height=height)
         return images[0]
 
-    def fetch_sky_image_altazm(self, alt, azm, survey="DSS"):
-        obstime = Time.now()
-        altazm = AltAz(alt=alt*u.deg, az=azm*u.deg, obstime=obstime, location=self.location)
-        coord = SkyCoord(altazm).transform_to('icrs')
-        return self.fetch_sky_image(coord, survey)
+    @FETCH
+    def fetch_sky_image(self, coord, survey="DSS"):
+        if self.tiles is None:
+            return self.fetcher(coord, survey, self.w_fov, self.h_fov, self.pixels)
+        return self.tiles.get(coord, survey, self.w_fov, self.h_fov, self.pixels)
+
+    @FETCH
+    def fetch_tile(self, coord, margin, survey="DSS"):
+        """
+        (data, header) of a cutout around coord at the frame's pixel scale,
+        larger than a frame by margin deg on every side, straight from the
+        fetcher. Frames near coord are cut out of it with tilecache.crop.
+        """
+        extra = [math.ceil(margin / (self.w_fov / self.pixels[0])),
+                 math.ceil(margin / (self.h_fov / self.pixels[1]))]
+        pixels = [self.pixels[0] + 2 * extra[0], self.pixels[1] + 2 * extra[1]]
+        hdu = self.fetcher(coord, survey, self.w_fov * pixels[0] / self.pixels[0],
+                           self.h_fov * pixels[1] / self.pixels[1], pixels)
+        return hdu[0].data, hdu[0].header
+
+    @TRANSFORM
+    def altazm_to_icrs(self, alt, azm, obstime=None):
+        """ICRS SkyCoord of (arrays of) alt/azm at obstime (Time, Unix seconds, None for now)."""
+        return self.transform.to_icrs(alt, azm, obstime)
+
+    def fetch_sky_image_altazm(self, alt, azm, survey="DSS", obstime=None):
+        return self.fetch_sky_image(self.altazm_to_icrs(alt, azm, obstime), survey)
+
+    def raw_image(self, coord):
+        """Frame bytes for an ICRS position."""
+        return self.frame_bytes(self.fetch_sky_image(coord)[0].data)
+
+    def frame_bytes(self, data):
+        """Frame bytes for image data."""
+        # Normalized into per-thread buffers; CORBA needs bytes anyway
+        with NORMALIZE.time():
+            return self.normalizer(data).tobytes()
+
+    def retrieve_raw_image(self, alt, azm, obstime=None):
+        return self.raw_image(self.altazm_to_icrs(alt, azm, obstime))
 
-    def retrieve_raw_image(self, alt, azm):
-        data = self.fetch_sky_image_altazm(alt, azm)[0].data
-        norm = simple_norm(data, stretch='linear')
-        ndata = norm(data)
-        return (ndata * 255).astype(np.uint8).tobytes()
+    def retrieve_frame(self, alt, azm, obstime=None, stretch='linear', percent=None):
+        """Frame as a uint8 (rows, columns) array owned by the caller."""
+        data = self.fetch_sky_image_altazm(alt, azm, obstime=obstime)[0].data
+        with NORMALIZE.time():
+            return normalize(data, stretch, percent)
 
     def plot_fits_image(self, hdu):
+        import matplotlib.pyplot as plt
+        from astropy.visualization import simple_norm
         data = hdu[0].data
         norm = simple_norm(data, 'sqrt', percent=99)
 
@@ -0,0 +1,98 @@
+"""
+uint8 quantization of survey images.
+
+Does what simple_norm(data, stretch, percent=...) followed by
+(norm(data) * 255).astype(np.uint8) does, but in float32 and in place: the
+only full-frame buffers are one float32 work array and the uint8 output,
+and both can be passed in (Normalizer keeps them per thread), so steady
+state acquisition allocates nothing frame sized except the final bytes.
+"""
+import threading
+
+import numpy as np
+
+STRETCHES = ("linear", "sqrt")
+# Elements compared at a time when counting, to keep the masks small
+CHUNK = 65536
+
+def _count(flat, value):
+    return sum(np.count_nonzero(flat[i:i + CHUNK] == value)
+               for i in range(0, flat.size, CHUNK))
+
+def limits(data, percent=None, scratch=None):
+    """
+    (vmin, vmax) of the finite values, or of the central percent of them.
+    Percentiles are found by partitioning a float32 copy of data in
+    scratch (allocated if not given), which is left scrambled.
+    """
+    if percent is None:
+        return float(np.nanmin(data)), float(np.nanmax(data))
+    if scratch is None:
+        scratch = np.empty(data.shape, dtype=np.float32)
+    np.copyto(scratch, data, casting="unsafe")
+    flat = scratch.reshape(-1)
+    # Non-finite values are left out: NaNs become inf (fmin works in place,
+    # unlike nan_to_num) and the infinities at either end are skipped
+    np.fmin(flat, np.inf, out=flat)
+    skip = _count(flat, -np.inf)
+    count = flat.size - skip - _count(flat, np.inf)
+    if count == 0:
+        return 0.0, 0.0
+    lower = skip + (100.0 - percent) / 200.0 * (count - 1)
+    upper = skip + (100.0 + percent) / 200.0 * (count - 1)
+    kth = sorted({int(np.floor(lower)), int(np.ceil(lower)),
+                  int(np.floor(upper)), int(np.ceil(upper))})
+    flat.partition(kth)
+
+    def at(position):
+        below = int(np.floor(position))
+        frac = position - below
+        return float(flat[below]) * (1.0 - frac) + float(flat[int(np.ceil(position))]) * frac
+    return at(lower), at(upper)
+
+def normalize(data, stretch="linear", percent=None, out=None, work=None):
+    """
+    Stretches data to 0..255 and returns it as uint8, in out if given.
+    work is an optional float32 scratch array of the same shape.
+    """
+    if stretch not in STRETCHES:
+        raise ValueError(f"Unknown stretch '{stretch}', expected one of {STRETCHES}")
+    if work is None:
+        work = np.empty(data.shape, dtype=np.float32)
+    if out is None:
+        out = np.empty(data.shape, dtype=np.uint8)
+
+    # work doubles as the scratch space for the percentiles
+    vmin, vmax = limits(data, percent, work)
+    scale = 1.0 / (vmax - vmin) if vmax > vmin else 0.0
+    np.subtract(data, vmin, out=work, casting="unsafe")
+    np.multiply(work, scale, out=work)
+    # Clip to 0..1; fmax also turns NaNs (blank survey pixels) into black
+    np.fmax(work, 0.0, out=work)
+    np.fmin(work, 1.0, out=work)
+    if stretch == "sqrt":
+        np.sqrt(work, out=work)
+    np.multiply(work, 255.0, out=work)
+    np.copyto(out, work, casting="unsafe")
+    return out
+
+class Normalizer:
+    """
+    normalize() with buffers reused across calls, one set per thread.
+    The returned array is overwritten by the next call on the same thread.
+    """
+    def __init__(self, stretch="linear", percent=None):
+        if stretch not in STRETCHES:
+            raise ValueError(f"Unknown stretch '{stretch}', expected one of {STRETCHES}")
+        self.stretch = stretch
+        self.percent = percent
+        self._local = threading.local()
+
+    def __call__(self, data):
+        buffers = getattr(self._local, "buffers", None)
+        if buffers is None or buffers[0].shape != data.shape:
+            buffers = (np.empty(data.shape, dtype=np.float32),
+                       np.empty(data.shape, dtype=np.uint8))
+            self._local.buffers = buffers
+        work, out = buffers
+        return normalize(data, self.stretch, self.percent, out=out, work=work)
@@ -0,0 +1,126 @@
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from astrocam.tilecache import crop
+from astrocam.transform import AltAzTransform
+
+# deg/s, how fast the sky moves past a fixed alt/az pointing at most
+SIDEREAL_RATE = 360.0 / 86164.0905
+
+class FramePrefetcher:
+    """
+    Acquires the sky around upcoming pointings in the background.
+
+    The telescope points at fixed (alt, az) positions and the sky keeps
+    moving under them, up to 15"/s, so a frame is only right for the time
+    it is taken. prefetch() takes the (alt, az, time) positions a proposal
+    will visit and starts fetching, on a small thread pool, a tile around
+    the sky at each of them, larger than a frame by the drift over window
+    seconds plus tolerance. take() is given the pointing being observed and
+    its ICRS position now; it looks for a tile announced for the same
+    alt/az (within tolerance deg) at most window seconds from now, waits
+    for it if it is still in flight, and cuts the frame out of it. time
+    None means the moment of the prefetch() call, so the fetch for target
+    N+1 overlaps with the slew to and exposure of target N. At most
+    capacity tiles are kept; the oldest are dropped (and cancelled if not
+    started) first, as are tiles whose window has passed.
+    """
+    MAX_WORKERS = 2
+    CAPACITY = 16
+    WINDOW = 30.0         # s
+    TOLERANCE = 0.03      # deg, more than the mount's slew tolerance
+
+    def __init__(self, api, max_workers=MAX_WORKERS, capacity=CAPACITY,
+                 window=WINDOW, tolerance=TOLERANCE, clock=time.time):
+        self.api = api
+        self.window = window
+        self.tolerance = tolerance
+        self.margin = SIDEREAL_RATE * window + 2 * tolerance   # deg
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = deque()        # (alt, az, unix time, future)
+        self._capacity = capacity
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="astrocam-prefetch")
+
+    @staticmethod
+    def separation(alt1, az1, alt2, az2):
+        """Angle between two nearby alt/az positions, deg."""
+        daz = (az1 - az2 + 180.0) % 360.0 - 180.0
+        return math.hypot(alt1 - alt2, daz * math.cos(math.radians((alt1 + alt2) / 2)))
+
+    def _find(self, alt, az, t):
+        for entry in self._entries:
+            if (abs(entry[2] - t) <= self.window and
+                    self.separation(alt, az, entry[0], entry[1]) <= self.tolerance):
+                return entry
+        return None
+
+    def _prune(self, now):
+        expired = [e for e in self._entries if now - e[2] > self.window]
+        for entry in expired:
+            entry[3].cancel()
+        if expired:
+            self._entries = deque(e for e in self._entries if now - e[2] <= self.window)
+
+    def _drop(self, entry):
+        with self._lock:
+            self._entries = deque(e for e in self._entries if e is not entry)
+
+    def prefetch(self, positions):
+        """Starts acquiring the sky at (alt, az, time) positions; time None means now."""
+        if not positions:
+            return
+        now = self.clock()
+        alts, azms, times = zip(*positions)
+        times = [now if t is None else float(AltAzTransform.unix_time(t)) for t in times]
+        # One vectorized conversion for the whole list
+        coords = self.api.altazm_to_icrs(alts, azms, times)
+        with self._lock:
+            self._prune(now)
+            for alt, az, t, coord in zip(alts, azms, times, coords):
+                if self._find(alt, az, t) is not None:
+                    continue
+                future = self._executor.submit(self.api.fetch_tile, coord, self.margin)
+                self._entries.append((alt, az, t, future))
+                while len(self._entries) > self._capacity:
+                    self._entries.popleft()[3].cancel()
+
+    def take(self, alt, az, coord):
+        """
+        Frame for the pointing (alt, az), whose ICRS position is coord now,
+        cut out of a prefetched tile; None if there is none (or it failed).
+        """
+        now = self.clock()
+        with self._lock:
+            self._prune(now)
+            entry = self._find(alt, az, now)
+        hdu = None
+        if entry is not None:
+            try:
+                hdu = crop(entry[3].result(), coord, self.api.pixels, clamp=False)
+            except Exception:
+                self._drop(entry)
+        with self._lock:
+            if hdu is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if hdu is None:
+            return None
+        return self.api.frame_bytes(hdu[0].data)
+
+    def clear(self):
+        with self._lock:
+            for entry in self._entries:
+                entry[3].cancel()
+            self._entries.clear()
+
+    def close(self):
+        self.clear()
+        self._executor.shutdown(wait=True, cancel_futures=True)
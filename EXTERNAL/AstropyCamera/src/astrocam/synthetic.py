@@ -0,0 +1,176 @@
+import math
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+import astropy.units as u
+from astropy.io import fits
+from astropy.wcs import WCS
+
+class SyntheticSky:
+    """
+    Offline star field renderer, a drop-in for SkyView as image source.
+
+    The catalog is procedural: the sky is split into dec bands of cell
+    degrees, each band into RA cells of about the same area, and the stars
+    of a cell (uniform positions, magnitudes following the usual
+    log N ~ 0.35 m counts) come from a generator seeded with the cell index,
+    so it costs no storage and is identical on every run and machine. The
+    CELLS most recently used cells are kept, least recently used first out. A
+    real catalog can be added with catalog= (a .npz with ra, dec [deg] and
+    mag arrays). Stars are projected gnomonically onto the pixel grid and
+    splatted as Gaussian PSFs with np.add.at; background noise is seeded
+    from the pointing, so a given pointing always renders the same frame.
+
+    fetch() has the fetcher signature used by AstrocamAPI/TileCache and
+    returns an HDUList with a TAN WCS header, like SkyView.
+    """
+    CELL = 0.5            # deg
+    DENSITY = 5000.0      # stars per square degree down to MAG_LIMIT
+    MAG_BRIGHT = 6.0
+    MAG_LIMIT = 18.0
+    SIGMA = 1.2           # px, PSF
+    SKY = 200.0           # background counts
+    NOISE = 5.0
+    ZERO_POINT = 20.0     # magnitude giving a total flux of 1 count
+    CELLS = 4096          # cells kept in memory
+
+    def __init__(self, seed=0, catalog=None, density=DENSITY, sigma=SIGMA):
+        self.seed = seed
+        self.density = density
+        self.sigma = sigma
+        self.radius = int(math.ceil(3 * sigma))
+        self._cells = OrderedDict()
+        self._cells_lock = threading.Lock()
+        self.catalog = None
+        if catalog is not None:
+            with np.load(catalog) as npz:
+                self.catalog = (np.asarray(npz["ra"], dtype=float),
+                                np.asarray(npz["dec"], dtype=float),
+                                np.asarray(npz["mag"], dtype=float))
+
+    # Catalog
+    def _band(self, dec):
+        return int(math.floor((dec + 90.0) / self.CELL))
+
+    def _ra_cells(self, band):
+        dec_mid = -90.0 + (band + 0.5) * self.CELL
+        return max(1, int(360.0 * math.cos(math.radians(dec_mid)) / self.CELL))
+
+    def _cell(self, band, index):
+        """(ra, dec, mag) of the stars in one cell, generated once."""
+        key = (band, index)
+        with self._cells_lock:
+            stars = self._cells.get(key)
+            if stars is not None:
+                self._cells.move_to_end(key)
+                return stars
+        n_ra = self._ra_cells(band)
+        dec0 = -90.0 + band * self.CELL
+        dec1 = min(dec0 + self.CELL, 90.0)
+        ra0 = index * 360.0 / n_ra
+        z0, z1 = math.sin(math.radians(dec0)), math.sin(math.radians(dec1))
+        area = math.degrees(1.0) ** 2 * math.radians(360.0 / n_ra) * (z1 - z0)
+
+        rng = np.random.default_rng([self.seed, band, index])
+        n = rng.poisson(self.density * area)
+        ra = ra0 + rng.random(n) * 360.0 / n_ra
+        dec = np.degrees(np.arcsin(z0 + rng.random(n) * (z1 - z0)))
+        # Inverse CDF of N(<m) ~ 10**(0.35 m) between MAG_BRIGHT and MAG_LIMIT
+        lo, hi = 10 ** (0.35 * self.MAG_BRIGHT), 10 ** (0.35 * self.MAG_LIMIT)
+        mag = np.log10(lo + rng.random(n) * (hi - lo)) / 0.35
+        stars = (ra, dec, mag)
+        with self._cells_lock:
+            self._cells[key] = stars
+            while len(self._cells) > self.CELLS:
+                self._cells.popitem(last=False)
+        return stars
+
+    def stars(self, ra, dec, radius):
+        """Catalog stars within about radius deg of (ra, dec)."""
+        parts = []
+        for band in range(self._band(dec - radius), self._band(dec + radius) + 1):
+            if band < 0 or band * self.CELL >= 180.0:
+                continue
+            n_ra = self._ra_cells(band)
+            edge = max(abs(-90.0 + band * self.CELL), abs(-90.0 + (band + 1) * self.CELL))
+            cos_edge = math.cos(math.radians(min(edge, 90.0)))
+            if cos_edge * 180.0 <= radius:
+                indices = range(n_ra)
+            else:
+                half = radius / cos_edge
+                width = 360.0 / n_ra
+                first = int(math.floor((ra - half) / width))
+                last = int(math.floor((ra + half) / width))
+                indices = sorted({i % n_ra for i in range(first, last + 1)})
+            parts.extend(self._cell(band, i) for i in indices)
+        if self.catalog is not None:
+            parts.append(self.catalog)
+        if not parts:
+            return np.empty(0), np.empty(0), np.empty(0)
+        return tuple(np.concatenate(column) for column in zip(*parts))
+
+    # Rendering
+    def wcs(self, ra, dec, width, height, pixels):
+        wcs = WCS(naxis=2)
+        wcs.wcs.ctype = ["RA---TAN", "DEC--TAN"]
+        wcs.wcs.crval = [ra, dec]
+        wcs.wcs.cdelt = [-width / pixels[0], height / pixels[1]]
+        wcs.wcs.crpix = [pixels[0] / 2 + 0.5, pixels[1] / 2 + 0.5]
+        return wcs
+
+    def render(self, ra, dec, width, height, pixels):
+        """Returns (image, wcs) of pixels[1] x pixels[0] float32 centred on (ra, dec)."""
+        nx, ny = int(pixels[0]), int(pixels[1])
+        wcs = self.wcs(ra, dec, width, height, pixels)
+        radius = 0.5 * math.hypot(width, height) + self.radius * max(width / nx, height / ny)
+        s_ra, s_dec, s_mag = self.stars(ra, dec, radius)
+
+        # Gnomonic projection about the centre
+        ra0, dec0 = math.radians(ra), math.radians(dec)
+        d_ra = np.radians(s_ra) - ra0
+        s_dec = np.radians(s_dec)
+        cos_c = (math.sin(dec0) * np.sin(s_dec) +
+                 math.cos(dec0) * np.cos(s_dec) * np.cos(d_ra))
+        front = cos_c > 0
+        cos_c = np.where(front, cos_c, 1.0)
+        xi = np.degrees(np.cos(s_dec) * np.sin(d_ra) / cos_c)
+        eta = np.degrees((math.cos(dec0) * np.sin(s_dec) -
+                          math.sin(dec0) * np.cos(s_dec) * np.cos(d_ra)) / cos_c)
+        # 0-based pixel coordinates; RA grows to the left
+        x = (wcs.wcs.crpix[0] - 1) + xi / wcs.wcs.cdelt[0]
+        y = (wcs.wcs.crpix[1] - 1) + eta / wcs.wcs.cdelt[1]
+        r = self.radius
+        keep = front & (x > -r - 1) & (x < nx + r) & (y > -r - 1) & (y < ny + r)
+        x, y = x[keep], y[keep]
+        flux = 10 ** (-0.4 * (s_mag[keep] - self.ZERO_POINT))
+
+        # Per-star (2r+1)^2 stamps of a normalized Gaussian
+        offsets = np.arange(-r, r + 1)
+        ix = np.rint(x).astype(np.intp)[:, None, None] + offsets[None, None, :]
+        iy = np.rint(y).astype(np.intp)[:, None, None] + offsets[None, :, None]
+        dx = ix - x[:, None, None]
+        dy = iy - y[:, None, None]
+        weights = np.exp(-(dx * dx + dy * dy) / (2 * self.sigma ** 2))
+        weights *= (flux / (2 * math.pi * self.sigma ** 2))[:, None, None]
+        ix, iy = np.broadcast_arrays(ix, iy)
+        inside = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny)
+
+        image = np.zeros((ny, nx), dtype=np.float64)
+        np.add.at(image, (iy[inside], ix[inside]), weights[inside])
+
+        seed = zlib.crc32(np.array([ra, dec, width, height, nx, ny, self.seed]).tobytes())
+        rng = np.random.default_rng(seed)
+        image += self.SKY + rng.normal(0.0, self.NOISE, image.shape)
+        return image.astype(np.float32), wcs
+
+    def fetch(self, coord, survey, width, height, pixels):
+        coord = coord.icrs
+        width = u.Quantity(width, u.deg).value
+        height = u.Quantity(height, u.deg).value
+        image, wcs = self.render(coord.ra.deg, coord.dec.deg, width, height, pixels)
+        header = wcs.to_header()
+        header["SURVEY"] = f"synthetic ({survey})"
+        return fits.HDUList([fits.PrimaryHDU(image, header)])
@@ -0,0 +1,184 @@
+import hashlib
+import math
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from AstroMetrics import Metrics
+
+HITS = Metrics.counter("astrocam_tile_hits_total", "Tile cache hits")
+MISSES = Metrics.counter("astrocam_tile_misses_total", "Tile cache misses")
+
+def crop(tile, coord, pixels, clamp=True):
+    """
+    HDUList of pixels cut out of tile (data, header) around coord, via the
+    tile's WCS. A window reaching past the tile is moved inside it, or with
+    clamp False makes crop return None.
+    """
+    from astropy.io import fits
+    from astropy.wcs import WCS
+    data, header = tile
+    x, y = WCS(header).world_to_pixel(coord)
+    x0 = int(round(float(x))) - pixels[0] // 2
+    y0 = int(round(float(y))) - pixels[1] // 2
+    x1 = min(max(x0, 0), data.shape[1] - pixels[0])
+    y1 = min(max(y0, 0), data.shape[0] - pixels[1])
+    if not clamp and (x1, y1) != (x0, y0):
+        return None
+    x0, y0 = x1, y1
+    cut = data[y0:y0 + pixels[1], x0:x0 + pixels[0]].copy()
+
+    header = header.copy()
+    header["NAXIS1"] = pixels[0]
+    header["NAXIS2"] = pixels[1]
+    if "CRPIX1" in header:
+        header["CRPIX1"] -= x0
+        header["CRPIX2"] -= y0
+    return fits.HDUList([fits.PrimaryHDU(cut, header)])
+
+class TileCache:
+    """
+    Memory + disk LRU cache of survey cutouts.
+
+    Requests are snapped to a grid of quantum degrees in ICRS. On a miss the
+    fetcher is asked for a tile centred on the grid point and larger than
+    the request by one quantum on every side, at the same pixel scale; every
+    request falling into that grid cell is then served by cropping the tile
+    around the requested position (via the tile's WCS), without touching
+    the network. Tiles are kept in memory up to memory_bytes and as FITS
+    files in directory up to disk_bytes, least recently used first out.
+
+    fetcher(coord, survey, width, height, pixels) must return an HDUList
+    like SkyView.get_images(...)[0]. astropy is imported on first use.
+    """
+    QUANTUM = 0.05                    # deg
+    MEMORY_BYTES = 256 * 1024**2
+    DISK_BYTES = 2 * 1024**3
+
+    def __init__(self, fetcher, directory, quantum=QUANTUM,
+                 memory_bytes=MEMORY_BYTES, disk_bytes=DISK_BYTES):
+        self.fetcher = fetcher
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.quantum = quantum
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()      # key -> (data, header)
+        self._memory_used = 0
+        self._lock = threading.Lock()
+
+    def grid_center(self, coord):
+        """ICRS grid point of the cell coord falls into."""
+        q = self.quantum
+        dec = min(max(round(coord.dec.deg / q) * q, -90.0), 90.0)
+        ra_step = q / max(math.cos(math.radians(dec)), q)
+        ra = (round(coord.ra.deg / ra_step) * ra_step) % 360.0
+        return ra, dec
+
+    def key(self, center, survey, width, height, pixels):
+        return (round(center[0], 6), round(center[1], 6), survey,
+                round(width, 6), round(height, 6), int(pixels[0]), int(pixels[1]))
+
+    def get(self, coord, survey, width, height, pixels):
+        """Returns the cutout of width x height deg and pixels around coord."""
+        import astropy.units as u
+        coord = coord.icrs
+        width = u.Quantity(width, u.deg).value
+        height = u.Quantity(height, u.deg).value
+        center = self.grid_center(coord)
+        key = self.key(center, survey, width, height, pixels)
+
+        tile = self._load(key)
+        if tile is None:
+            self.misses += 1
+            MISSES.inc()
+            tile = self._fetch(center, survey, width, height, pixels)
+            self._store(key, tile)
+        else:
+            self.hits += 1
+            HITS.inc()
+        return crop(tile, coord, pixels)
+
+    # Fetching
+    def _fetch(self, center, survey, width, height, pixels):
+        import astropy.units as u
+        from astropy.coordinates import SkyCoord
+        # Same pixel scale as the request, one quantum more on every side
+        margin = [math.ceil(self.quantum / (width / pixels[0])),
+                  math.ceil(self.quantum / (height / pixels[1]))]
+        tile_pixels = [pixels[0] + 2 * margin[0], pixels[1] + 2 * margin[1]]
+        tile_width = width * tile_pixels[0] / pixels[0]
+        tile_height = height * tile_pixels[1] / pixels[1]
+        coord = SkyCoord(center[0], center[1], unit="deg", frame="icrs")
+        hdu = self.fetcher(coord, survey, tile_width * u.deg, tile_height * u.deg, tile_pixels)
+        return np.asarray(hdu[0].data), hdu[0].header
+
+    # Storage
+    def _path(self, key):
+        name = hashlib.sha1(repr(key).encode()).hexdigest()
+        return self.directory / f"{name}.fits"
+
+    def _load(self, key):
+        from astropy.io import fits
+        with self._lock:
+            tile = self._memory.get(key)
+            if tile is not None:
+                self._memory.move_to_end(key)
+                return tile
+
+        path = self._path(key)
+        try:
+            with fits.open(path, memmap=False) as hdul:
+                tile = (np.asarray(hdul[0].data), hdul[0].header.copy())
+            os.utime(path)
+        except (OSError, IndexError):
+            return None
+        self._remember(key, tile)
+        return tile
+
+    def _store(self, key, tile):
+        from astropy.io import fits
+        data, header = tile
+        path = self._path(key)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        fits.PrimaryHDU(data, header).writeto(tmp, overwrite=True)
+        os.replace(tmp, path)
+        self._remember(key, tile)
+        self._evict_disk()
+
+    def _remember(self, key, tile):
+        with self._lock:
+            if key in self._memory:
+                return
+            self._memory[key] = tile
+            self._memory_used += tile[0].nbytes
+            while self._memory_used > self.memory_bytes and len(self._memory) > 1:
+                _, (data, _) = self._memory.popitem(last=False)
+                self._memory_used -= data.nbytes
+
+    def _evict_disk(self):
+        files = []
+        for path in self.directory.glob("*.fits"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+        used = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if used <= self.disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            used -= size
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_used = 0
+        for path in self.directory.glob("*.fits"):
+            path.unlink(missing_ok=True)
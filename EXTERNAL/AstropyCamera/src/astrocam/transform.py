@@ -0,0 +1,104 @@
+import math
+import threading
+import time
+
+import numpy as np
+
+class AltAzTransform:
+    """
+    Fast observed (alt, az) -> ICRS conversion for a fixed site.
+
+    astropy's AltAz -> ICRS transform prepares the star-independent
+    astrometry context (Earth position and velocity, precession-nutation,
+    polar motion, site) on every call, which is most of its cost. Here
+    that context (ERFA apco13) is computed once per bucket of time and
+    only the Earth rotation angle is brought up to date for each
+    requested time (aper13), before the vectorized atoiq/aticq do the
+    actual conversion. The terms kept frozen over a bucket (aberration,
+    nutation, precession, polar motion, UT1-UTC) move by well under
+    0.01 arcsec in BUCKET seconds, so results agree with astropy to within
+    ACCURACY arcsec. Like AltAz without pressure, no refraction is applied.
+
+    Times are astropy Times, Unix seconds (UTC) or None for now; alt/az
+    and times may be arrays and broadcast against each other.
+    """
+    BUCKET = 600.0        # s
+    ACCURACY = 0.05       # arcsec, bound on the difference with astropy
+
+    def __init__(self, lat, lon, height=0.0, bucket=BUCKET):
+        # deg, deg, m
+        self.lat = lat
+        self.lon = lon
+        self.height = height
+        self.bucket = bucket
+        self._contexts = {}           # bucket index -> (astrom, dut1)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def unix_time(obstime):
+        """obstime (Time, Unix seconds or None) as Unix seconds."""
+        if obstime is None:
+            return np.asarray(time.time())
+        if hasattr(obstime, "utc"):
+            return np.asarray(obstime.utc.unix, dtype=float)
+        return np.asarray(obstime, dtype=float)
+
+    @staticmethod
+    def _jd(unix):
+        # UTC as a quasi Julian Date, split in two parts
+        days = unix / 86400.0
+        whole = np.floor(days)
+        return 2440587.5 + whole, days - whole
+
+    def _context(self, index):
+        """astrom for the start of bucket index, with its UT1-UTC."""
+        with self._lock:
+            context = self._contexts.get(index)
+        if context is not None:
+            return context
+
+        import erfa
+        from astropy.utils import iers
+        jd1, jd2 = self._jd(np.asarray(index * self.bucket))
+        table = iers.earth_orientation_table.get()
+        dut1 = float(table.ut1_utc(jd1, jd2).to_value("s"))
+        xp, yp = (float(v.to_value("rad")) for v in table.pm_xy(jd1, jd2))
+        astrom, _ = erfa.apco13(jd1, jd2, dut1, math.radians(self.lon),
+                                math.radians(self.lat), self.height,
+                                xp, yp, 0.0, 0.0, 0.0, 1.0)
+        context = (astrom, dut1)
+        with self._lock:
+            if len(self._contexts) > 16:
+                self._contexts.clear()
+            self._contexts[index] = context
+        return context
+
+    def to_icrs_deg(self, alt, az, obstime=None):
+        """(ra, dec) in degrees of the given observed positions."""
+        import erfa
+        alt, az, unix = np.broadcast_arrays(np.asarray(alt, dtype=float),
+                                            np.asarray(az, dtype=float),
+                                            self.unix_time(obstime))
+        ra = np.empty(alt.shape)
+        dec = np.empty(alt.shape)
+        index = np.floor(unix / self.bucket).astype(np.int64)
+        for bucket in np.unique(index):
+            sel = index == bucket
+            astrom, dut1 = self._context(int(bucket))
+            # Earth rotation angle at each time (UT1)
+            ut11, ut12 = self._jd(unix[sel] + dut1)
+            astrom = erfa.aper13(ut11, ut12, astrom)
+            ri, di = erfa.atoiq("A", np.radians(az[sel]),
+                                np.radians(90.0 - alt[sel]), astrom)
+            rc, dc = erfa.aticq(ri, di, astrom)
+            ra[sel] = np.degrees(rc) % 360.0
+            dec[sel] = np.degrees(dc)
+        return ra, dec
+
+    def to_icrs(self, alt, az, obstime=None):
+        """SkyCoord (ICRS) of the given observed positions."""
+        from astropy.coordinates import SkyCoord
+        ra, dec = self.to_icrs_deg(alt, az, obstime)
+        if ra.ndim == 0:
+            ra, dec = float(ra), float(dec)
+        return SkyCoord(ra, dec, unit="deg", frame="icrs")
@@ -0,0 +1,80 @@
+"""
+Time and memory per frame of the frame normalization at full PIXELS
+resolution: astropy simple_norm followed by *255, astype(uint8) and
+tobytes (the old raw_image), against astrocam.norm.Normalizer with its
+per-thread buffers, with and without the final tobytes.
+
+The image is a synthetic sky frame (float64, like the survey FITS data).
+Printed per stretch: ms per frame (fastest of --repeat), the peak of
+memory allocated during one frame (tracemalloc, after a warm-up call)
+and the largest difference in uint8 steps to the simple_norm output
+clipped to 0..1 (unclipped, values above the upper percentile wrap
+around in astype(uint8)).
+
+    PYTHONPATH=../src:../../../pyMetrics/src python norm_benchmark.py
+    PYTHONPATH=../src:../../../pyMetrics/src python norm_benchmark.py --repeat 20
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+from astropy.coordinates import SkyCoord
+from astropy.visualization import simple_norm
+
+from astrocam.api import AstrocamAPI
+from astrocam.norm import Normalizer
+from astrocam.synthetic import SyntheticSky
+
+CASES = (("linear", None), ("sqrt", None), ("sqrt", 99.0))
+
+def frame():
+    api = AstrocamAPI(tile_dir=None)
+    hdu = SyntheticSky().fetch(SkyCoord(83.8, -5.4, unit="deg"), "DSS",
+                               api.w_fov, api.h_fov, AstrocamAPI.PIXELS)
+    return np.asarray(hdu[0].data, dtype=np.float64)
+
+def simple(data, stretch, percent):
+    norm = simple_norm(data, stretch, percent=percent)
+    return (norm(data) * 255).astype(np.uint8)
+
+def measure(call, repeat):
+    call()
+    best = min(timed(call) for _ in range(repeat))
+    tracemalloc.start()
+    call()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+def timed(call):
+    start = time.perf_counter()
+    call()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data = frame()
+    print(f"{data.shape[1]}x{data.shape[0]} {data.dtype} frame")
+    print(f"{'stretch':<12}{'path':<22}{'ms':>8}{'peak MB':>9}{'max LSB':>9}")
+    for stretch, percent in CASES:
+        name = stretch if percent is None else f"{stretch} {percent:g}%"
+        normalizer = Normalizer(stretch, percent)
+        norm = simple_norm(data, stretch, percent=percent, clip=True)
+        reference = (norm(data) * 255).astype(np.uint8)
+        paths = (
+            ("simple_norm+tobytes", lambda: simple(data, stretch, percent).tobytes()),
+            ("Normalizer+tobytes", lambda: normalizer(data).tobytes()),
+            ("Normalizer", lambda: normalizer(data)),
+        )
+        for path, call in paths:
+            seconds, peak = measure(call, args.repeat)
+            out = np.frombuffer(bytes(call()), np.uint8).reshape(data.shape)
+            error = int(np.max(np.abs(out.astype(int) - reference.astype(int))))
+            print(f"{name:<12}{path:<22}{seconds * 1e3:>8.1f}{peak / 1e6:>9.1f}{error:>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+FramePrefetcher on the synthetic sky with a controlled clock: a pointing
+observed within the window of its announcement is served from the
+prefetched tile, with the sky that is there at observation time, and
+pointings elsewhere or too late fall back to a fetch.
+
+    PYTHONPATH=../src:../../../pyMetrics/src python -m pytest test_prefetch.py
+"""
+import numpy as np
+import pytest
+
+from astrocam.api import AstrocamAPI
+from astrocam.prefetch import FramePrefetcher
+from astrocam.synthetic import SyntheticSky
+
+T0 = 1.7e9
+
+class Clock:
+    def __init__(self):
+        self.now = T0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def api():
+    sky = SyntheticSky()
+    sky.NOISE = 0.0
+    return AstrocamAPI(tile_dir=None, fetcher=sky.fetch)
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+@pytest.fixture
+def prefetcher(api, clock):
+    prefetcher = FramePrefetcher(api, clock=clock)
+    yield prefetcher
+    prefetcher.close()
+
+def frame(api, data):
+    return np.frombuffer(data, np.uint8).reshape(api.pixels[1], api.pixels[0])
+
+def test_time_none_hits_later_with_the_current_sky(api, clock, prefetcher):
+    prefetcher.prefetch([(40.0, 120.0, None)])
+    # Observed 20 s later, the sky has moved by 5 arcmin
+    clock.now += 20.0
+    coord = api.altazm_to_icrs(40.0, 120.0, clock.now)
+    data = prefetcher.take(40.0, 120.0, coord)
+    assert data is not None and (prefetcher.hits, prefetcher.misses) == (1, 0)
+    expected = frame(api, api.raw_image(coord)).astype(float)
+    got = frame(api, data).astype(float)
+    # Same stars at the same pixels, up to the sub-pixel centring of the crop
+    assert np.corrcoef(expected.ravel(), got.ravel())[0, 1] > 0.8
+    stale = frame(api, api.raw_image(api.altazm_to_icrs(40.0, 120.0, T0))).astype(float)
+    assert np.corrcoef(stale.ravel(), got.ravel())[0, 1] < 0.5
+
+def test_pointing_within_the_mount_tolerance_hits(api, clock, prefetcher):
+    prefetcher.prefetch([(30.0, 359.99, T0 + 10.0)])
+    clock.now += 12.0
+    alt, az = 30.015, 0.01
+    assert prefetcher.take(alt, az, api.altazm_to_icrs(alt, az, clock.now)) is not None
+
+def test_misses(api, clock, prefetcher):
+    prefetcher.prefetch([(40.0, 120.0, None)])
+    # Another pointing
+    assert prefetcher.take(40.2, 120.0, api.altazm_to_icrs(40.2, 120.0, clock.now)) is None
+    # Too late: the tile no longer covers the sky there
+    clock.now += prefetcher.window + 1.0
+    assert prefetcher.take(40.0, 120.0, api.altazm_to_icrs(40.0, 120.0, clock.now)) is None
+    assert (prefetcher.hits, prefetcher.misses) == (0, 2)
+
+def test_announced_twice_fetches_once(api, prefetcher):
+    calls = []
+    fetch_tile = api.fetch_tile
+    api.fetch_tile = lambda *args: calls.append(args) or fetch_tile(*args)
+    prefetcher.prefetch([(40.0, 120.0, None), (60.0, 200.0, None)])
+    prefetcher.prefetch([(60.0, 200.0, None), (20.0, 10.0, None)])
+    prefetcher.clear()
+    assert len(calls) <= 3
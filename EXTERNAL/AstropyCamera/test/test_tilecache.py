@@ -0,0 +1,85 @@
+"""
+TileCache with a counting stub fetcher (the synthetic sky) and the
+network switched off: a request falling into a cached tile, in memory or
+on disk, is served without calling the fetcher.
+
+    PYTHONPATH=../src:../../../pyMetrics/src python -m pytest test_tilecache.py
+"""
+import socket
+
+import numpy as np
+import pytest
+from astropy.coordinates import SkyCoord
+
+from astrocam.api import AstrocamAPI
+from astrocam.synthetic import SyntheticSky
+from astrocam.tilecache import TileCache
+
+class CountingFetcher:
+    def __init__(self):
+        self.sky = SyntheticSky()
+        self.calls = []
+
+    def __call__(self, coord, survey, width, height, pixels):
+        self.calls.append((coord.ra.deg, coord.dec.deg, survey))
+        return self.sky.fetch(coord, survey, width, height, pixels)
+
+@pytest.fixture(autouse=True)
+def no_network(monkeypatch):
+    def refuse(*args, **kwargs):
+        raise AssertionError("network access")
+    monkeypatch.setattr(socket, "socket", refuse)
+    monkeypatch.setattr(socket, "create_connection", refuse)
+
+@pytest.fixture
+def fetcher():
+    return CountingFetcher()
+
+@pytest.fixture
+def api(fetcher, tmp_path):
+    return AstrocamAPI(tile_dir=tmp_path, fetcher=fetcher)
+
+def test_hit_makes_no_fetch(api, fetcher):
+    coord = SkyCoord(150.012, 20.013, unit="deg")
+    first = api.fetch_sky_image(coord)[0].data
+    assert len(fetcher.calls) == 1
+    # Same grid cell, a few arcsec away
+    nearby = SkyCoord(150.014, 20.011, unit="deg")
+    second = api.fetch_sky_image(nearby)[0].data
+    assert len(fetcher.calls) == 1
+    assert (api.tiles.hits, api.tiles.misses) == (1, 1)
+    assert second.shape == first.shape == (api.pixels[1], api.pixels[0])
+
+def test_hit_returns_the_same_crop(api, fetcher):
+    coord = SkyCoord(80.03, -10.02, unit="deg")
+    miss = api.fetch_sky_image(coord)[0].data
+    hit = api.fetch_sky_image(coord)[0].data
+    assert len(fetcher.calls) == 1
+    np.testing.assert_array_equal(hit, miss)
+
+def test_disk_hit_after_restart(fetcher, tmp_path):
+    coord = SkyCoord(10.0, 45.0, unit="deg")
+    api = AstrocamAPI(tile_dir=tmp_path, fetcher=fetcher)
+    frame = api.raw_image(coord)
+    # A new cache on the same directory, as after a component restart
+    api = AstrocamAPI(tile_dir=tmp_path, fetcher=fetcher)
+    assert api.raw_image(coord) == frame
+    assert len(fetcher.calls) == 1
+
+def test_other_cell_fetches(api, fetcher):
+    api.fetch_sky_image(SkyCoord(150.0, 20.0, unit="deg"))
+    api.fetch_sky_image(SkyCoord(150.0, 20.0 + 2 * TileCache.QUANTUM, unit="deg"))
+    assert len(fetcher.calls) == 2
+
+def test_explicit_fetcher_with_another_source_is_refused(fetcher):
+    with pytest.raises(ValueError, match="synthetic"):
+        AstrocamAPI(tile_dir=None, fetcher=fetcher, source="synthetic")
+
+def test_synthetic_cells_are_bounded(monkeypatch):
+    monkeypatch.setattr(SyntheticSky, "CELLS", 3)
+    sky = SyntheticSky()
+    for index in range(3):
+        sky._cell(100, index)
+    sky._cell(100, 0)
+    sky._cell(100, 3)
+    assert list(sky._cells) == [(100, 2), (100, 0), (100, 3)]
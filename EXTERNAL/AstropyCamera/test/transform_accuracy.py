@@ -0,0 +1,36 @@
+import sys
+import time
+
+import numpy as np
+import astropy.units as u
+from astropy.time import Time
+from astropy.coordinates import SkyCoord, AltAz, EarthLocation
+
+from astrocam.api import AstrocamAPI
+from astrocam.transform import AltAzTransform
+
+def main():
+    a = AstrocamAPI(tile_dir=None)
+    location = EarthLocation(lat=AstrocamAPI.LAT*u.deg, lon=AstrocamAPI.LON*u.deg, height=AstrocamAPI.ALT*u.m)
+
+    # Pointings all over the sky over a night, several buckets
+    rng = np.random.default_rng(0)
+    n = 2000
+    alt = rng.uniform(0.0, 90.0, n)
+    azm = rng.uniform(0.0, 360.0, n)
+    obstime = Time.now() + rng.uniform(0.0, 8 * 3600.0, n) * u.s
+
+    start = time.perf_counter()
+    reference = SkyCoord(AltAz(alt=alt*u.deg, az=azm*u.deg, obstime=obstime, location=location)).transform_to('icrs')
+    astropy_time = time.perf_counter() - start
+    start = time.perf_counter()
+    coords = a.altazm_to_icrs(alt, azm, obstime)
+    cached_time = time.perf_counter() - start
+
+    error = reference.separation(coords).arcsec.max()
+    print(f"max error {error:.4f} arcsec (bound {AltAzTransform.ACCURACY}), "
+          f"astropy {astropy_time * 1000:.1f} ms, cached {cached_time * 1000:.1f} ms for {n} pointings")
+    sys.exit(0 if error <= AltAzTransform.ACCURACY else 1)
+
+if __name__ == "__main__":
+    main()
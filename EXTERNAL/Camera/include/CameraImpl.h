@@ -19,6 +19,7 @@ class CameraImpl: public virtual CharacteristicComponentImpl,
 	virtual ::TYPES::ImageType * getFrame (const char * exposureTime, const char * iso);
 	virtual void on();
 	virtual void off();
+	virtual void prefetch(const TYPES::TargetList & targets);
 	virtual ACS::RWstring_ptr shutterSpeed() throw(CORBA::SystemException);
 	virtual ACS::RWstring_ptr isoSpeed() throw(CORBA::SystemException);
 
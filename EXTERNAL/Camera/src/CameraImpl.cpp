@@ -49,6 +49,10 @@ void CameraImpl::off()
 {
 }
 
+void CameraImpl::prefetch(const TYPES::TargetList & targets)
+{
+}
+
 TYPES::ImageType * CameraImpl::getFrame (const char * exposureTime, const char * iso)
 {
 	::Camera *camera;
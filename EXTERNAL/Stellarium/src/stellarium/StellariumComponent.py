@@ -2,22 +2,35 @@
 
 # CORBA Stub Imports
 import TELESCOPE_MODULE__POA
+import SYSTEMErrImpl
 
 # ACS Imports
 from Acspy.Servants.CharacteristicComponent import CharacteristicComponent
 from Acspy.Servants.ContainerServices  import ContainerServices
 from Acspy.Servants.ComponentLifecycle import ComponentLifecycle
 from Acspy.Util.BaciHelper             import addProperty
+from Acspy.Common.TimeHelper           import getTimeStamp
 from ACSImpl.DevIO                     import DevIO
 
 # Local Package Imports
+from AstroConfig import Config
+from AstroMetrics import Metrics
 from stellarium.api import StellariumAPI
+from stellarium.async_api import AsyncStellariumAPI
+from stellarium.sampler import PositionSampler
+
+# Component attributes (CDB) and their values when missing
+DEFAULT_CONFIG = {
+    "samplingPeriod": PositionSampler.PERIOD,   # s between position samples
+    "maxSampleAge":   PositionSampler.MAX_AGE,  # s before a sample is stale
+    **Metrics.DEFAULT_CONFIG,                   # metrics, metricsInterval, metricsFile
+}
 
 class StellariumDevIO(DevIO):
-    """DevIO that returns a timestamp with its data."""
+    """DevIO that returns the latest PositionSampler sample with its timestamp."""
     def __init__(self, altazm):
         DevIO.__init__(self, 0.0)
-        self.api = None
+        self.sampler = None
         if altazm == "alt":
             self.index = 0
         elif altazm == "azm":
@@ -26,13 +39,13 @@ class StellariumDevIO(DevIO):
             raise RuntimeException("Wrong DevIO type")
 
     def read(self):
-        val = 0.0
-        if self.api is not None:
-            val = self.api.get_altaz()[self.index]
-        return tuple((val,1191516502))
+        if self.sampler is None:
+            return tuple((0.0,getTimeStamp().value))
+        sample = self.sampler.read()
+        return tuple((sample[self.index],sample[2]))
 
-    def setApi(self, api):
-        self.api = api
+    def setSampler(self, sampler):
+        self.sampler = sampler
         
 
 class StellariumComponent(TELESCOPE_MODULE__POA.TelescopeControl, CharacteristicComponent, ContainerServices, ComponentLifecycle):
@@ -44,6 +57,9 @@ class StellariumComponent(TELESCOPE_MODULE__POA.TelescopeControl, Characteristic
         CharacteristicComponent.__init__(self)
         ContainerServices.__init__(self)
         self.api = None
+        self.metrics = None
+        self.async_api = None
+        self.sampler = None
         self.alt_devio = None
         self.azm_devio = None
 
@@ -58,31 +74,86 @@ class StellariumComponent(TELESCOPE_MODULE__POA.TelescopeControl, Characteristic
         addProperty(self, "status")
 
     def execute(self):
-        self.api = StellariumAPI()
-        self.alt_devio.setApi(self.api)
-        self.azm_devio.setApi(self.api)
+        config = Config.componentConfig(self, DEFAULT_CONFIG)
+        self.metrics = Metrics.fromConfig(config, self.getLogger())
+        # A kept-alive connection for each thread that talks to Stellarium:
+        # the async workers, the position sampler and the caller of setTo
+        self.api = StellariumAPI(pool_size=AsyncStellariumAPI.MAX_WORKERS + 2)
+        self.async_api = AsyncStellariumAPI(self.api)
+        self.sampler = PositionSampler(self.api, config["samplingPeriod"],
+                                       config["maxSampleAge"])
+        self.sampler.start()
+        self.alt_devio.setSampler(self.sampler)
+        self.azm_devio.setSampler(self.sampler)
 
     def cleanUp(self):
-        self.api = None
+        self._shutdown()
 
     def aboutToAbort(self):
+        self._shutdown()
+
+    def _shutdown(self):
+        """Stops the sampler and slews, closes the connections and metrics."""
+        if self.sampler is not None:
+            self.sampler.stop()
+        if self.async_api is not None:
+            self.async_api.close()
+        if self.api is not None:
+            self.api.close()
+        if self.metrics is not None:
+            self.metrics.close()
+        self.sampler = None
+        self.async_api = None
         self.api = None
+        self.metrics = None
 
     # Component Operations
+    @Metrics.componentCall("StellariumComponent", "objfix")
     def objfix(self, altitude, azimuth):
         self.api.gradual_fov(60.0);
-        self.setTo(altitude, azimuth);
-        self.api.gradual_fov(5.0);
+        try:
+            self.setTo(altitude, azimuth);
+        finally:
+            self.api.gradual_fov(5.0);
 
+    @Metrics.componentCall("StellariumComponent", "setTo")
     def setTo(self, altitude, azimuth):
         # Commanded positions
         self._get_commandedAltitude().set_sync(altitude);
         self._get_commandedAzimuth().set_sync(azimuth);
 
-        # Move telescope
+        # Move telescope, on the async API so that it queues behind a
+        # slewAsync still running instead of fighting over main/move
         #self.api.move_to_altaz(altitude, azimuth);
-        self.api.slew_to_altaz(altitude, azimuth);
+        try:
+            converged = self.async_api.slew_async(altitude, azimuth).result()
+            # Publish the final position right away rather than at the next poll
+            self.sampler.refresh()
+        except Exception as e:
+            self.getLogger().error(f"Slew to alt={altitude} az={azimuth} failed: {e}")
+            raise SYSTEMErrImpl.SlewFailedExImpl()
+
+        if not converged:
+            self.getLogger().error(
+                f"Slew to alt={altitude} az={azimuth} timed out before reaching it")
+            raise SYSTEMErrImpl.SlewFailedExImpl()
+
+    def slewAsync(self, altitude, azimuth):
+        """
+        Non-blocking variant of setTo. Python only: it is not part of the
+        TelescopeControl IDL (which the C++ mounts implement as well), so it
+        can only be called in-process, not through CORBA. Returns a
+        concurrent.futures.Future that completes when the slew is done;
+        cancelling it stops the telescope. Slews run one after the other,
+        in the order they were requested.
+        """
+        # Commanded positions
+        self._get_commandedAltitude().set_sync(altitude);
+        self._get_commandedAzimuth().set_sync(azimuth);
+
+        return self.async_api.slew_async(altitude, azimuth)
 
+    @Metrics.componentCall("StellariumComponent", "offSet")
     def offSet(self, altOffset, azOffset):
         # Calculate target position
         altitude = self._get_actualAltitude().get_sync()[0] + altOffset;
@@ -91,6 +162,7 @@ class StellariumComponent(TELESCOPE_MODULE__POA.TelescopeControl, Characteristic
         # Command Telescope
         self.setTo(altitude, azimuth)
 
+    @Metrics.componentCall("StellariumComponent", "zenith")
     def zenith(self):
         # Calculate target position
         altitude = 90.0
@@ -99,6 +171,7 @@ class StellariumComponent(TELESCOPE_MODULE__POA.TelescopeControl, Characteristic
         # Command Telescope
         self.setTo(altitude, azimuth)
 
+    @Metrics.componentCall("StellariumComponent", "park")
     def park(self):
         # Calculate target position
         altitude = 0.0
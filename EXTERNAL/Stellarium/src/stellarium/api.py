@@ -1,56 +1,138 @@
 import time
 import math
 import json
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from AstroMetrics import Metrics
+from stellarium import coords
+from stellarium.controller import SlewController
+
+REQUEST_HELP = "HTTP requests to Stellarium"
+SLEW = Metrics.operation("stellarium_slew", "Closed-loop slews")
+
+class StellariumError(Exception):
+    """Stellarium did not answer a request whose answer is needed."""
+
+class RequestStats:
+    """
+    Thread-safe latency counters of the HTTP requests sent to Stellarium.
+    Always kept, whether or not the stellarium_request metric is enabled.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def record(self, elapsed, ok=True):
+        with self.lock:
+            self.count += 1
+            if not ok:
+                self.errors += 1
+            self.total += elapsed
+            self.last = elapsed
+            self.max = max(self.max, elapsed)
+
+    def snapshot(self):
+        with self.lock:
+            mean = self.total / self.count if self.count else 0.0
+            return {"count": self.count, "errors": self.errors,
+                    "mean": mean, "max": self.max, "last": self.last}
 
 class StellariumAPI:
     # Base URL for the HTTP API
     STELLARIUM_URL = "http://localhost:8090/api"
-
-    def __init__(self, url=None):
+    # (connect, read) timeouts in seconds
+    TIMEOUT = (1.0, 2.0)
+    # Retries on connection errors and 502/503/504 answers
+    RETRIES = 2
+    # Kept-alive connections, one per thread sending requests concurrently
+    POOL_SIZE = 1
+
+    def __init__(self, url=None, timeout=TIMEOUT, retries=RETRIES, pool_size=POOL_SIZE):
         self.url = url
         if self.url is None:
             self.url = StellariumAPI.STELLARIUM_URL
-
+        self.timeout = timeout
+        self.stats = RequestStats()
+
+        # One keep-alive session for all requests, so the slew and FOV loops
+        # reuse the same TCP connection instead of opening one per request.
+        # With more threads than pool_size sending at once, the extra
+        # connections are opened and dropped per request. Every endpoint
+        # used here sets absolute values, so POSTs are safe to retry as well.
+        retry = Retry(total=retries, backoff_factor=0.05,
+                      status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset(["GET", "POST"]))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        """Closes the pooled connections."""
+        self.session.close()
+
+    def get_request_stats(self):
+        """Returns count, errors and mean/max/last latency (s) of the requests sent so far."""
+        return self.stats.snapshot()
+
+    # Single-point conversions, see stellarium.coords for the conventions
     def radec_to_xyz(self, ra, dec):
-        ra = math.radians(ra*15)
-        dec = math.radians(dec)
-        return [math.cos(dec)*math.cos(ra), math.cos(dec)*math.sin(ra), math.sin(dec)]
+        return coords.radec_to_xyz(ra, dec).tolist()
 
     def xyz_to_radec(self, x, y, z):
-        dec = math.asin(z)
-        ra = math.asin(y/math.cos(dec))
-        return [math.degrees(ra)/15.0, math.degrees(dec)]
+        ra, dec = coords.xyz_to_radec([x, y, z])
+        return [float(ra), float(dec)]
 
     def altaz_to_xyz(self, alt, az):
-        alt = math.radians(alt)
-        az = math.radians(az)
-        return [math.cos(alt)*math.cos(az), math.cos(alt)*math.sin(az), math.sin(alt)]
+        return coords.altaz_to_xyz(alt, az).tolist()
 
     def xyz_to_altaz(self, x, y, z):
-        alt = math.asin(z)
-        az = math.atan2(y, -x)
-        return [math.degrees(alt), math.degrees(az)%360]
+        alt, az = coords.xyz_to_altaz([x, y, z])
+        return [float(alt), float(az)]
 
     def send_http_request(self, endpoint, payload=None, json=False):
         """Sends a GET or POST request to Stellarium's HTTP API."""
         url = f"{self.url}/{endpoint}"
-        try:
-            if payload is None:
-                response = requests.get(url)
-            else:
-                if json:
-                    response = requests.post(url, json=payload)
+        metric = Metrics.operation("stellarium_request", REQUEST_HELP, endpoint=endpoint)
+        with metric.time():
+            start = time.perf_counter()
+            try:
+                if payload is None:
+                    response = self.session.get(url, timeout=self.timeout)
                 else:
-                    response = requests.post(url, data=payload)
-            if response.status_code == 200:
-                #print(f"Success: {response.text}")
-                return response.text
-            else:
-                print(f"Error: {response.status_code}: {response.text}")
-                return None
-        except Exception as e:
-            print(f"Request failed: {e}")
+                    if json:
+                        response = self.session.post(url, json=payload, timeout=self.timeout)
+                    else:
+                        response = self.session.post(url, data=payload, timeout=self.timeout)
+                self.stats.record(time.perf_counter() - start, response.status_code == 200)
+                if response.status_code == 200:
+                    #print(f"Success: {response.text}")
+                    return response.text
+                else:
+                    metric.errors.inc()
+                    print(f"Error: {response.status_code}: {response.text}")
+                    return None
+            except Exception as e:
+                self.stats.record(time.perf_counter() - start, False)
+                metric.errors.inc()
+                print(f"Request failed: {e}")
+
+    def _answer(self, endpoint):
+        """GETs endpoint; raises StellariumError if there is no answer."""
+        text = self.send_http_request(endpoint)
+        if text is None:
+            raise StellariumError(f"No answer from Stellarium to {endpoint}")
+        return text
 
     def set_time(self, year, month, day, hour, minute, second):
         """Sets the time in Stellarium."""
@@ -83,25 +165,18 @@ class StellariumAPI:
     def get_status(self):
         """Zoom out in Stellarium."""
         endpoint = f"main/status"
-        status = json.loads(self.send_http_request(endpoint))
-        return status
+        return json.loads(self._answer(endpoint))
 
     def get_radec(self):
         """Get Stellarium's current RA and DEC coordinates."""
         endpoint = f"main/view"
-        pos = self.send_http_request(endpoint)
-        if pos is None:
-            return [0, 0]
-        pos = json.loads(json.loads(pos)["jNow"])
+        pos = json.loads(json.loads(self._answer(endpoint))["jNow"])
         return self.xyz_to_radec(pos[0], pos[1], pos[2])
 
     def get_altaz(self):
         """Move Stellarium to given RA and DEC coordinates."""
         endpoint = f"main/view"
-        pos = self.send_http_request(endpoint)
-        if pos is None:
-            return [0, 0]
-        pos = json.loads(json.loads(pos)["altAz"])
+        pos = json.loads(json.loads(self._answer(endpoint))["altAz"])
         return self.xyz_to_altaz(pos[0], pos[1], pos[2])
 
     def move_to_radec(self, ra, dec):
@@ -120,44 +195,43 @@ class StellariumAPI:
         endpoint = f"main/move"
 
     def delta_azm(self, cmd, cur):
-        cur %= 360
-        cmd %= 360
-    
-        delta = (cmd - cur) % 360
+        return coords.delta_azm(cmd, cur)
 
-        return delta - 360 if delta > 180 else delta
+    def fov_steps(self, cmd_fov, fov, tm=0.5, step_tm=0.01):
+        """Yields the intermediate FOV values of a ramp from fov to cmd_fov lasting tm seconds."""
+        steps = tm / step_tm
+        dfov = (cmd_fov - fov) / steps
+        tol = 0.01
+        while math.fabs(cmd_fov - fov) > tol:
+            fov += dfov
+            yield fov
 
-    def slew_to_altaz(self, cmd_alt, cmd_azm):
+    @SLEW
+    def slew_to_altaz(self, cmd_alt, cmd_azm, timeout=SlewController.TIMEOUT):
+        """Slews to the given ALT and AZ; returns False if the slew timed out."""
         endpoint = f"main/move"
 
-        tol = 0.02
-        slp = 0.10
-        fov = self.get_fov()
-
-        act_pos = self.get_altaz()
-        delta_alt = cmd_alt - act_pos[0]
-        delta_azm = self.delta_azm(cmd_azm, act_pos[1])
-
-        while math.fabs(delta_alt) > tol or math.fabs(delta_azm) > tol:
-            delta_alt = math.copysign(min(math.fabs(delta_alt), 10), delta_alt)
-            delta_azm = math.copysign(min(math.fabs(delta_azm), 10), delta_azm)
-            slew_x = delta_azm / fov
-            slew_y = delta_alt / fov
-            slew_pos = {"x": slew_x, "y": slew_y}
-            self.send_http_request(endpoint, slew_pos)
-            time.sleep(slp)
-            act_pos = self.get_altaz()
-
-            delta_alt = cmd_alt - act_pos[0]
-            delta_azm = self.delta_azm(cmd_azm, act_pos[1])
+        ctl = SlewController(cmd_alt, cmd_azm, self.get_fov(), timeout=timeout)
+        try:
+            cmd = ctl.step(*self.sample_altaz())
+            while cmd is not None:
+                slew_x, slew_y, wait = cmd
+                self.send_http_request(endpoint, {"x": slew_x, "y": slew_y})
+                time.sleep(wait)
+                cmd = ctl.step(*self.sample_altaz())
+        finally:
+            # Also when a position read fails half way
+            self.send_http_request(endpoint, {"x": 0.0, "y": 0.0})
+        return ctl.converged
+
+    def sample_altaz(self):
+        """Returns the current (alt, az) and half the request round trip, i.e. the age of the sample."""
+        start = time.perf_counter()
+        pos = self.get_altaz()
+        return pos, (time.perf_counter() - start) / 2.0
 
     def gradual_fov(self, cmd_fov, tm = 0.5):
         step_tm = 0.01
-        steps = tm / step_tm
-        fov = self.get_fov()
-        dfov = (cmd_fov - fov) / steps
-        tol = 0.01
-        while math.fabs(cmd_fov - fov) > tol:
-            fov += dfov
+        for fov in self.fov_steps(cmd_fov, self.get_fov(), tm, step_tm):
             self.fov(fov)
             time.sleep(step_tm)
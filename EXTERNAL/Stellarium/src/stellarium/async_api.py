@@ -0,0 +1,119 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from stellarium.api import SLEW, StellariumAPI
+from stellarium.controller import SlewController
+
+class AsyncStellariumAPI:
+    """
+    asyncio front end of StellariumAPI.
+
+    Each HTTP request still goes through the (pooled) StellariumAPI session,
+    but runs on a small thread pool, so slews and FOV ramps become
+    coroutines that only await between requests and can be cancelled, and
+    position polls can run next to them. Slews never overlap: one started
+    while another is running waits for it. slew_async/gradual_fov_async run
+    those coroutines on a private event loop thread and return immediately
+    with a concurrent.futures.Future, for callers that are not asyncio code
+    themselves (e.g. CORBA threads). The slews are serialized on that loop,
+    so coroutines are meant to be run there, through submit().
+    """
+    # Threads sending HTTP requests
+    MAX_WORKERS = 4
+
+    def __init__(self, api=None, url=None, max_workers=MAX_WORKERS):
+        self.api = api
+        if self.api is None:
+            self.api = StellariumAPI(url, pool_size=max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="stellarium-http")
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        name="stellarium-loop",
+                                        daemon=True)
+        self._thread.start()
+        # Created up front on the private loop, so two slews submitted at
+        # the same time cannot each make their own
+        self._slewing = self.submit(self._new_lock()).result()
+
+    @staticmethod
+    async def _new_lock():
+        return asyncio.Lock()
+
+    async def _call(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    # Single requests
+    async def get_altaz(self):
+        return await self._call(self.api.get_altaz)
+
+    async def get_radec(self):
+        return await self._call(self.api.get_radec)
+
+    async def get_fov(self):
+        return await self._call(self.api.get_fov)
+
+    async def fov(self, val=5.0):
+        await self._call(self.api.fov, val)
+
+    async def move(self, x, y):
+        await self._call(self.api.send_http_request, "main/move", {"x": x, "y": y})
+
+    async def sample_altaz(self):
+        return await self._call(self.api.sample_altaz)
+
+    # Long running operations
+    async def slew_to_altaz(self, cmd_alt, cmd_azm, timeout=SlewController.TIMEOUT):
+        """
+        Same control loop as StellariumAPI.slew_to_altaz; stops the motion
+        when cancelled. Waits for a running slew to finish first.
+        """
+        async with self._slewing:
+            with SLEW.time():
+                ctl = SlewController(cmd_alt, cmd_azm, await self.get_fov(), timeout=timeout)
+                try:
+                    cmd = ctl.step(*await self.sample_altaz())
+                    while cmd is not None:
+                        slew_x, slew_y, wait = cmd
+                        await self.move(slew_x, slew_y)
+                        await asyncio.sleep(wait)
+                        cmd = ctl.step(*await self.sample_altaz())
+                finally:
+                    await asyncio.shield(self.move(0.0, 0.0))
+                return ctl.converged
+
+    async def gradual_fov(self, cmd_fov, tm=0.5):
+        step_tm = 0.01
+        for fov in self.api.fov_steps(cmd_fov, await self.get_fov(), tm, step_tm):
+            await self.fov(fov)
+            await asyncio.sleep(step_tm)
+
+    # Entry points for threads without an event loop
+    def submit(self, coro):
+        """Schedules coro on the background loop; returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def slew_async(self, cmd_alt, cmd_azm):
+        """Starts a slew and returns at once; cancel() on the future aborts the slew."""
+        return self.submit(self.slew_to_altaz(cmd_alt, cmd_azm))
+
+    def gradual_fov_async(self, cmd_fov, tm=0.5):
+        return self.submit(self.gradual_fov(cmd_fov, tm))
+
+    def close(self):
+        """Cancels running operations and stops the background loop and thread pool."""
+        loop = self._loop
+        if loop.is_closed():
+            return
+        async def cancel_all():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        asyncio.run_coroutine_threadsafe(cancel_all(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join()
+        loop.close()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,131 @@
+import math
+import time
+
+from stellarium.coords import delta_azm
+
+class SlewController:
+    """
+    Closed-loop controller for slewing Stellarium with main/move.
+
+    main/move takes dimensionless x/y speeds; the resulting angular rate is
+    roughly proportional to them and to the field of view. The controller
+    keeps, per axis, an estimate of that gain (deg/s per unit of x or y),
+    seeded from the FOV and refined from the motion observed between two
+    position samples, so a FOV change during the slew does not throw it
+    off. Rates follow a trapezoidal profile: accelerate, cruise at
+    max_rate, then decelerate so that the axis stops at the target
+    (sqrt(2 a d)), ending in a proportional zone of time constant settle.
+    The position is predicted forward over the request latency before the
+    command is computed, and the time until the next sample grows with the
+    remaining distance, so long slews need few requests. timeout and
+    max_iterations bound the loop.
+
+    Usage: feed each position sample to step(); it returns the (x, y, wait)
+    to send and wait before the next sample, or None once the slew is over
+    (see converged).
+    """
+    TOL = 0.02            # deg
+    MAX_RATE = 20.0       # deg/s
+    ACCEL = 40.0          # deg/s^2
+    SETTLE = 0.25         # s, time constant of the final approach
+    MIN_POLL = 0.05       # s
+    MAX_POLL = 0.5        # s
+    TIMEOUT = 120.0       # s
+    MAX_ITERATIONS = 5000
+
+    def __init__(self, cmd_alt, cmd_azm, fov, tol=TOL, max_rate=MAX_RATE,
+                 accel=ACCEL, settle=SETTLE, min_poll=MIN_POLL,
+                 max_poll=MAX_POLL, timeout=TIMEOUT,
+                 max_iterations=MAX_ITERATIONS, clock=time.monotonic):
+        self.target = (cmd_alt, cmd_azm)
+        self.tol = tol
+        self.max_rate = max_rate
+        self.accel = accel
+        self.settle = settle
+        self.min_poll = min_poll
+        self.max_poll = max_poll
+        self.timeout = timeout
+        self.max_iterations = max_iterations
+        self.clock = clock
+
+        # deg/s per unit of main/move (alt, azm)
+        self.initial_gain = max(fov, 1e-3)
+        self.gain = [self.initial_gain, self.initial_gain]
+        self.rate = [0.0, 0.0]
+        self.iterations = 0
+        self.converged = False
+        self.timed_out = False
+        self._start = None
+        self._last = None
+
+    def errors(self, pos):
+        return [self.target[0] - pos[0], delta_azm(self.target[1], pos[1])]
+
+    def _learn(self, pos, now):
+        """Refines the gains from the motion since the previous sample."""
+        last_pos, last_time, last_cmd = self._last
+        elapsed = now - last_time
+        if elapsed <= 0:
+            return
+        moved = [pos[0] - last_pos[0], delta_azm(pos[1], last_pos[1])]
+        for axis in range(2):
+            if math.fabs(last_cmd[axis]) < 1e-6:
+                continue
+            observed = moved[axis] / (elapsed * last_cmd[axis])
+            if observed <= 0:
+                continue
+            observed = min(max(observed, 0.1 * self.initial_gain),
+                           10.0 * self.initial_gain)
+            self.gain[axis] = 0.5 * self.gain[axis] + 0.5 * observed
+
+    def _profile(self, error, rate, dt):
+        """Desired rate for one axis: trapezoid ending in a proportional zone."""
+        distance = math.fabs(error)
+        speed = min(self.max_rate,
+                    math.sqrt(2.0 * self.accel * distance),
+                    distance / self.settle)
+        target = math.copysign(speed, error)
+        # Acceleration limit relative to the rate currently commanded
+        step = self.accel * max(dt, self.min_poll)
+        return min(max(target, rate - step), rate + step)
+
+    def step(self, pos, latency=0.0):
+        """
+        Takes the position (alt, azm) just read, latency being how long ago
+        it was valid. Returns (x, y, wait) or None once finished.
+        """
+        now = self.clock()
+        if self._start is None:
+            self._start = now
+        elif self._last is not None:
+            self._learn(pos, now)
+
+        # Predict where the telescope is by now
+        pos = [pos[0] + self.rate[0] * latency, pos[1] + self.rate[1] * latency]
+        error = self.errors(pos)
+
+        if math.fabs(error[0]) <= self.tol and math.fabs(error[1]) <= self.tol:
+            self.converged = True
+            self.rate = [0.0, 0.0]
+            return None
+        if (now - self._start > self.timeout or
+                self.iterations >= self.max_iterations):
+            self.timed_out = True
+            self.rate = [0.0, 0.0]
+            return None
+        self.iterations += 1
+
+        dt = self.min_poll if self._last is None else now - self._last[1]
+        self.rate = [self._profile(error[axis], self.rate[axis], dt)
+                     for axis in range(2)]
+        cmd = [self.rate[axis] / self.gain[axis] for axis in range(2)]
+        self._last = (pos, now, cmd)
+
+        # Sample again after covering about half of the remaining distance
+        times = [math.fabs(error[axis] / self.rate[axis])
+                 for axis in range(2) if math.fabs(self.rate[axis]) > 1e-9]
+        wait = 0.5 * min(times) if times else self.min_poll
+        wait = min(max(wait, self.min_poll), self.max_poll)
+
+        # (x, y) = (azimuth, altitude)
+        return cmd[1], cmd[0], wait
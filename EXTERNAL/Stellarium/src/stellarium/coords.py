@@ -0,0 +1,57 @@
+"""
+Vectorized versions of the StellariumAPI coordinate conversions.
+
+All functions take scalars or NumPy arrays (broadcast against each other)
+and follow the StellariumAPI conventions: RA in hours, everything else in
+degrees, unit vectors as arrays whose last axis is (x, y, z). In the
+horizontal frame Stellarium's x axis points south and y east, azimuth is
+counted from north through east.
+
+Angles are recovered with arctan2 rather than arcsin/arccos, so the
+results are right in every quadrant and stay accurate close to the poles.
+
+StellariumAPI converts its single points through this module as well.
+NumPy is imported on the first conversion rather than with the module,
+which keeps importing stellarium.api cheap.
+"""
+
+def radec_to_xyz(ra, dec):
+    import numpy as np
+    ra = np.radians(np.asarray(ra, dtype=float) * 15.0)
+    dec = np.radians(np.asarray(dec, dtype=float))
+    cos_dec = np.cos(dec)
+    return np.stack(np.broadcast_arrays(cos_dec * np.cos(ra),
+                                        cos_dec * np.sin(ra),
+                                        np.sin(dec)), axis=-1)
+
+def xyz_to_radec(xyz):
+    import numpy as np
+    xyz = np.asarray(xyz, dtype=float)
+    x, y, z = xyz[..., 0], xyz[..., 1], xyz[..., 2]
+    ra = np.degrees(np.arctan2(y, x)) % 360.0
+    dec = np.degrees(np.arctan2(z, np.hypot(x, y)))
+    return ra / 15.0, dec
+
+def altaz_to_xyz(alt, az):
+    import numpy as np
+    alt = np.radians(np.asarray(alt, dtype=float))
+    az = np.radians(np.asarray(az, dtype=float))
+    cos_alt = np.cos(alt)
+    return np.stack(np.broadcast_arrays(-cos_alt * np.cos(az),
+                                        cos_alt * np.sin(az),
+                                        np.sin(alt)), axis=-1)
+
+def xyz_to_altaz(xyz):
+    import numpy as np
+    xyz = np.asarray(xyz, dtype=float)
+    x, y, z = xyz[..., 0], xyz[..., 1], xyz[..., 2]
+    alt = np.degrees(np.arctan2(z, np.hypot(x, y)))
+    az = np.degrees(np.arctan2(y, -x)) % 360.0
+    return alt, az
+
+def delta_azm(cmd, cur):
+    """
+    Shortest signed azimuth difference cmd - cur, in (-180, 180]. Plain
+    arithmetic, so it works on floats without NumPy and on arrays alike.
+    """
+    return 180.0 - (180.0 - (cmd - cur)) % 360.0
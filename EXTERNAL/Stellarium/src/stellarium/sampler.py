@@ -0,0 +1,87 @@
+import threading
+import time
+
+from Acspy.Common.TimeHelper import getTimeStamp
+
+from stellarium.api import StellariumError
+
+class PositionSampler:
+    """
+    Background poller of Stellarium's (alt, az).
+
+    One thread reads main/view every period seconds and publishes the
+    latest (alt, az, ACS timestamp) as a single tuple, so readers always see
+    a consistent sample and never wait for HTTP. A sample older than
+    max_age seconds is refreshed synchronously by the reader instead.
+    While Stellarium does not answer, readers get the last sample it gave,
+    with its original timestamp, and retry at most once per period.
+    """
+    PERIOD = 1.0     # s
+    MAX_AGE = 2.0    # s
+
+    def __init__(self, api, period=PERIOD, max_age=MAX_AGE):
+        self.api = api
+        self.period = period
+        self.max_age = max_age
+        self._sample = None      # (alt, az, acs_time, monotonic_time)
+        self._retry = 0.0        # monotonic time of the next read() refresh
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run,
+                                        name="stellarium-sampler",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            start = time.monotonic()
+            try:
+                self.refresh()
+            except Exception:
+                # Keep the last sample; read() refreshes it once it is stale.
+                pass
+            self._stop.wait(max(0.0, self.period - (time.monotonic() - start)))
+
+    def _stale(self, sample):
+        return sample is None or time.monotonic() - sample[3] > self.max_age
+
+    def _refresh(self):
+        alt, az = self.api.get_altaz()
+        self._sample = (alt, az, getTimeStamp().value, time.monotonic())
+        return self._sample
+
+    def refresh(self):
+        """Reads the position now and publishes it."""
+        with self._lock:
+            return self._refresh()
+
+    def read(self):
+        """
+        Returns the latest (alt, az, acs_time), refreshing it if stale.
+        Raises StellariumError if no position could be read so far.
+        """
+        sample = self._sample
+        if self._stale(sample):
+            # Whoever gets the lock first refreshes, the others reuse it.
+            with self._lock:
+                sample = self._sample
+                if self._stale(sample) and time.monotonic() >= self._retry:
+                    try:
+                        sample = self._refresh()
+                    except Exception:
+                        self._retry = time.monotonic() + self.period
+                        if sample is None:
+                            raise
+        if sample is None:
+            raise StellariumError("No position read from Stellarium yet")
+        return sample[:3]
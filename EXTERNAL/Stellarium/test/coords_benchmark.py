@@ -0,0 +1,76 @@
+"""
+Throughput of the stellarium.coords conversions on N points (1M by
+default), against converting them one by one with the scalar math
+formulas, as StellariumAPI did before.
+
+    PYTHONPATH=../src:../../../pyMetrics/src python coords_benchmark.py
+    PYTHONPATH=../src:../../../pyMetrics/src python coords_benchmark.py -n 100000
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from stellarium import coords
+
+def scalar_altaz_to_xyz(alt, az):
+    alt, az = math.radians(alt), math.radians(az)
+    return [-math.cos(alt) * math.cos(az), math.cos(alt) * math.sin(az), math.sin(alt)]
+
+def scalar_xyz_to_altaz(x, y, z):
+    return [math.degrees(math.asin(z)), math.degrees(math.atan2(y, -x)) % 360.0]
+
+def scalar_radec_to_xyz(ra, dec):
+    ra, dec = math.radians(ra * 15.0), math.radians(dec)
+    return [math.cos(dec) * math.cos(ra), math.cos(dec) * math.sin(ra), math.sin(dec)]
+
+def scalar_xyz_to_radec(x, y, z):
+    return [math.degrees(math.atan2(y, x)) / 15.0 % 24.0, math.degrees(math.asin(z))]
+
+def scalar_delta_azm(cmd, cur):
+    delta = (cmd % 360 - cur % 360) % 360
+    return delta - 360 if delta > 180 else delta
+
+def timed(call, *args):
+    start = time.perf_counter()
+    call(*args)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--points", type=int, default=1_000_000)
+    parser.add_argument("--scalar", type=int, default=200_000,
+                        help="points converted one by one, scaled up to N")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    lon = rng.uniform(0.0, 360.0, args.points)
+    lat = np.degrees(np.arcsin(rng.uniform(-1.0, 1.0, args.points)))
+    xyz = coords.altaz_to_xyz(lat, lon)
+    m = min(args.scalar, args.points)
+    lon_l, lat_l, xyz_l = lon[:m].tolist(), lat[:m].tolist(), xyz[:m].tolist()
+    scale = args.points / m
+
+    cases = [
+        ("altaz_to_xyz", lambda: coords.altaz_to_xyz(lat, lon),
+         lambda: [scalar_altaz_to_xyz(a, z) for a, z in zip(lat_l, lon_l)]),
+        ("xyz_to_altaz", lambda: coords.xyz_to_altaz(xyz),
+         lambda: [scalar_xyz_to_altaz(*p) for p in xyz_l]),
+        ("radec_to_xyz", lambda: coords.radec_to_xyz(lon / 15.0, lat),
+         lambda: [scalar_radec_to_xyz(r / 15.0, d) for r, d in zip(lon_l, lat_l)]),
+        ("xyz_to_radec", lambda: coords.xyz_to_radec(xyz),
+         lambda: [scalar_xyz_to_radec(*p) for p in xyz_l]),
+        ("delta_azm", lambda: coords.delta_azm(lon, lat),
+         lambda: [scalar_delta_azm(c, u) for c, u in zip(lon_l, lat_l)]),
+    ]
+    print(f"{args.points} points")
+    print(f"{'function':<14}{'numpy ms':>10}{'Mpt/s':>8}{'scalar ms':>11}{'Mpt/s':>8}{'speed-up':>10}")
+    for name, vector, scalar in cases:
+        fast = min(timed(vector) for _ in range(3))
+        slow = timed(scalar) * scale
+        print(f"{name:<14}{fast * 1e3:>10.1f}{args.points / fast / 1e6:>8.1f}"
+              f"{slow * 1e3:>11.1f}{args.points / slow / 1e6:>8.2f}{slow / fast:>9.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Property tests of stellarium.coords: round trips in every quadrant and
+close to the poles, agreement with plain scalar math, and the shared
+azimuth difference on floats and arrays.
+
+    PYTHONPATH=../src:../../../pyMetrics/src python -m pytest test_coords.py
+"""
+import math
+
+import numpy as np
+import pytest
+
+from stellarium import coords
+from stellarium.api import StellariumAPI
+
+# Scalar reference formulas, one point at a time
+def ref_radec_to_xyz(ra, dec):
+    ra, dec = math.radians(ra * 15.0), math.radians(dec)
+    return [math.cos(dec) * math.cos(ra), math.cos(dec) * math.sin(ra), math.sin(dec)]
+
+def ref_altaz_to_xyz(alt, az):
+    alt, az = math.radians(alt), math.radians(az)
+    return [-math.cos(alt) * math.cos(az), math.cos(alt) * math.sin(az), math.sin(alt)]
+
+def ref_xyz_to_radec(x, y, z):
+    return [math.degrees(math.atan2(y, x)) / 15.0 % 24.0, math.degrees(math.asin(z))]
+
+def ref_xyz_to_altaz(x, y, z):
+    return [math.degrees(math.asin(z)), math.degrees(math.atan2(y, -x)) % 360.0]
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    n = 20000
+    lon = rng.uniform(0.0, 360.0, n)
+    lat = np.degrees(np.arcsin(rng.uniform(-1.0, 1.0, n)))
+    # Quadrant boundaries and the poles
+    edges = np.array([0.0, 90.0, 180.0, 270.0, 359.999999])
+    lon = np.concatenate([lon, np.repeat(edges, 4), [10.0, 190.0, 10.0, 190.0]])
+    lat = np.concatenate([lat, np.tile([-89.9999, -45.0, 45.0, 89.9999], 5),
+                          [89.99999999, 89.99999999, -89.99999999, -89.99999999]])
+    return lon, lat
+
+def angle_error(a, b):
+    """Largest |a - b| in degrees, modulo a full turn."""
+    return np.max(np.abs(coords.delta_azm(np.asarray(a), np.asarray(b))))
+
+def test_radec_round_trip(points):
+    lon, lat = points
+    ra, dec = coords.xyz_to_radec(coords.radec_to_xyz(lon / 15.0, lat))
+    assert np.max(np.abs(dec - lat)) < 1e-9
+    # RA is undefined at the poles
+    away = np.abs(lat) < 89.9
+    assert angle_error(ra[away] * 15.0, lon[away]) < 1e-9
+    assert np.all((ra >= 0.0) & (ra < 24.0))
+
+def test_altaz_round_trip(points):
+    az, alt = points
+    alt2, az2 = coords.xyz_to_altaz(coords.altaz_to_xyz(alt, az))
+    assert np.max(np.abs(alt2 - alt)) < 1e-9
+    away = np.abs(alt) < 89.9
+    assert angle_error(az2[away], az[away]) < 1e-9
+    assert np.all((az2 >= 0.0) & (az2 < 360.0))
+
+def test_agrees_with_the_scalar_formulas(points):
+    lon, lat = points
+    sample = slice(None, None, 97)
+    xyz = coords.radec_to_xyz(lon / 15.0, lat)
+    ref = np.array([ref_radec_to_xyz(r / 15.0, d) for r, d in zip(lon[sample], lat[sample])])
+    assert np.max(np.abs(xyz[sample] - ref)) < 1e-12
+    ra, dec = coords.xyz_to_radec(xyz[sample])
+    ref = np.array([ref_xyz_to_radec(*p) for p in xyz[sample]])
+    assert angle_error(ra * 15.0, ref[:, 0] * 15.0) < 1e-9
+    assert np.max(np.abs(dec - ref[:, 1])) < 1e-6   # asin loses precision near the poles
+
+    xyz = coords.altaz_to_xyz(lat, lon)
+    ref = np.array([ref_altaz_to_xyz(a, z) for a, z in zip(lat[sample], lon[sample])])
+    assert np.max(np.abs(xyz[sample] - ref)) < 1e-12
+    alt, az = coords.xyz_to_altaz(xyz[sample])
+    ref = np.array([ref_xyz_to_altaz(*p) for p in xyz[sample]])
+    assert np.max(np.abs(alt - ref[:, 0])) < 1e-6
+    assert angle_error(az, ref[:, 1]) < 1e-9
+
+def test_api_single_points_use_coords():
+    api = StellariumAPI("http://localhost:0/api")
+    for alt, az in ((10.0, 20.0), (-30.0, 200.0), (89.0, 359.0), (0.0, 90.0)):
+        xyz = api.altaz_to_xyz(alt, az)
+        assert isinstance(xyz, list) and len(xyz) == 3
+        assert xyz == pytest.approx(ref_altaz_to_xyz(alt, az), abs=1e-12)
+        assert api.xyz_to_altaz(*xyz) == pytest.approx([alt, az], abs=1e-9)
+    for ra, dec in ((1.0, 20.0), (13.0, -60.0), (23.9, 5.0)):
+        xyz = api.radec_to_xyz(ra, dec)
+        assert xyz == pytest.approx(ref_radec_to_xyz(ra, dec), abs=1e-12)
+        assert api.xyz_to_radec(*xyz) == pytest.approx([ra, dec], abs=1e-9)
+        assert all(isinstance(v, float) for v in api.xyz_to_radec(*xyz))
+
+def test_delta_azm():
+    rng = np.random.default_rng(1)
+    cmd = rng.uniform(-720.0, 720.0, 10000)
+    cur = rng.uniform(-720.0, 720.0, 10000)
+    delta = coords.delta_azm(cmd, cur)
+    assert np.all((delta > -180.0) & (delta <= 180.0))
+    assert np.allclose(np.cos(np.radians(cur + delta - cmd)), 1.0)
+    # Floats give floats and match the arrays
+    for c, u, d in zip(cmd[:100], cur[:100], delta[:100]):
+        value = coords.delta_azm(float(c), float(u))
+        assert isinstance(value, float) and value == pytest.approx(d)
+    assert coords.delta_azm(10.0, 190.0) == 180.0
+    assert coords.delta_azm(190.0, 10.0) == 180.0
+    assert coords.delta_azm(0.0, 359.0) == pytest.approx(1.0)
+    assert coords.delta_azm(359.0, 0.0) == pytest.approx(-1.0)
@@ -0,0 +1,99 @@
+"""
+Write and read throughput of the STORAGE archive at multi-GB sizes.
+
+The Storage component runs on the stand-ins with its archive in a
+temporary directory (archiveDir). Observations of M random frames of the
+camera's size are stored until --gb GB are archived, then the component
+is activated again on the same directory, which rebuilds the index from
+the segment footers, and every observation is read back in random order
+(each image copied out of its mmap). Before reading, the segment pages
+are dropped from the page cache (posix_fadvise), so reads come from the
+disk unless --warm is given. Printed: write, rebuild and read times and
+throughput.
+
+    python archive_benchmark.py
+    python archive_benchmark.py --gb 4 -m 10 --no-fsync
+"""
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import standins
+
+FRAME_BYTES = 384 * 216
+
+def make_proposal(pid, m, rng):
+    import TYPES
+    return TYPES.Proposal(pid, [TYPES.Target(i, TYPES.Position(rng.uniform(0.0, 360.0),
+                                                               rng.uniform(20.0, 80.0)), 1)
+                                for i in range(m)], 2)
+
+def drop_cache(directory):
+    for path in Path(directory).glob("*.seg"):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--gb", type=float, default=2.0, help="GB of images to archive")
+    parser.add_argument("-m", "--images", type=int, default=5, help="images per observation")
+    parser.add_argument("--no-fsync", action="store_true")
+    parser.add_argument("--warm", action="store_true", help="read from the page cache")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    standins.install()
+    from AstroStorage.Storage import Storage
+
+    rng = random.Random(args.seed)
+    # A pool of random frames, so generating them does not count as writing
+    frames = [os.urandom(FRAME_BYTES) for _ in range(64)]
+    per_observation = args.images * FRAME_BYTES
+    count = max(1, int(args.gb * 1e9 // per_observation))
+    attributes = {"fsync": str(not args.no_fsync).lower()}
+
+    with tempfile.TemporaryDirectory(prefix="archive-benchmark-") as workdir:
+        attributes["archiveDir"] = workdir
+        container = standins.Container()
+        storage = container.activate("STORAGE", Storage, attributes)
+        start = time.perf_counter()
+        for _ in range(count):
+            pid = storage.getNextValidId()
+            storage.storeObservation(make_proposal(pid, args.images, rng),
+                                     [rng.choice(frames) for _ in range(args.images)])
+        written = time.perf_counter() - start
+        container.shutdown()
+        total = count * per_observation / 1e9
+        segments = len(list(Path(workdir).glob("*.seg")))
+        print(f"{count} observations of {args.images} x {FRAME_BYTES} bytes, "
+              f"{total:.2f} GB in {segments} segments, fsync {not args.no_fsync}")
+        print(f"write    {written:8.2f} s {total * 1e3 / written:8.1f} MB/s "
+              f"{count / written:8.0f} observations/s")
+
+        if not args.warm:
+            drop_cache(workdir)
+        start = time.perf_counter()
+        storage = container.activate("STORAGE", Storage, attributes)
+        rebuilt = time.perf_counter() - start
+        print(f"rebuild  {rebuilt * 1e3:8.1f} ms for {len(storage.archive.pids())} observations")
+
+        pids = storage.archive.pids()
+        rng.shuffle(pids)
+        read = 0
+        start = time.perf_counter()
+        for pid in pids:
+            read += sum(len(bytes(image)) for image in storage.getObservation(pid))
+        elapsed = time.perf_counter() - start
+        print(f"read     {elapsed:8.2f} s {read / 1e6 / elapsed:8.1f} MB/s "
+              f"{len(pids) / elapsed:8.0f} observations/s ({'warm' if args.warm else 'cold'})")
+        container.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Bulk proposal ingestion of the DATABASE component: storeProposals against
+one storeProposal call per proposal.
+
+For each size N, N proposals of M targets are stored into an empty
+database once per path, and the time and proposals per second are
+printed. Every call commits (and syncs) on its own in the per-call path,
+the bulk path commits once. In-process calls only: a CORBA round trip
+per call would come on top of the per-call path.
+
+    python bulk_store_benchmark.py
+    python bulk_store_benchmark.py --sizes 1000 50000 -m 10
+"""
+import argparse
+import logging
+import random
+import tempfile
+import time
+
+import standins
+
+def proposals(n, m, seed):
+    import TYPES
+    rng = random.Random(seed)
+    return [[TYPES.Target(i, TYPES.Position(rng.uniform(0.0, 360.0),
+                                            rng.uniform(20.0, 90.0)), 1)
+             for i in range(m)]
+            for _ in range(n)]
+
+def timed_store(path, batch):
+    """Seconds to store batch into a fresh database through path."""
+    with tempfile.TemporaryDirectory(prefix="bulk-store-benchmark-") as directory:
+        handler = standins.relocateDatabase(directory)
+        container = standins.Container()
+        try:
+            database = container.activate("DATABASE", handler.ProposalHandler, {})
+            start = time.perf_counter()
+            if path == "bulk":
+                pids = database.storeProposals(batch)
+            else:
+                pids = [database.storeProposal(targets) for targets in batch]
+            elapsed = time.perf_counter() - start
+            if len(set(pids)) != len(batch):
+                print(f"{path}: {len(set(pids))} pids for {len(batch)} proposals")
+            return elapsed
+        finally:
+            container.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("-m", "--targets", type=int, default=5,
+                        help="targets per proposal")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    standins.install()
+
+    print(f"{'N':>7}{'per-call s':>12}{'prop/s':>10}{'bulk s':>10}{'prop/s':>10}{'speed-up':>10}")
+    for size in args.sizes:
+        batch = proposals(size, args.targets, args.seed)
+        single = timed_store("per-call", batch)
+        bulk = timed_store("bulk", batch)
+        print(f"{size:>7}{single:>12.3f}{size / single:>10.0f}"
+              f"{bulk:>10.3f}{size / bulk:>10.0f}{single / bulk:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Compression ratio and speed of the DATABASE frame codecs.
+
+N frames are taken from the CAMERA component (synthetic image source) at
+random pointings, i.e. the bytes storeImage receives, and every codec
+registered in AstroDatabase.FrameCodec encodes and decodes all of them.
+Printed per codec: the stored size relative to raw, and the encode and
+decode throughput in MB of raw frame per second. Every frame is checked
+to decode back to the original.
+
+    python codec_benchmark.py
+    python codec_benchmark.py -n 20 --codecs raw zlib-fast
+"""
+import argparse
+import logging
+import random
+import time
+
+import standins
+
+def frames(count, seed):
+    from astrocam.AstrocamComponent import AstrocamComponent
+    from stellarium.api import StellariumAPI
+    from stellarium.StellariumComponent import StellariumComponent
+    stellarium = standins.FakeStellarium().start()
+    StellariumAPI.STELLARIUM_URL = stellarium.url
+    container = standins.Container()
+    rng = random.Random(seed)
+    try:
+        telescope = container.activate("TELESCOPE_CONTROL", StellariumComponent, {})
+        camera = container.activate("CAMERA", AstrocamComponent, {"imageSource": "synthetic"})
+        images = []
+        for _ in range(count):
+            telescope.api.move_to_altaz(rng.uniform(20.0, 80.0), rng.uniform(0.0, 360.0))
+            telescope.sampler.refresh()
+            images.append(bytes(camera.getFrame("", "")))
+        return images
+    finally:
+        container.shutdown()
+        stellarium.stop()
+
+def best_of(repeat, call):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = call()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--frames", type=int, default=10)
+    parser.add_argument("--codecs", nargs="+")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="passes over the frames per codec, the fastest counts")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    standins.install()
+    from AstroDatabase import FrameCodec
+
+    images = frames(args.frames, args.seed)
+    raw = sum(len(image) for image in images) / 1e6
+    print(f"{len(images)} frames of {len(images[0])} bytes")
+    print(f"{'codec':<12}{'ratio':>8}{'encode MB/s':>13}{'decode MB/s':>13}")
+    for name in args.codecs or FrameCodec.names():
+        encode, encoded = best_of(
+            args.repeat, lambda: [FrameCodec.encode(name, image) for image in images])
+        decode, decoded = best_of(
+            args.repeat, lambda: [FrameCodec.decode(name, data) for data in encoded])
+        if decoded != images:
+            print(f"{name}: frames do not survive a round trip")
+        stored = sum(len(data) for data in encoded) / 1e6
+        print(f"{name:<12}{stored / raw:>8.3f}{raw / encode:>13.1f}{raw / decode:>13.1f}")
+
+if __name__ == "__main__":
+    main()
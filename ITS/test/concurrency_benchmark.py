@@ -0,0 +1,202 @@
+"""
+Multi-threaded stress benchmark of the DATABASE component, without ACS.
+
+T threads call the ProposalHandler concurrently, like the ORB threads
+serving the scheduler and the consoles do, with a random mix of
+
+    storeProposal      storeProposal + setProposalStatus(queued)
+    getProposalStatus  of a random stored proposal
+    getProposals       the scheduler poll
+    storeImage         one frame of an open proposal of the thread; after
+                       the last one the proposal goes running -> ready
+    retrieve           getProposalObservations of a ready proposal
+
+The same workload runs against each connection mode:
+
+    wal     the ConnectionPool: a connection per thread, WAL journal
+    delete  a connection per thread, rollback journal (readers and the
+            writer lock each other out)
+    single  one connection shared by all threads, every call serialised
+            on a lock (the design before the pool)
+
+and the throughput, p50/p99 latency of every operation and the number
+of failed calls are printed per mode.
+
+    python concurrency_benchmark.py
+    python concurrency_benchmark.py -t 16 -n 1000 --modes wal single
+"""
+import argparse
+import functools
+import logging
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import standins
+
+OPERATIONS = ("storeProposal", "getProposalStatus", "getProposals", "storeImage", "retrieve")
+WEIGHTS = (0.10, 0.45, 0.05, 0.30, 0.10)
+MODES = ("wal", "delete", "single")
+
+def pool_class(mode):
+    """The ConnectionPool replacement used by the handler in mode."""
+    from AstroDatabase.ConnectionPool import ConnectionPool
+
+    class RollbackJournalPool(ConnectionPool):
+        def __init__(self, db_file, **kwargs):
+            super().__init__(db_file, **kwargs)
+            self.connection().execute("PRAGMA journal_mode = DELETE")
+
+    class SharedConnection(RollbackJournalPool):
+        def connection(self):
+            with self._lock:
+                if not self._connections:
+                    self._connections.append(self._connect())
+                return self._connections[0]
+
+    return {"wal": ConnectionPool,
+            "delete": RollbackJournalPool,
+            "single": SharedConnection}[mode]
+
+class Serialised:
+    """Runs every call of the wrapped component under one lock."""
+
+    def __init__(self, component):
+        self._component = component
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        method = getattr(self._component, name)
+
+        @functools.wraps(method)
+        def call(*args):
+            with self._lock:
+                return method(*args)
+        return call
+
+class Worker(threading.Thread):
+    def __init__(self, database, handler, args, seed, start_barrier):
+        super().__init__()
+        self.database = database
+        self.handler = handler
+        self.args = args
+        self.rng = random.Random(seed)
+        self.start_barrier = start_barrier
+        self.frame = bytearray(self.rng.randbytes(args.frame_kb * 1024))
+        self.samples = {op: [] for op in OPERATIONS}
+        self.errors = 0
+        self.open = []      # [pid, [target ids without an image]]
+        self.ready = []
+
+    def run(self):
+        self.start_barrier.wait()
+        for _ in range(self.args.calls):
+            op = self.rng.choices(OPERATIONS, WEIGHTS)[0]
+            if op == "storeImage" and not self.open:
+                op = "storeProposal"
+            if op == "retrieve" and not self.ready:
+                op = "getProposalStatus"
+            start = time.perf_counter()
+            try:
+                getattr(self, op)()
+            except Exception as ex:
+                self.errors += 1
+                logging.debug(f"{op} failed: {ex!r}")
+                continue
+            self.samples[op].append(time.perf_counter() - start)
+
+    def storeProposal(self):
+        import TYPES
+        targets = [TYPES.Target(i, TYPES.Position(self.rng.uniform(0.0, 360.0),
+                                                  self.rng.uniform(20.0, 90.0)), 1)
+                   for i in range(self.args.targets)]
+        pid = self.database.storeProposal(targets)
+        self.database.setProposalStatus(pid, self.handler.STATUS_QUEUED_PROPOSAL)
+        # storeImage refers to the target rows, not to the astronomer's tids
+        tids = [t.tid for p in self.database.getProposals() if p.pid == pid
+                for t in p.targets]
+        self.open.append([pid, tids])
+
+    def getProposalStatus(self):
+        self.database.getProposalStatus(self.rng.randint(1, self.args.threads * self.args.calls))
+
+    def getProposals(self):
+        self.database.getProposals()
+
+    def storeImage(self):
+        entry = self.open[0]
+        pid, tids = entry
+        if len(tids) == self.args.targets:
+            self.database.setProposalStatus(pid, self.handler.STATUS_RUNNING)
+        # Distinct frames, so the FrameStore really writes each one
+        self.frame[:8] = self.rng.randbytes(8)
+        self.database.storeImage(pid, tids.pop(), bytes(self.frame))
+        if not tids:
+            self.database.setProposalStatus(pid, self.handler.STATUS_READY)
+            self.open.pop(0)
+            self.ready.append(pid)
+
+    def retrieve(self):
+        self.database.getProposalObservations(self.rng.choice(self.ready))
+
+def run_mode(mode, args):
+    workdir = tempfile.TemporaryDirectory(prefix=f"concurrency-benchmark-{mode}-")
+    handler = standins.relocateDatabase(workdir.name)
+    pool = handler.ConnectionPool
+    handler.ConnectionPool = pool_class(mode)
+    container = standins.Container()
+    try:
+        database = container.activate("DATABASE", handler.ProposalHandler,
+                                      {"groupCommit": args.group_commit})
+        if mode == "single":
+            database = Serialised(database)
+        barrier = threading.Barrier(args.threads + 1)
+        workers = [Worker(database, handler, args, args.seed + i, barrier)
+                   for i in range(args.threads)]
+        for worker in workers:
+            worker.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        container.shutdown()
+        handler.ConnectionPool = pool
+        workdir.cleanup()
+
+    calls = sum(len(s) for w in workers for s in w.samples.values())
+    errors = sum(w.errors for w in workers)
+    print(f"{mode}: {calls} calls in {elapsed:.2f} s, {calls / elapsed:.0f} calls/s, "
+          f"{errors} failed")
+    print(f"  {'operation':<18}{'count':>7}{'p50 ms':>10}{'p99 ms':>10}")
+    for op in OPERATIONS:
+        values = np.array([x for w in workers for x in w.samples[op]]) * 1000.0
+        if values.size:
+            print(f"  {op:<18}{values.size:>7}{np.percentile(values, 50):>10.2f}"
+                  f"{np.percentile(values, 99):>10.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-t", "--threads", type=int, default=8)
+    parser.add_argument("-n", "--calls", type=int, default=500,
+                        help="calls per thread")
+    parser.add_argument("-m", "--targets", type=int, default=5,
+                        help="targets per proposal")
+    parser.add_argument("--frame-kb", type=int, default=64)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--group-commit", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+    standins.install()
+    for mode in args.modes:
+        run_mode(mode, args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+HTTP request latency of StellariumAPI against the fake Stellarium.
+
+    keep-alive  get_altaz through the pooled session
+    close       the same with "Connection: close", i.e. a new TCP
+                connection per request (what requests.get/post did)
+
+Latency is measured client-side around each call. Then T threads share
+one StellariumAPI, as the async workers, the position sampler and the
+CORBA threads of the component do, once with the former 4-connection
+pool and once with a pool sized for the threads; printed are the
+throughput, the latency and the number of TCP connections the server had
+to accept.
+
+    python http_benchmark.py
+    python http_benchmark.py -n 2000 -t 12
+    python http_benchmark.py --delay 5
+"""
+import argparse
+import logging
+import threading
+import time
+
+import numpy as np
+
+import standins
+
+def latencies(api, count):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        api.get_altaz()
+        samples.append(time.perf_counter() - start)
+    return np.array(samples) * 1000.0
+
+def report(label, samples, elapsed, connections):
+    print(f"{label:<22}{samples.size / elapsed:>9.0f}{np.percentile(samples, 50):>9.3f}"
+          f"{np.percentile(samples, 99):>9.3f}{connections:>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--requests", type=int, default=1000,
+                        help="requests per measurement (per thread when threaded)")
+    parser.add_argument("-t", "--threads", type=int, default=6)
+    parser.add_argument("--delay", type=float, default=0.0,
+                        help="ms the fake Stellarium takes per response")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    standins.install()
+    from stellarium.api import StellariumAPI
+
+    stellarium = standins.FakeStellarium(args.delay / 1000.0).start()
+    try:
+        print(f"{'':<22}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'conns':>8}")
+        for label, close in (("keep-alive", False), ("close", True)):
+            api = StellariumAPI(stellarium.url)
+            if close:
+                api.session.headers["Connection"] = "close"
+            opened = stellarium.connections
+            start = time.perf_counter()
+            samples = latencies(api, args.requests)
+            report(label, samples, time.perf_counter() - start,
+                   stellarium.connections - opened)
+            api.close()
+
+        for pool_size in (4, args.threads):
+            api = StellariumAPI(stellarium.url, pool_size=pool_size)
+            results = [None] * args.threads
+            def worker(i):
+                results[i] = latencies(api, args.requests)
+            threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+            opened = stellarium.connections
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            report(f"{args.threads} threads, pool {pool_size}", np.concatenate(results),
+                   time.perf_counter() - start, stellarium.connections - opened)
+            api.close()
+    finally:
+        stellarium.stop()
+
+if __name__ == "__main__":
+    main()
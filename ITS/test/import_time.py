@@ -0,0 +1,76 @@
+"""
+Import time of the modules the Python components load, against a budget.
+
+For each module, python -X importtime is run in a fresh interpreter with
+the repository sources on the path. A module fails if its cumulative
+import time is over the budget or if importing it loads one of the
+modules its component defers to first use. The exit status is 1 if any
+module failed.
+
+    python import_time.py
+    python import_time.py CAMERA --budget 0.3
+    python import_time.py --module stellarium.api --defer numpy
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+import standins
+
+# Per component: the modules it loads and the modules they must not load
+COMPONENTS = {
+    "TELESCOPE_CONTROL": (("stellarium.api", "stellarium.async_api"), ("numpy",)),
+    "CAMERA": (("astrocam.api", "astrocam.prefetch"), ("astropy", "astroquery", "matplotlib")),
+}
+BUDGET = 0.5     # s
+
+def import_time(module, deferred):
+    """
+    Cumulative import time of module in seconds, from python -X importtime,
+    and which of the deferred modules it loaded.
+    """
+    code = f"import sys, {module}; print(*[m for m in {tuple(deferred)!r} if m in sys.modules])"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(map(str, standins.SOURCES)))
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                         capture_output=True, text=True, check=True, env=env)
+    cumulative = 0
+    for line in out.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)", line)
+        if match and match.group(2) == module:
+            cumulative = int(match.group(1))
+    return cumulative / 1e6, out.stdout.split()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("components", nargs="*", metavar="COMPONENT",
+                        help=f"one of {', '.join(COMPONENTS)} (default: all)")
+    parser.add_argument("--module", action="append", default=[],
+                        help="check this module instead")
+    parser.add_argument("--defer", action="append", default=[],
+                        help="module that --module must not load")
+    parser.add_argument("--budget", type=float, default=BUDGET, help="seconds per module")
+    args = parser.parse_args()
+
+    unknown = set(args.components) - set(COMPONENTS)
+    if unknown:
+        parser.error(f"unknown component {', '.join(sorted(unknown))}")
+    if args.module:
+        checks = [(module, args.defer) for module in args.module]
+    else:
+        checks = []
+        for name in args.components or COMPONENTS:
+            modules, deferred = COMPONENTS[name]
+            checks += [(module, deferred) for module in modules]
+    failed = False
+    for module, deferred in checks:
+        seconds, loaded = import_time(module, deferred)
+        ok = seconds <= args.budget and not loaded
+        failed |= not ok
+        print(f"{module}: {seconds:.3f} s (budget {args.budget:g} s)"
+              f"{' loads ' + ', '.join(loaded) if loaded else ''} {'OK' if ok else 'FAIL'}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
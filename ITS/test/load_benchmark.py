@@ -0,0 +1,171 @@
+"""
+End-to-end load benchmark of the observation pipeline, without ACS.
+
+ProposalHandler (DATABASE), StellariumComponent (TELESCOPE_CONTROL) and
+AstrocamComponent (CAMERA) run in this process on top of the stand-ins in
+standins.py, against a fake Stellarium and the synthetic image source.
+N proposals of M targets each go through
+
+    store      storeProposal + setProposalStatus(queued)
+    queue      getProposals
+    start      setProposalStatus(running)
+    slew       telescope setTo (closed loop), or a direct move with --direct
+    frame      camera getFrame
+    storeImage database storeImage
+    ready      setProposalStatus(ready)
+    retrieve   getProposalObservations
+
+and the throughput, p50/p99 latency of every stage and the peak RSS are
+printed. The database and frames go to a temporary directory. With
+--metrics the components record their AstroMetrics metrics and write
+them to the given Prometheus text file.
+
+    python load_benchmark.py -n 20 -m 5
+    python load_benchmark.py -n 200 -m 10 --direct --group-commit
+    python load_benchmark.py --direct --metrics metrics.prom
+"""
+import argparse
+import logging
+import random
+import resource
+import tempfile
+import time
+
+import numpy as np
+
+import standins
+
+STAGES = ("store", "queue", "start", "slew", "frame", "storeImage", "ready", "retrieve")
+
+class Timings:
+    def __init__(self):
+        self.samples = {stage: [] for stage in STAGES}
+
+    def time(self, stage, call, *args):
+        start = time.perf_counter()
+        result = call(*args)
+        self.samples[stage].append(time.perf_counter() - start)
+        return result
+
+    def report(self, elapsed, proposals, frames):
+        print(f"{proposals} proposals, {frames} frames in {elapsed:.2f} s: "
+              f"{proposals / elapsed:.2f} proposals/s, {frames / elapsed:.2f} frames/s")
+        print(f"{'stage':<12}{'count':>7}{'total s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+        for stage in STAGES:
+            values = np.array(self.samples[stage]) * 1000.0
+            if values.size == 0:
+                continue
+            print(f"{stage:<12}{values.size:>7}{values.sum() / 1000.0:>10.2f}"
+                  f"{np.percentile(values, 50):>10.2f}{np.percentile(values, 99):>10.2f}")
+        # ru_maxrss is in kB on Linux
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+        print(f"peak RSS {peak:.1f} MB")
+
+def make_proposals(n, m, spread, seed):
+    """n lists of m Targets around a few pointings, spread degrees apart."""
+    import TYPES
+    rng = random.Random(seed)
+    proposals = []
+    for _ in range(n):
+        az0 = rng.uniform(0.0, 360.0)
+        el0 = rng.uniform(20.0 + spread, 70.0 - spread)
+        proposals.append([
+            TYPES.Target(i, TYPES.Position((az0 + rng.uniform(-spread, spread)) % 360.0,
+                                           el0 + rng.uniform(-spread, spread)), 1)
+            for i in range(m)])
+    return proposals
+
+def run(args):
+    standins.install()
+    from stellarium.api import StellariumAPI
+    from stellarium.StellariumComponent import StellariumComponent
+    from astrocam.AstrocamComponent import AstrocamComponent
+
+    workdir = tempfile.TemporaryDirectory(prefix="load-benchmark-")
+    handler = standins.relocateDatabase(workdir.name)
+
+    stellarium = standins.FakeStellarium().start()
+    StellariumAPI.STELLARIUM_URL = stellarium.url
+    metrics = {"metrics": args.metrics is not None, "metricsFile": args.metrics or ""}
+    container = standins.Container()
+    try:
+        telescope = container.activate("TELESCOPE_CONTROL", StellariumComponent,
+                                       {"samplingPeriod": 1.0, "maxSampleAge": 2.0,
+                                        **metrics})
+        camera = container.activate("CAMERA", AstrocamComponent,
+                                    {"imageSource": "synthetic", **metrics})
+        database = container.activate("DATABASE", handler.ProposalHandler,
+                                      {"groupCommit": args.group_commit,
+                                       "frameCodec": args.codec, **metrics})
+        camera.getFrame("", "")     # first frame builds the synthetic sky
+
+        timings = Timings()
+        proposals = make_proposals(args.proposals, args.targets, args.spread, args.seed)
+        start = time.perf_counter()
+        frames = 0
+
+        def slew(alt, az):
+            if args.direct:
+                telescope.api.move_to_altaz(alt, az)
+                telescope.sampler.refresh()
+            else:
+                telescope.setTo(alt, az)
+
+        def store(targets):
+            pid = database.storeProposal(targets)
+            database.setProposalStatus(pid, handler.STATUS_QUEUED_PROPOSAL)
+            return pid
+
+        for targets in proposals:
+            timings.time("store", store, targets)
+
+        while True:
+            queued = timings.time("queue", database.getProposals)
+            if not queued:
+                break
+            # Like the scheduler, observe one proposal and look at the queue again
+            proposal = queued[0]
+            timings.time("start", database.setProposalStatus,
+                         proposal.pid, handler.STATUS_RUNNING)
+            for target in proposal.targets:
+                timings.time("slew", slew, target.coordinates.el, target.coordinates.az)
+                image = timings.time("frame", camera.getFrame, "", "")
+                timings.time("storeImage", database.storeImage,
+                             proposal.pid, target.tid, image)
+                frames += 1
+            timings.time("ready", database.setProposalStatus,
+                         proposal.pid, handler.STATUS_READY)
+            images = timings.time("retrieve", database.getProposalObservations, proposal.pid)
+            if len(images) != len(proposal.targets):
+                print(f"Proposal {proposal.pid}: {len(images)} images "
+                      f"for {len(proposal.targets)} targets")
+
+        elapsed = time.perf_counter() - start
+        timings.report(elapsed, len(proposals), frames)
+        print(f"{stellarium.requests} requests to the fake Stellarium")
+    finally:
+        container.shutdown()
+        stellarium.stop()
+        workdir.cleanup()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--proposals", type=int, default=10)
+    parser.add_argument("-m", "--targets", type=int, default=5,
+                        help="targets per proposal")
+    parser.add_argument("--spread", type=float, default=2.0,
+                        help="deg, targets of a proposal lie within this of its pointing")
+    parser.add_argument("--direct", action="store_true",
+                        help="jump to the targets instead of slewing (pipeline overhead only)")
+    parser.add_argument("--group-commit", action="store_true")
+    parser.add_argument("--codec", default="raw")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="enable the components' metrics, written to FILE at the end")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    run(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Per-call cost of the storeImage log messages of the DATABASE component.
+
+Times the two messages storeImage used to log for every frame
+
+    before  logger.info(f"... that looks like {image}") and the size/type line
+    after   RateLimitedLog.info("... %s", Payload(image)), as storeImage does now
+
+for frames of several sizes, with the logger at INFO (records written to
+/dev/null through a formatting handler) and at WARNING (records dropped).
+
+    python logging_benchmark.py
+    python logging_benchmark.py --sizes 1 16 --calls 200
+"""
+import argparse
+import logging
+import os
+import time
+
+import standins
+
+def before(logger, pid, tid, image):
+    logger.info(f"Storing image for proposal {pid} and target {tid} that looks like  {image} ")
+    logger.info(f"Image size is {len(image)} bytes and its type is {type(image)}")
+
+def after(log, pid, tid, image):
+    from AstroDatabase.LogUtils import Payload
+    log.info("Storing image for proposal %d and target %d: %s", pid, tid, Payload(image))
+
+def per_call(calls, log, target, image):
+    """Mean seconds per log(target, 1, tid, image) call."""
+    start = time.perf_counter()
+    for tid in range(calls):
+        log(target, 1, tid, image)
+    return (time.perf_counter() - start) / calls
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=float, nargs="+", default=[0.1, 1.0, 4.0],
+                        help="frame sizes in MB")
+    parser.add_argument("--calls", type=int, default=50, help="calls per measurement")
+    args = parser.parse_args()
+    standins.install()
+    from AstroDatabase.LogUtils import RateLimitedLog
+
+    logger = logging.getLogger("logging-benchmark")
+    logger.propagate = False
+    sink = open(os.devnull, "w")
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    logger.addHandler(handler)
+
+    print(f"{'MB':>6}{'level':>9}{'before us':>12}{'after us':>11}{'speed-up':>10}")
+    for size in args.sizes:
+        image = os.urandom(int(size * 2**20))
+        for level in (logging.INFO, logging.WARNING):
+            logger.setLevel(level)
+            slow = per_call(args.calls, before, logger, image)
+            fast = per_call(args.calls, after, RateLimitedLog(logger), image)
+            print(f"{size:>6g}{logging.getLevelName(level):>9}{slow * 1e6:>12.1f}"
+                  f"{fast * 1e6:>11.2f}{slow / fast:>10.0f}x")
+    sink.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Scheduler poll latency of the DATABASE component as the queue grows.
+
+The queue is filled up to each size with proposals of M targets
+(storeProposals + setProposalStatus(queued)), then getProposals is timed,
+next to the per-proposal query loop it replaced (one SELECT of the
+targets for every queued proposal), and getVisibleProposals (elevations
+drawn from 10 to 90 deg, so some proposals are filtered out). A poll returns every queued
+proposal, so its total time grows with the queue; what should stay flat
+is the time per returned proposal.
+
+    python poll_benchmark.py
+    python poll_benchmark.py --sizes 10 1000 100000 -m 10
+"""
+import argparse
+import logging
+import random
+import tempfile
+import time
+
+import standins
+
+def per_proposal_poll(db, queued):
+    """The former getProposals: the queued pids, then one target query each."""
+    import TYPES
+    proposals = []
+    pids = db.execute("SELECT id, status FROM proposal WHERE status = ? ORDER BY id",
+                      (queued,)).fetchall()
+    for pid, status in pids:
+        rows = db.execute(
+            "SELECT id, az, el, exposure_time FROM target WHERE proposal_id = ? ORDER BY id",
+            (pid,)).fetchall()
+        targets = [TYPES.Target(tid, TYPES.Position(az, el), exp) for tid, az, el, exp in rows]
+        proposals.append(TYPES.Proposal(pid, targets, status))
+    return proposals
+
+def best_of(repeat, call, *args):
+    """Shortest of repeat timed calls (s) and the result of the last one."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = call(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+def run(args):
+    standins.install()
+    import TYPES
+    workdir = tempfile.TemporaryDirectory(prefix="poll-benchmark-")
+    handler = standins.relocateDatabase(workdir.name)
+    container = standins.Container()
+    rng = random.Random(args.seed)
+    try:
+        database = container.activate("DATABASE", handler.ProposalHandler, {})
+        db = database._pool.connection()
+        queued = 0
+        print(f"{'queued':>8}{'poll ms':>10}{'us/prop':>9}"
+              f"{'loop ms':>10}{'us/prop':>9}{'visible ms':>12}{'visible':>9}")
+        for size in sorted(args.sizes):
+            while queued < size:
+                batch = min(size - queued, 10000)
+                pids = database.storeProposals([
+                    [TYPES.Target(i, TYPES.Position(rng.uniform(0.0, 360.0),
+                                                    rng.uniform(10.0, 90.0)), 1)
+                     for i in range(args.targets)]
+                    for _ in range(batch)])
+                for pid in pids:
+                    database.setProposalStatus(pid, handler.STATUS_QUEUED_PROPOSAL)
+                queued += batch
+
+            repeat = max(1, min(args.repeat, 100000 // size))
+            joined, proposals = best_of(repeat, database.getProposals)
+            looped, reference = best_of(repeat, per_proposal_poll, db,
+                                        handler.STATUS_QUEUED_PROPOSAL)
+            filtered, visible = best_of(repeat, database.getVisibleProposals)
+            if [(p.pid, [t.tid for t in p.targets]) for p in proposals] != \
+                    [(p.pid, [t.tid for t in p.targets]) for p in reference]:
+                print(f"{size}: getProposals and the per-proposal loop disagree")
+            print(f"{size:>8}{joined * 1e3:>10.2f}{joined / size * 1e6:>9.2f}"
+                  f"{looped * 1e3:>10.2f}{looped / size * 1e6:>9.2f}"
+                  f"{filtered * 1e3:>12.2f}{len(visible):>9}", flush=True)
+    finally:
+        container.shutdown()
+        workdir.cleanup()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument("-m", "--targets", type=int, default=5,
+                        help="targets per proposal")
+    parser.add_argument("--repeat", type=int, default=20,
+                        help="polls per size, the fastest counts (fewer for large queues)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    # Not the warnings about the proposals that will never be visible
+    logging.basicConfig(level=logging.ERROR)
+    run(args)
+
+if __name__ == "__main__":
+    main()
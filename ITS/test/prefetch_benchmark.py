@@ -0,0 +1,92 @@
+"""
+Frame latency of the CAMERA with and without prefetching.
+
+The Scheduler's loop over the targets of a proposal is replayed against
+TELESCOPE_CONTROL (fake Stellarium) and the CAMERA (synthetic image
+source, every fetch delayed by --latency seconds as a SkyView download
+would be): slew (--slew seconds), getFrame, expose (--exposure seconds),
+next target. With prefetching the camera is told the current and the
+next target before each slew, as the Scheduler does. Printed per mode:
+the getFrame latency (mean and worst), the prefetch hits and misses and
+the total time of the proposal.
+
+    python prefetch_benchmark.py
+    python prefetch_benchmark.py -n 20 --latency 3 --slew 2
+"""
+import argparse
+import logging
+import random
+import time
+from types import SimpleNamespace
+
+import standins
+
+class SlowFetcher:
+    """Fetcher delayed by latency seconds per call."""
+    def __init__(self, fetcher, latency):
+        self.fetcher = fetcher
+        self.latency = latency
+
+    def __call__(self, *args):
+        time.sleep(self.latency)
+        return self.fetcher(*args)
+
+def targets(count, seed):
+    rng = random.Random(seed)
+    return [SimpleNamespace(tid=i, expTime=1, coordinates=SimpleNamespace(
+                el=rng.uniform(20.0, 80.0), az=rng.uniform(0.0, 360.0)))
+            for i in range(count)]
+
+def observe(telescope, camera, plan, args, prefetch):
+    latencies = []
+    started = time.perf_counter()
+    for n, target in enumerate(plan):
+        if prefetch:
+            camera.prefetch(plan[n:n + 2])
+        telescope.api.move_to_altaz(target.coordinates.el, target.coordinates.az)
+        time.sleep(args.slew)
+        telescope.sampler.refresh()
+        start = time.perf_counter()
+        camera.getFrame("", "")
+        latencies.append(time.perf_counter() - start)
+        time.sleep(args.exposure)
+    return latencies, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--targets", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=1.0, help="seconds per fetch")
+    parser.add_argument("--slew", type=float, default=1.0, help="seconds per slew")
+    parser.add_argument("--exposure", type=float, default=0.5, help="seconds per exposure")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    standins.install()
+    from astrocam.AstrocamComponent import AstrocamComponent
+    from stellarium.api import StellariumAPI
+    from stellarium.StellariumComponent import StellariumComponent
+
+    stellarium = standins.FakeStellarium().start()
+    StellariumAPI.STELLARIUM_URL = stellarium.url
+    container = standins.Container()
+    try:
+        telescope = container.activate("TELESCOPE_CONTROL", StellariumComponent, {})
+        camera = container.activate("CAMERA", AstrocamComponent, {"imageSource": "synthetic"})
+        camera.api.fetcher = SlowFetcher(camera.api.fetcher, args.latency)
+        plan = targets(args.targets, args.seed)
+        print(f"{len(plan)} targets, {args.latency:.1f} s per fetch, "
+              f"{args.slew:.1f} s per slew, {args.exposure:.1f} s per exposure")
+        print(f"{'mode':<10}{'mean ms':>9}{'max ms':>9}{'hits':>6}{'misses':>8}{'total s':>9}")
+        for name, prefetch in (("fetch", False), ("prefetch", True)):
+            camera.prefetcher.clear()
+            camera.prefetcher.hits = camera.prefetcher.misses = 0
+            latencies, total = observe(telescope, camera, plan, args, prefetch)
+            print(f"{name:<10}{sum(latencies) / len(latencies) * 1e3:>9.0f}"
+                  f"{max(latencies) * 1e3:>9.0f}{camera.prefetcher.hits:>6}"
+                  f"{camera.prefetcher.misses:>8}{total:>9.1f}")
+    finally:
+        container.shutdown()
+        stellarium.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Memory and latency of retrieving a large proposal from the DATABASE component.
+
+One READY proposal of N frames of S MB each is stored in a temporary
+database, then read back by each retrieval method:
+
+    list   getProposalObservations, every frame in one list
+    iter   iterProposalObservations, one frame at a time
+    page   getProposalObservationsPage, --page frames per call
+
+Every method runs in a fresh Python process, so the peak RSS of one does
+not hide another. The consumer looks at each frame and drops it. Printed
+per method: time to the first frame, total time, and the peak RSS
+growth over the process RSS before the retrieval started.
+
+    python retrieval_benchmark.py
+    python retrieval_benchmark.py -n 100 --frame-mb 8 --page 4
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import standins
+
+METHODS = ("list", "iter", "page")
+
+def rss_mb():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+def peak_rss_mb():
+    # ru_maxrss is in kB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+def fill(directory, args):
+    """Stores the READY proposal; returns its pid."""
+    import TYPES
+    handler = standins.relocateDatabase(directory)
+    database = standins.Container().activate("DATABASE", handler.ProposalHandler, {})
+    try:
+        pid = database.storeProposal(
+            [TYPES.Target(i, TYPES.Position(0.0, 45.0), 1) for i in range(args.frames)])
+        database.setProposalStatus(pid, handler.STATUS_QUEUED_PROPOSAL)
+        database.setProposalStatus(pid, handler.STATUS_RUNNING)
+        frame = bytearray(os.urandom(int(args.frame_mb * 2**20)))
+        tids = database._pool.connection().execute(
+            "SELECT id FROM target WHERE proposal_id = ?", (pid,)).fetchall()
+        for i, (tid,) in enumerate(tids):
+            frame[:8] = i.to_bytes(8, "little")
+            database.storeImage(pid, tid, bytes(frame))
+        database.setProposalStatus(pid, handler.STATUS_READY)
+        return pid
+    finally:
+        # Not cleanUp(): that empties the database, the next process reads it
+        database._pool.close()
+
+def retrieve(directory, pid, method, page):
+    """Runs in the child: retrieves the proposal, returns the measurements."""
+    handler = standins.relocateDatabase(directory)
+    database = standins.Container().activate("DATABASE", handler.ProposalHandler, {})
+    try:
+        if method == "list":
+            frames = lambda: iter(database.getProposalObservations(pid))
+        elif method == "iter":
+            frames = lambda: database.iterProposalObservations(pid)
+        else:
+            def frames():
+                offset = 0
+                while True:
+                    images = database.getProposalObservationsPage(pid, offset, page)
+                    if not images:
+                        return
+                    offset += len(images)
+                    yield from images
+
+        before = rss_mb()
+        start = time.perf_counter()
+        first = None
+        count = size = 0
+        for frame in frames():
+            if first is None:
+                first = time.perf_counter() - start
+            count += 1
+            size += len(frame)
+            del frame
+        total = time.perf_counter() - start
+        return {"frames": count, "bytes": size, "first": first, "total": total,
+                "peak": peak_rss_mb() - before}
+    finally:
+        database._pool.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--frames", type=int, default=50)
+    parser.add_argument("--frame-mb", type=float, default=4.0)
+    parser.add_argument("--page", type=int, default=1, help="frames per page call")
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=list(METHODS))
+    parser.add_argument("--child", nargs=3, metavar=("DIR", "PID", "METHOD"),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    standins.install()
+
+    if args.child:
+        directory, pid, method = args.child
+        print(json.dumps(retrieve(directory, int(pid), method, args.page)))
+        return
+
+    with tempfile.TemporaryDirectory(prefix="retrieval-benchmark-") as directory:
+        pid = fill(directory, args)
+        print(f"{args.frames} frames of {args.frame_mb:g} MB, page of {args.page}")
+        print(f"{'method':<8}{'first ms':>10}{'total s':>10}{'peak RSS MB':>13}")
+        for method in args.methods:
+            out = subprocess.run(
+                [sys.executable, __file__, "--page", str(args.page),
+                 "--child", directory, str(pid), method],
+                check=True, capture_output=True, text=True).stdout
+            result = json.loads(out.splitlines()[-1])
+            if result["frames"] != args.frames:
+                print(f"{method}: {result['frames']} of {args.frames} frames")
+            print(f"{method:<8}{result['first'] * 1e3:>10.1f}{result['total']:>10.2f}"
+                  f"{result['peak']:>13.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Slew time saved by the Scheduler's ordering, against first come first
+served.
+
+The SCHEDULER component runs on the stand-ins with the real DATABASE
+(in a temporary directory) and a simulated TELESCOPE: observe() does not
+move anything but adds the slew time to a simulated clock, the travel of
+the slower axis (azimuth the short way round) at --rate deg/s plus
+--settle seconds, and the exposure time. N proposals of M targets at
+random positions above the horizon are queued and observed until all are
+ready, once in the Scheduler's order (nearest proposal, nearest neighbour
++ 2-opt within it) and once in FIFO order (proposals by pid, targets as
+submitted). Printed per order: the total slew in degrees, the simulated
+slew and total time, and the wall time spent choosing.
+
+    python scheduler_benchmark.py
+    python scheduler_benchmark.py -n 50 -m 10 --rate 1.5
+"""
+import argparse
+import logging
+import random
+import tempfile
+import time
+
+import standins
+
+class SimulatedTelescope:
+    """TELESCOPE whose observe() only advances a simulated clock."""
+    def __init__(self, rate, settle):
+        import TYPES
+        self.rate = rate
+        self.settle = settle
+        self.position = TYPES.Position(0.0, 90.0)
+        self.slew = 0.0        # deg
+        self.clock = 0.0       # s
+        self.slew_time = 0.0   # s
+
+    def _get_name(self):
+        return "TELESCOPE"
+
+    def getCurrentPosition(self):
+        return self.position
+
+    def observe(self, coordinates, expTime):
+        from AstroScheduler import Route
+        cost = Route.slew_cost((self.position.az, self.position.el),
+                               (coordinates.az, coordinates.el))
+        seconds = cost / self.rate + self.settle
+        self.slew += cost
+        self.slew_time += seconds
+        self.clock += seconds + expTime
+        self.position = coordinates
+        return b"\0" * 16
+
+def fifo(start, proposals):
+    """Route.next_proposal replacement: oldest proposal, targets as submitted."""
+    from AstroScheduler import Route
+    if not proposals:
+        return None
+    proposal = min(proposals, key=lambda p: p.pid)
+    points = Route.target_positions(proposal)
+    order = list(range(len(points)))
+    return proposal, order, Route.route_cost(start, points, order)
+
+def make_proposals(n, m, seed):
+    import TYPES
+    rng = random.Random(seed)
+    return [[TYPES.Target(i, TYPES.Position(rng.uniform(0.0, 360.0), rng.uniform(30.0, 85.0)),
+                          rng.choice((10, 30, 60)))
+             for i in range(m)]
+            for _ in range(n)]
+
+def observe_all(handler, choose, args):
+    from AstroScheduler import Route
+    from AstroScheduler.Scheduler import Scheduler
+    container = standins.Container()
+    telescope = SimulatedTelescope(args.rate, args.settle)
+    container.components["TELESCOPE"] = telescope
+    next_proposal = Route.next_proposal
+    choosing = [0.0]
+
+    def timed(start, proposals):
+        started = time.perf_counter()
+        try:
+            return choose(start, proposals)
+        finally:
+            choosing[0] += time.perf_counter() - started
+
+    Route.next_proposal = timed
+    try:
+        database = container.activate("DATABASE", handler.ProposalHandler, {})
+        pids = []
+        for targets in make_proposals(args.proposals, args.targets, args.seed):
+            pid = database.storeProposal(targets)
+            database.setProposalStatus(pid, handler.STATUS_QUEUED_PROPOSAL)
+            pids.append(pid)
+        scheduler = container.activate("SCHEDULER", Scheduler, {})
+        scheduler.start()
+        while any(database.getProposalStatus(pid) != handler.STATUS_READY for pid in pids):
+            time.sleep(0.05)
+        scheduler.stop()
+    finally:
+        Route.next_proposal = next_proposal
+        container.components.pop("TELESCOPE", None)
+        container.shutdown()
+    return telescope, choosing[0]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--proposals", type=int, default=20)
+    parser.add_argument("-m", "--targets", type=int, default=8,
+                        help="targets per proposal")
+    parser.add_argument("--rate", type=float, default=3.0, help="deg/s per axis")
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds per slew")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    standins.install()
+    from AstroScheduler import Route
+
+    print(f"{args.proposals} proposals of {args.targets} targets, "
+          f"{args.rate:g} deg/s, {args.settle:g} s to settle")
+    print(f"{'order':<11}{'slew deg':>10}{'slew h':>8}{'total h':>9}{'choosing ms':>13}")
+    results = {}
+    for name, choose in (("FIFO", fifo), ("Scheduler", Route.next_proposal)):
+        with tempfile.TemporaryDirectory(prefix="scheduler-benchmark-") as workdir:
+            handler = standins.relocateDatabase(workdir)
+            telescope, choosing = observe_all(handler, choose, args)
+        results[name] = telescope
+        print(f"{name:<11}{telescope.slew:>10.0f}{telescope.slew_time / 3600:>8.2f}"
+              f"{telescope.clock / 3600:>9.2f}{choosing * 1e3:>13.1f}")
+    saved = 1.0 - results["Scheduler"].slew_time / results["FIFO"].slew_time
+    print(f"slew time saved: {saved:.0%}")
+
+if __name__ == "__main__":
+    main()
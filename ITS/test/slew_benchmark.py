@@ -0,0 +1,99 @@
+"""
+Time to converge and HTTP requests per slew of StellariumAPI.slew_to_altaz
+(the closed-loop SlewController) against the old fixed-step loop.
+
+Both run against the fake Stellarium of standins.py, whose view moves at
+x/y times the FOV in deg/s and answers every request after --delay
+seconds. For each slew length L the view is put back at (alt, az) =
+(30, 0) and slewed to (30 + L/4, L), once with each loop. The old loop
+read the position, sent main/move with the error (at most 10 deg per
+axis) over the FOV, and slept 0.1 s until both axes were within 0.02 deg;
+it had no timeout, here it gives up after --timeout seconds. Printed per
+loop and length: the wall time, the requests sent and the final error
+read from the fake sky.
+
+    python slew_benchmark.py
+    python slew_benchmark.py --lengths 2 30 170 --delay 0.01
+"""
+import argparse
+import math
+import time
+
+import standins
+
+START = (30.0, 0.0)
+TOL = 0.02       # deg
+SLEEP = 0.10     # s, the old loop's fixed step
+
+def delta_azm(cmd, cur):
+    delta = (cmd - cur) % 360
+    return delta - 360 if delta > 180 else delta
+
+def fixed_step(api, cmd_alt, cmd_azm, timeout):
+    """The slew loop StellariumAPI had before the SlewController."""
+    fov = api.get_fov()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        alt, azm = api.get_altaz()
+        delta_alt = cmd_alt - alt
+        delta_az = delta_azm(cmd_azm, azm)
+        if math.fabs(delta_alt) <= TOL and math.fabs(delta_az) <= TOL:
+            api.send_http_request("main/move", {"x": 0.0, "y": 0.0})
+            return True
+        delta_alt = math.copysign(min(math.fabs(delta_alt), 10), delta_alt)
+        delta_az = math.copysign(min(math.fabs(delta_az), 10), delta_az)
+        api.send_http_request("main/move", {"x": delta_az / fov, "y": delta_alt / fov})
+        time.sleep(SLEEP)
+    api.send_http_request("main/move", {"x": 0.0, "y": 0.0})
+    return False
+
+def closed_loop(api, cmd_alt, cmd_azm, timeout):
+    return api.slew_to_altaz(cmd_alt, cmd_azm, timeout=timeout)
+
+def reset(sky):
+    with sky.lock:
+        sky.alt, sky.az = START
+        sky.vx = sky.vy = 0.0
+        sky.t = time.monotonic()
+
+def error(sky, cmd_alt, cmd_azm):
+    with sky.lock:
+        sky.step()
+        return max(math.fabs(cmd_alt - sky.alt), math.fabs(delta_azm(cmd_azm, sky.az)))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--lengths", type=float, nargs="+",
+                        default=[0.5, 2.0, 10.0, 45.0, 120.0, 180.0],
+                        help="slew lengths in degrees of azimuth")
+    parser.add_argument("--delay", type=float, default=0.0,
+                        help="seconds every fake Stellarium response takes")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds per slew")
+    args = parser.parse_args()
+    standins.install()
+    from stellarium.api import StellariumAPI
+
+    stellarium = standins.FakeStellarium(args.delay).start()
+    api = StellariumAPI(url=stellarium.url)
+    sky = stellarium.server.sky
+    print(f"fake Stellarium FOV {sky.fov:g} deg, {args.delay * 1e3:g} ms per response")
+    print(f"{'loop':<13}{'deg':>7}{'s':>8}{'requests':>10}{'error deg':>11}")
+    try:
+        for length in args.lengths:
+            cmd_alt, cmd_azm = START[0] + length / 4.0, (START[1] + length) % 360.0
+            for name, slew in (("fixed step", fixed_step), ("closed loop", closed_loop)):
+                reset(sky)
+                requests = stellarium.requests
+                start = time.perf_counter()
+                converged = slew(api, cmd_alt, cmd_azm, args.timeout)
+                elapsed = time.perf_counter() - start
+                sent = stellarium.requests - requests
+                print(f"{name:<13}{length:>7g}{elapsed:>8.2f}{sent:>10}"
+                      f"{error(sky, cmd_alt, cmd_azm):>11.3f}"
+                      f"{'' if converged else '  timed out'}")
+    finally:
+        api.close()
+        stellarium.stop()
+
+if __name__ == "__main__":
+    main()
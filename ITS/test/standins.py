@@ -0,0 +1,347 @@
+"""
+In-process stand-ins for what the Python components need from a running
+ACS system, so they can be instantiated and driven without a manager:
+
+- install() registers minimal Acspy/ACSImpl modules, the TYPES structs,
+  the POA skeleton modules and SYSTEMErrImpl exceptions in sys.modules,
+  and puts the Python sources of the repository (SOURCES) on sys.path.
+  It must run before the components are imported.
+- Container plays the part of the container: it creates components,
+  wires getComponent()/getName() and the CDB attributes, and runs their
+  lifecycle.
+- relocateDatabase() keeps the DATABASE component's files in a given
+  (temporary) directory.
+- FakeStellarium is an HTTP server implementing the part of Stellarium's
+  remote control API used by StellariumAPI, with a view that moves at
+  the rates commanded through main/move. It counts the requests and the
+  TCP connections it accepted, and can delay every response.
+
+Only behaviour the components rely on is modelled.
+"""
+import json
+import logging
+import math
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs
+
+ROOT = Path(__file__).resolve().parents[2]
+# Where the Python packages of the components live, as they would be in INTROOT
+SOURCES = [ROOT / "pyMetrics" / "src",
+           ROOT / "pyDatabase" / "src",
+           ROOT / "pyScheduler" / "src",
+           ROOT / "pyStorage" / "src",
+           ROOT / "EXTERNAL" / "Stellarium" / "src",
+           ROOT / "EXTERNAL" / "AstropyCamera" / "src"]
+
+# ACS time: 100 ns units since 1582-10-15
+ACS_EPOCH_OFFSET = 122192928000000000
+
+class _Struct:
+    _fields = ()
+
+    def __init__(self, *args, **kwargs):
+        for name, value in zip(self._fields, args):
+            setattr(self, name, value)
+        for name, value in kwargs.items():
+            setattr(self, name, value)
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({values})"
+
+class Position(_Struct):
+    _fields = ("az", "el")
+
+class Target(_Struct):
+    _fields = ("tid", "coordinates", "expTime")
+
+class Proposal(_Struct):
+    _fields = ("pid", "targets", "status")
+
+class Property:
+    """BACI property: value from the DevIO if there is one."""
+    def __init__(self, devio=None):
+        self.devio = devio
+        self.value = 0.0
+
+    def get_sync(self):
+        if self.devio is not None:
+            value, _ = self.devio.read()
+            return value, None
+        return self.value, None
+
+    def set_sync(self, value):
+        self.value = value
+        if self.devio is not None:
+            self.devio.write(value)
+        return None
+
+def addProperty(component, name, devio=None):
+    prop = Property(devio)
+    # Servant side accessor and client side attribute
+    setattr(component, f"_get_{name}", lambda: prop)
+    setattr(component, name, prop)
+
+class DevIO:
+    def __init__(self, value):
+        self.value = value
+
+    def read(self):
+        return self.value, getTimeStamp().value
+
+    def write(self, value):
+        self.value = value
+
+class _TimeStamp:
+    def __init__(self, value):
+        self.value = value
+
+def getTimeStamp():
+    return _TimeStamp(int(time.time() * 1e7) + ACS_EPOCH_OFFSET)
+
+class _DAO:
+    def __init__(self, attributes):
+        self.attributes = attributes
+
+    def get_string(self, name):
+        return str(self.attributes[name])
+
+    def get_double(self, name):
+        return float(self.attributes[name])
+
+    def get_long(self, name):
+        return int(self.attributes[name])
+
+class _CDB:
+    def __init__(self):
+        self.records = {}
+
+    def get_DAO_Servant(self, path):
+        return _DAO(self.records[path])
+
+CDB = _CDB()
+
+def cdb():
+    return CDB
+
+class ACSComponent:
+    def __init__(self):
+        pass
+
+class CharacteristicComponent(ACSComponent):
+    pass
+
+class ComponentLifecycle:
+    def initialize(self):
+        pass
+
+    def execute(self):
+        pass
+
+    def cleanUp(self):
+        pass
+
+    def aboutToAbort(self):
+        pass
+
+class ContainerServices:
+    """getComponent/getName are bound by Container when it creates the component."""
+    def __init__(self):
+        pass
+
+    def getLogger(self):
+        return logging.getLogger(type(self).__name__)
+
+    def releaseComponent(self, name):
+        pass
+
+def _module(name, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    sys.modules[name] = module
+    return module
+
+def _lazyModule(name, factory):
+    """Module whose attributes are created on first access by factory(attr)."""
+    module = _module(name)
+    cache = {}
+
+    def __getattr__(attr):
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        if attr not in cache:
+            cache[attr] = factory(attr)
+        return cache[attr]
+    module.__getattr__ = __getattr__
+    return module
+
+def install():
+    """Registers the stand-in modules and the source paths; idempotent."""
+    if "Acspy" in sys.modules and getattr(sys.modules["Acspy"], "STANDIN", False):
+        return
+    sys.path[:0] = [str(path) for path in SOURCES if str(path) not in sys.path]
+    _module("Acspy", STANDIN=True)
+    _module("Acspy.Servants")
+    _module("Acspy.Servants.ACSComponent", ACSComponent=ACSComponent)
+    _module("Acspy.Servants.CharacteristicComponent",
+            CharacteristicComponent=CharacteristicComponent)
+    _module("Acspy.Servants.ContainerServices", ContainerServices=ContainerServices)
+    _module("Acspy.Servants.ComponentLifecycle", ComponentLifecycle=ComponentLifecycle)
+    _module("Acspy.Util")
+    _module("Acspy.Util.BaciHelper", addProperty=addProperty)
+    _module("Acspy.Util.ACSCorba", cdb=cdb)
+    _module("Acspy.Common")
+    _module("Acspy.Common.TimeHelper", getTimeStamp=getTimeStamp)
+    _module("ACSImpl")
+    _module("ACSImpl.DevIO", DevIO=DevIO)
+    _module("TYPES", Position=Position, Target=Target, Proposal=Proposal,
+            TargetList=list, ProposalList=list, ImageType=bytes, ImageList=list)
+    # Any error class is an Exception; any POA skeleton an empty base class
+    _lazyModule("SYSTEMErrImpl", lambda attr: type(attr, (Exception,), {}))
+    for poa in ("DATABASE_MODULE__POA", "TELESCOPE_MODULE__POA", "CAMERA_MODULE__POA",
+                "SCHEDULER_MODULE__POA", "STORAGE_MODULE__POA"):
+        _lazyModule(poa, lambda attr: type(attr, (), {}))
+
+class Container:
+    """Creates components and resolves getComponent() between them by name."""
+    def __init__(self):
+        self.components = {}
+
+    def activate(self, name, cls, attributes=None):
+        CDB.records[f"alma/{name}"] = dict(attributes or {})
+        component = cls.__new__(cls)
+        component.getName = lambda: name
+        # What a CORBA reference to the component would answer
+        component._get_name = lambda: name
+        component.getComponent = lambda other: self.components[other]
+        cls.__init__(component)
+        component.name = name
+        component.initialize()
+        component.execute()
+        self.components[name] = component
+        return component
+
+    def shutdown(self):
+        for component in reversed(list(self.components.values())):
+            component.cleanUp()
+        self.components.clear()
+
+def relocateDatabase(directory):
+    """
+    Points ProposalHandler's database and frame store into directory
+    instead of the package directory; returns the ProposalHandler module.
+    """
+    from AstroDatabase import ProposalHandler as handler
+    directory = Path(directory)
+    handler.DB_DIR = directory / "data"
+    handler.DB_DIR.mkdir(parents=True, exist_ok=True)
+    handler.FRAME_DIR = directory / "frames"
+    return handler
+
+class _Sky:
+    """View of the fake Stellarium: moves at x/y times the FOV in deg/s."""
+    def __init__(self):
+        self.alt = 10.0
+        self.az = 20.0
+        self.vx = 0.0
+        self.vy = 0.0
+        self.fov = 60.0
+        self.requests = 0
+        self.connections = 0
+        self.t = time.monotonic()
+        self.lock = threading.Lock()
+
+    def step(self):
+        now = time.monotonic()
+        dt = now - self.t
+        self.t = now
+        self.az = (self.az + self.vx * self.fov * dt) % 360.0
+        self.alt = max(-90.0, min(90.0, self.alt + self.vy * self.fov * dt))
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Buffered writes: one segment per response, no Nagle stalls
+    wbufsize = 65536
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.sky.lock:
+            self.server.sky.connections += 1
+
+    def _send(self, body):
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        data = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        sky = self.server.sky
+        with sky.lock:
+            sky.requests += 1
+            sky.step()
+            if self.path.endswith("main/view"):
+                alt, az = math.radians(sky.alt), math.radians(sky.az)
+                xyz = [-math.cos(alt) * math.cos(az), math.cos(alt) * math.sin(az), math.sin(alt)]
+                body = json.dumps({"altAz": json.dumps(xyz), "jNow": json.dumps(xyz)})
+            elif self.path.endswith("main/status"):
+                body = json.dumps({"view": {"fov": sky.fov}})
+            else:
+                body = "ok"
+        self._send(body)
+
+    def do_POST(self):
+        sky = self.server.sky
+        length = int(self.headers.get("Content-Length", 0))
+        query = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode()).items()}
+        with sky.lock:
+            sky.requests += 1
+            sky.step()
+            if self.path.endswith("main/move"):
+                sky.vx = float(query.get("x", 0.0))
+                sky.vy = float(query.get("y", 0.0))
+            elif self.path.endswith("main/fov"):
+                sky.fov = float(query["fov"])
+            elif self.path.endswith("main/view") and "altAz" in query:
+                x, y, z = json.loads(query["altAz"])
+                sky.alt = math.degrees(math.asin(z))
+                sky.az = math.degrees(math.atan2(y, -x)) % 360.0
+        self._send("ok")
+
+class FakeStellarium:
+    """delay: seconds every response takes, like the real program's render loop."""
+    def __init__(self, delay=0.0):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.daemon_threads = True
+        self.server.delay = delay
+        self.server.sky = _Sky()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api"
+        self._thread = threading.Thread(target=self.server.serve_forever,
+                                        name="fake-stellarium", daemon=True)
+
+    @property
+    def requests(self):
+        return self.server.sky.requests
+
+    @property
+    def connections(self):
+        """TCP connections accepted so far."""
+        return self.server.sky.connections
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
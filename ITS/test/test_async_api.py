@@ -0,0 +1,103 @@
+"""
+AsyncStellariumAPI and the TELESCOPE_CONTROL slews against the fake
+Stellarium: slews converge, cancelling one stops the view, position
+polls are answered while a slew runs, slews never overlap, and setTo
+reports a slew that does not arrive.
+
+    python -m pytest test_async_api.py
+"""
+import time
+
+import pytest
+
+import standins
+
+TOL = 0.05
+
+@pytest.fixture
+def stellarium():
+    standins.install()
+    stellarium = standins.FakeStellarium().start()
+    yield stellarium
+    stellarium.stop()
+
+@pytest.fixture
+def api(stellarium):
+    from stellarium.async_api import AsyncStellariumAPI
+    api = AsyncStellariumAPI(url=stellarium.url)
+    yield api
+    api.close()
+
+@pytest.fixture
+def telescope(stellarium):
+    from stellarium.api import StellariumAPI
+    from stellarium.StellariumComponent import StellariumComponent
+    StellariumAPI.STELLARIUM_URL = stellarium.url
+    container = standins.Container()
+    yield container.activate("TELESCOPE_CONTROL", StellariumComponent, {})
+    container.shutdown()
+
+def view(stellarium):
+    sky = stellarium.server.sky
+    with sky.lock:
+        sky.step()
+        return sky.alt, sky.az, sky.vx, sky.vy
+
+def test_slew_converges(stellarium, api):
+    assert api.slew_async(25.0, 40.0).result(timeout=30)
+    alt, az, vx, vy = view(stellarium)
+    assert alt == pytest.approx(25.0, abs=TOL)
+    assert az == pytest.approx(40.0, abs=TOL)
+    assert vx == vy == 0.0
+
+def test_cancel_stops_the_view(stellarium, api):
+    slew = api.slew_async(80.0, 200.0)
+    time.sleep(0.5)
+    assert view(stellarium)[2:] != (0.0, 0.0)
+    slew.cancel()
+    # The stop request is sent from the slew's finally block
+    deadline = time.monotonic() + 2.0
+    while view(stellarium)[2:] != (0.0, 0.0) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    alt, az, vx, vy = view(stellarium)
+    assert vx == vy == 0.0
+    time.sleep(0.2)
+    assert view(stellarium)[:2] == (alt, az)
+    assert alt != pytest.approx(80.0, abs=1.0)
+
+def test_polls_run_during_a_slew(api):
+    slew = api.slew_async(60.0, 150.0)
+    time.sleep(0.2)
+    started = time.monotonic()
+    positions = [api.submit(api.get_altaz()).result(timeout=1) for _ in range(20)]
+    assert not slew.done()
+    assert time.monotonic() - started < 1.0
+    assert len({tuple(p) for p in positions}) > 1
+    slew.cancel()
+
+def test_set_to_waits_for_a_running_slew(stellarium, telescope):
+    first = telescope.slewAsync(30.0, 60.0)
+    time.sleep(0.1)
+    telescope.setTo(15.0, 30.0)
+    # setTo queued behind the first slew, which finished undisturbed
+    assert first.done() and first.result()
+    alt, az, _, _ = view(stellarium)
+    assert alt == pytest.approx(15.0, abs=TOL)
+    assert az == pytest.approx(30.0, abs=TOL)
+
+def test_slews_run_in_request_order(stellarium, api):
+    slews = [api.slew_async(20.0 + i, 30.0 + 5 * i) for i in range(3)]
+    results = [slew.result(timeout=60) for slew in slews]
+    assert results == [True, True, True]
+    alt, az, _, _ = view(stellarium)
+    assert alt == pytest.approx(22.0, abs=TOL)
+    assert az == pytest.approx(40.0, abs=TOL)
+
+def test_set_to_raises_when_the_slew_times_out(stellarium, telescope):
+    import SYSTEMErrImpl
+    async_api = telescope.async_api
+    async_api.slew_async = lambda alt, az: async_api.submit(
+        async_api.slew_to_altaz(alt, az, timeout=0.2))
+    with pytest.raises(SYSTEMErrImpl.SlewFailedExImpl):
+        telescope.setTo(70.0, 250.0)
+    assert view(stellarium)[2:] == (0.0, 0.0)
@@ -0,0 +1,113 @@
+"""
+Frames shared between images (identical content is stored once) must
+survive concurrent storeImage/removeProposal calls: every image row
+refers to a file, and no file is left without one.
+
+    python -m pytest test_frame_store.py
+"""
+import sys
+import threading
+
+import pytest
+
+import standins
+
+THREADS = 6
+ROUNDS = 100
+TARGETS = 4
+
+@pytest.fixture
+def database(tmp_path):
+    standins.install()
+    handler = standins.relocateDatabase(tmp_path)
+    container = standins.Container()
+    database = container.activate("DATABASE", handler.ProposalHandler, {})
+    yield database
+    container.shutdown()
+
+def proposal(targets):
+    import TYPES
+    return [TYPES.Target(i, TYPES.Position(10.0 * i, 45.0), 1) for i in range(targets)]
+
+def target_ids(db, pid):
+    return [row[0] for row in db.execute(
+        "SELECT id FROM target WHERE proposal_id = ?", (pid,))]
+
+def test_identical_frames_under_concurrent_store_and_remove(database):
+    frame = bytes(range(256)) * 64
+    missing = []
+    errors = []
+
+    def worker():
+        try:
+            db = database._pool.connection()
+            for _ in range(ROUNDS):
+                pid = database.storeProposal(proposal(TARGETS))
+                for tid in target_ids(db, pid):
+                    database.storeImage(pid, tid, frame)
+                    path, = db.execute(
+                        "SELECT path FROM image WHERE proposal_id = ? AND target_id = ?",
+                        (pid, tid)).fetchone()
+                    if not database.frames.path(path).exists():
+                        missing.append((pid, tid))
+                database.removeProposal(pid)
+        except Exception as ex:
+            errors.append(ex)
+
+    # Switch threads often so the put/commit window gets interleaved
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    try:
+        threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert not errors
+    assert not missing, f"{len(missing)} of {THREADS * ROUNDS * TARGETS} frames missing"
+    # Everything was removed again, so no frame may be left behind
+    assert not [path for path in database.frames.root.rglob("*") if path.is_file()]
+
+def test_duplicate_store_keeps_the_stored_frame(database):
+    import SYSTEMErrImpl
+    frame = b"\x01" * 4096
+    db = database._pool.connection()
+    pid = database.storeProposal(proposal(2))
+    tid = target_ids(db, pid)[0]
+    database.storeImage(pid, tid, frame)
+    with pytest.raises(SYSTEMErrImpl.ImageAlreadyStoredExImpl):
+        database.storeImage(pid, tid, frame)
+    path, = db.execute(
+        "SELECT path FROM image WHERE proposal_id = ?", (pid,)).fetchone()
+    assert database.frames.path(path).exists()
+
+def test_clear_keeps_pinned_frames(tmp_path):
+    standins.install()
+    from AstroDatabase.FrameStore import FrameStore
+    frames = FrameStore(tmp_path / "frames")
+    pinned, _, _ = frames.put(b"pending")
+    done, _, _ = frames.put(b"committed")
+    frames.unpin(done)
+    view = frames.open(done)
+    frames.clear()
+    assert frames.path(pinned).exists()
+    assert not frames.path(done).exists()
+    assert bytes(view) == b"committed"
+    frames.unpin(pinned)
+    frames.clear()
+    assert not list(frames.root.iterdir())
+
+def test_unknown_codec_is_named(database, caplog):
+    db = database._pool.connection()
+    pid = database.storeProposal(proposal(1))
+    database.storeImage(pid, target_ids(db, pid)[0], b"\x02" * 64)
+    with db:
+        db.execute("UPDATE image SET codec = 'lz5' WHERE proposal_id = ?", (pid,))
+    for status in (0, 1, 2):
+        database.setProposalStatus(pid, status)
+    with pytest.raises(ValueError, match="'lz5'"):
+        database.getProposalObservations(pid)
+    assert "lz5" in caplog.text
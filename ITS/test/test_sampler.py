@@ -0,0 +1,81 @@
+"""
+PositionSampler and the StellariumAPI position reads while Stellarium
+does not answer: the reads raise instead of returning (0, 0), and the
+sampler keeps publishing the last position with its own timestamp.
+
+    python -m pytest test_sampler.py
+"""
+import time
+
+import pytest
+
+import standins
+
+@pytest.fixture
+def stellarium():
+    standins.install()
+    stellarium = standins.FakeStellarium().start()
+    yield stellarium
+    stellarium.stop()
+
+def unreachable():
+    from stellarium.api import StellariumAPI
+    # Nothing listens on the discard port; no retries to keep the test short
+    return StellariumAPI("http://127.0.0.1:9/api", timeout=(0.2, 0.2), retries=0)
+
+def test_reads_raise_without_stellarium():
+    standins.install()
+    from stellarium.api import StellariumError
+    api = unreachable()
+    for read in (api.get_altaz, api.get_radec, api.get_status):
+        with pytest.raises(StellariumError):
+            read()
+
+def test_sampler_keeps_the_last_sample_during_an_outage(stellarium):
+    from stellarium.api import StellariumAPI
+    from stellarium.sampler import PositionSampler
+    api = StellariumAPI(stellarium.url)
+    sampler = PositionSampler(api, period=0.05, max_age=0.1)
+    sampler.start()
+    try:
+        time.sleep(0.2)
+        api.url = unreachable().url
+        # Let a refresh already on its way to Stellarium land first
+        time.sleep(0.3)
+        before = sampler.read()
+        time.sleep(0.5)
+        # Stale, and every refresh fails: the same position and timestamp
+        assert sampler.read() == before
+        assert before[:2] != (0, 0)
+    finally:
+        sampler.stop()
+
+def test_sampler_retries_once_per_period():
+    from stellarium.sampler import PositionSampler
+    from stellarium.api import StellariumError
+
+    class Failing:
+        calls = 0
+        def get_altaz(self):
+            Failing.calls += 1
+            raise StellariumError("down")
+
+    sampler = PositionSampler(Failing(), period=10.0, max_age=0.0)
+    for _ in range(5):
+        with pytest.raises(StellariumError):
+            sampler.read()
+    assert Failing.calls == 1
+
+def test_sampler_config_attributes_are_read_one_by_one(stellarium):
+    from stellarium.api import StellariumAPI
+    from stellarium.sampler import PositionSampler
+    from stellarium.StellariumComponent import StellariumComponent
+    StellariumAPI.STELLARIUM_URL = stellarium.url
+    container = standins.Container()
+    try:
+        telescope = container.activate("TELESCOPE_CONTROL", StellariumComponent,
+                                       {"maxSampleAge": 5.0})
+        assert telescope.sampler.period == PositionSampler.PERIOD
+        assert telescope.sampler.max_age == 5.0
+    finally:
+        container.shutdown()
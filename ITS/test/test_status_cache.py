@@ -0,0 +1,74 @@
+"""
+The in-memory status map of the DATABASE component must agree with the
+proposal table after concurrent storeProposal, setProposalStatus and
+removeProposal calls, with and without group commit.
+
+    python -m pytest test_status_cache.py
+"""
+import random
+import sys
+import threading
+
+import pytest
+
+import standins
+
+THREADS = 6
+CALLS = 300
+
+@pytest.fixture(params=[False, True], ids=["direct", "group-commit"])
+def database(request, tmp_path):
+    standins.install()
+    handler = standins.relocateDatabase(tmp_path)
+    container = standins.Container()
+    database = container.activate("DATABASE", handler.ProposalHandler,
+                                  {"groupCommit": request.param})
+    yield database
+    container.shutdown()
+
+def test_status_map_matches_the_database(database):
+    import TYPES
+    from AstroDatabase import ProposalHandler as handler
+    pids = []
+    errors = []
+
+    def worker(seed):
+        rng = random.Random(seed)
+        try:
+            for _ in range(CALLS):
+                op = rng.random()
+                if op < 0.2 or not pids:
+                    pids.append(database.storeProposal(
+                        [TYPES.Target(0, TYPES.Position(0.0, 45.0), 1)]))
+                elif op < 0.9:
+                    # Every thread pushes random proposals one step further,
+                    # so several race on the same transition
+                    pid = rng.choice(pids)
+                    try:
+                        database.setProposalStatus(pid, database.getProposalStatus(pid) + 1)
+                    except handler.SYSTEMErrImpl.InvalidProposalStatusTransitionExImpl:
+                        pass
+                else:
+                    database.removeProposal(rng.choice(pids))
+        except Exception as ex:
+            errors.append(ex)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    try:
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert not errors
+    stored = dict(database._pool.connection().execute("SELECT id, status FROM proposal"))
+    assert database._status == stored
+    for pid in set(pids):
+        assert database.getProposalStatus(pid) == stored.get(pid, handler.STATUS_NO_SUCH_PROPOSAL)
+    # The run must actually have exercised every status
+    assert set(stored.values()) == {handler.STATUS_INITIAL_PROPOSAL, handler.STATUS_QUEUED_PROPOSAL,
+                                    handler.STATUS_RUNNING, handler.STATUS_READY}
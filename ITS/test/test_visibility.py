@@ -0,0 +1,67 @@
+"""
+getVisibleProposals on the DATABASE: only queued proposals whose targets
+are all between the elevation limit and the zenith are returned, as
+status changes and removals happen and after a restart, and a proposal
+that can never be observed is reported when queued.
+
+    python -m pytest test_visibility.py
+"""
+import logging
+
+import pytest
+
+import standins
+
+@pytest.fixture
+def handler(tmp_path):
+    standins.install()
+    return standins.relocateDatabase(tmp_path)
+
+@pytest.fixture
+def database(handler):
+    container = standins.Container()
+    yield container.activate("DATABASE", handler.ProposalHandler, {"elevationLimit": 30.0})
+    container.shutdown()
+
+def queue(handler, database, elevations):
+    import TYPES
+    pid = database.storeProposal([TYPES.Target(i, TYPES.Position(10.0 * i, el), 1)
+                                  for i, el in enumerate(elevations)])
+    database.setProposalStatus(pid, handler.STATUS_QUEUED_PROPOSAL)
+    return pid
+
+def visible(database):
+    return [p.pid for p in database.getVisibleProposals()]
+
+def test_only_proposals_with_every_target_in_the_limits(handler, database, caplog):
+    with caplog.at_level(logging.WARNING):
+        up = queue(handler, database, [30.0, 45.0, 90.0])
+        low = queue(handler, database, [60.0, 29.9])
+        over = queue(handler, database, [50.0, 90.5])
+    assert visible(database) == [up]
+    warned = " ".join(record.getMessage() for record in caplog.records)
+    assert f"Proposal {low} " in warned and f"Proposal {over} " in warned
+    assert f"Proposal {up} " not in warned
+    proposal = database.getVisibleProposals()[0]
+    assert [t.coordinates.el for t in proposal.targets] == [30.0, 45.0, 90.0]
+
+def test_follows_the_status(handler, database):
+    first = queue(handler, database, [40.0])
+    second = queue(handler, database, [50.0, 60.0])
+    assert visible(database) == [first, second]
+    database.setProposalStatus(first, handler.STATUS_RUNNING)
+    assert visible(database) == [second]
+    database.removeProposal(second)
+    assert visible(database) == []
+
+def test_after_a_restart(handler):
+    container = standins.Container()
+    database = container.activate("DATABASE", handler.ProposalHandler, {})
+    pids = [queue(handler, database, [el]) for el in (10.0, 25.0, 70.0)]
+    # Restart without cleanUp, which would wipe the database
+    database._pool.close()
+    database = container.activate("DATABASE", handler.ProposalHandler, {})
+    try:
+        assert visible(database) == pids[1:]
+    finally:
+        container.shutdown()
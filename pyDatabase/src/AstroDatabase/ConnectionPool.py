@@ -0,0 +1,59 @@
+import sqlite3
+import threading
+from pathlib import Path
+
+
+class ConnectionPool:
+    """
+    One SQLite connection per calling thread.
+
+    CORBA invocations arrive on several ORB threads; giving each of them its
+    own connection (and therefore its own cursors and transactions) avoids
+    sharing cursor state between threads. The database runs in WAL journal
+    mode, so readers work on a snapshot and never block the single writer.
+    """
+
+    def __init__(self, db_file: Path,
+                 synchronous: str = "NORMAL",
+                 busy_timeout: float = 5.0):
+        self.db_file = Path(db_file)
+        self.synchronous = synchronous
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: list = []
+
+        # The journal mode is persistent, setting it once is enough.
+        conn = self.connection()
+        conn.execute("PRAGMA journal_mode = WAL")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_file,
+                               timeout=self.busy_timeout,
+                               check_same_thread=False)
+        # Connection-level settings, they are not stored in the file.
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout * 1000)}")
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """Returns the connection owned by the calling thread."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self) -> None:
+        """Closes every connection handed out by this pool."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
@@ -0,0 +1,80 @@
+"""
+Frame codecs used to encode images before they go to the FrameStore.
+
+Each codec is a pair of functions (encode, decode) working on bytes-like
+objects. The name of the codec an image was stored with is kept in its
+image row, so frames stored with different codecs can be read back side
+by side. New codecs can be added with register(). Asking for a codec that
+is not registered (lz4 on a host without the lz4 package, for instance)
+raises ValueError naming it.
+"""
+import zlib
+
+_CODECS = {}
+
+
+def register(name: str, encode, decode) -> None:
+    """encode None registers a codec that is only read back."""
+    _CODECS[name] = (encode, decode)
+
+
+def names() -> list:
+    """Codecs new images can be stored with."""
+    return sorted(name for name, (enc, _) in _CODECS.items() if enc is not None)
+
+
+def _codec(name: str):
+    try:
+        return _CODECS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown frame codec '{name}', available: {', '.join(sorted(_CODECS))}"
+        ) from None
+
+
+def encode(name: str, data) -> bytes:
+    enc = _codec(name)[0]
+    if enc is None:
+        raise ValueError(f"Frame codec '{name}' can only decode")
+    return enc(data)
+
+
+def decode(name: str, data) -> bytes:
+    return _codec(name)[1](data)
+
+
+def _raw_encode(data) -> bytes:
+    return bytes(data)
+
+
+def _raw_decode(data) -> bytes:
+    return bytes(data)
+
+
+def _delta_decode(data) -> bytes:
+    import numpy as np
+    delta = np.frombuffer(data, dtype=np.uint8)
+    # Accumulating in uint8 wraps around exactly like the encoder did.
+    return np.cumsum(delta, dtype=np.uint8).tobytes()
+
+
+register("raw", _raw_encode, _raw_decode)
+register("zlib",
+         lambda data: zlib.compress(data, 6),
+         zlib.decompress)
+# The standard library has no LZ4; deflate at level 1 is the fast option.
+register("zlib-fast",
+         lambda data: zlib.compress(data, 1),
+         zlib.decompress)
+# Read only: its Sub filter ran over the flattened frame rather than along
+# each row and compressed worse than plain zlib. Frames already stored
+# with it stay readable.
+register("delta-zlib", None,
+         lambda data: _delta_decode(zlib.decompress(data)))
+
+try:
+    import lz4.frame
+except ImportError:
+    pass
+else:
+    register("lz4", lz4.frame.compress, lz4.frame.decompress)
@@ -0,0 +1,122 @@
+import hashlib
+import mmap
+import os
+import threading
+from pathlib import Path
+
+
+class FrameStore:
+    """
+    Content-addressed on-disk store for raw image frames.
+
+    Every frame is written once to <root>/<aa>/<sha256>, where <aa> are the
+    first two hex digits of its SHA-256 checksum, so identical frames share
+    a single file. Frames are read back through read-only memory maps, so
+    the bytes live in the page cache rather than in the Python heap.
+
+    Because a file can be shared, put() pins it until the caller unpins it
+    once the row referring to it is committed, and remove() only deletes
+    a frame that is neither pinned nor referenced; both run under one
+    lock, so a frame is never deleted between a put() and its commit.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pins: dict = {}        # relpath -> number of pending put()s
+
+    @staticmethod
+    def checksum(data) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def relpath(self, digest: str) -> str:
+        """Path of a frame relative to the store root."""
+        return f"{digest[:2]}/{digest[2:]}"
+
+    def path(self, relpath: str) -> Path:
+        return self.root / relpath
+
+    def put(self, data) -> tuple:
+        """
+        Writes a frame unless an identical one is already stored, and pins
+        it until unpin(). The file is on disk (fsynced) when this returns.
+        Returns (relpath, size, checksum).
+        """
+        digest = self.checksum(data)
+        relpath = self.relpath(digest)
+        path = self.path(relpath)
+        with self._lock:
+            self._pins[relpath] = self._pins.get(relpath, 0) + 1
+        try:
+            if not path.exists():
+                self._write(path, data)
+        except BaseException:
+            self.unpin(relpath)
+            raise
+        return relpath, len(data), digest
+
+    @staticmethod
+    def _write(path: Path, data) -> None:
+        path.parent.mkdir(exist_ok=True)
+        # Write under a private name first so readers never see a
+        # partially written frame.
+        tmp = path.with_name(
+            f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        # Make the rename itself durable before a row points at the file
+        fd = os.open(path.parent, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def unpin(self, relpath: str) -> None:
+        """Drops one pin taken by put()."""
+        with self._lock:
+            count = self._pins.pop(relpath) - 1
+            if count:
+                self._pins[relpath] = count
+
+    def open(self, relpath: str) -> memoryview:
+        """Returns a read-only, memory-mapped view of a stored frame."""
+        with open(self.path(relpath), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return memoryview(b"")
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(mm)
+
+    def remove(self, relpath: str, referenced=None) -> bool:
+        """
+        Deletes a frame unless it is pinned or referenced(relpath) is true.
+        Returns whether the frame is gone.
+        """
+        with self._lock:
+            if relpath in self._pins or (referenced is not None and referenced(relpath)):
+                return False
+            try:
+                self.path(relpath).unlink()
+            except FileNotFoundError:
+                pass
+            return True
+
+    def clear(self) -> None:
+        """
+        Removes every stored frame except the pinned ones, which a put()
+        still has to commit. Views already returned by open() stay valid.
+        """
+        with self._lock:
+            for directory in self.root.iterdir():
+                if not directory.is_dir():
+                    continue
+                for path in directory.iterdir():
+                    if f"{directory.name}/{path.name}" not in self._pins:
+                        path.unlink(missing_ok=True)
+                try:
+                    directory.rmdir()
+                except OSError:
+                    pass        # still holds a pinned frame
@@ -0,0 +1,99 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from AstroDatabase.ConnectionPool import ConnectionPool
+
+_STOP = object()
+
+
+class GroupCommitter:
+    """
+    Serialises write operations onto one connection and commits them in
+    groups.
+
+    A write operation is a callable taking a sqlite3.Connection; it must
+    not commit itself. Submitted operations are collected until either
+    max_batch of them are waiting or max_delay seconds have passed since
+    the first one, and are then committed in a single transaction, i.e.
+    with a single fsync. Each operation runs inside its own savepoint, so
+    a failing operation is rolled back alone and its caller gets the
+    exception while the rest of the group is still committed.
+    """
+
+    def __init__(self, pool: ConnectionPool,
+                 max_batch: int = 64,
+                 max_delay: float = 0.005):
+        self._pool = pool
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run,
+                                        name="GroupCommitter",
+                                        daemon=True)
+        self._thread.start()
+
+    def submit(self, op):
+        """
+        Queues op and blocks until its group is committed.
+        Returns the value returned by op or raises the exception it raised.
+        """
+        future = Future()
+        self._queue.put((op, future))
+        return future.result()
+
+    def close(self) -> None:
+        """Commits whatever is still queued and stops the writer thread."""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self) -> None:
+        db = self._pool.connection()
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit(db, batch)
+
+    def _commit(self, db, batch) -> None:
+        results = []
+        try:
+            db.execute("BEGIN")
+            for op, future in batch:
+                db.execute("SAVEPOINT group_op")
+                try:
+                    value = op(db)
+                except Exception as e:
+                    db.execute("ROLLBACK TO group_op")
+                    results.append((future, None, e))
+                else:
+                    results.append((future, value, None))
+                db.execute("RELEASE group_op")
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for future, value, error in results:
+            if error is None:
+                future.set_result(value)
+            else:
+                future.set_exception(error)
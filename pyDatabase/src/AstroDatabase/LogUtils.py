@@ -0,0 +1,65 @@
+"""
+Logging helpers for the AstroDatabase hot paths.
+
+Messages are passed to the logger with %-style arguments, so nothing is
+formatted unless a record is actually emitted. Frame payloads are only
+ever rendered through Payload, which prints a short summary instead of
+the bytes themselves, and per-item messages go through RateLimitedLog.
+"""
+import logging
+import threading
+import time
+import zlib
+
+
+class Payload:
+    """Lazy, size-bounded stand-in for a bytes-like payload in a log message."""
+
+    __slots__ = ("data",)
+
+    HEAD = 8
+
+    def __init__(self, data):
+        self.data = data
+
+    def __str__(self):
+        data = memoryview(self.data)
+        return (f"<{data.nbytes} bytes crc32={zlib.crc32(data):08x} "
+                f"head={data[:self.HEAD].hex()}>")
+
+    __repr__ = __str__
+
+
+class RateLimitedLog:
+    """
+    Emits at most one record per interval seconds for a recurring message;
+    the next emitted record reports how many were dropped in between.
+    """
+
+    def __init__(self, logger, interval: float = 1.0):
+        self._logger = logger
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next = 0.0
+        self._suppressed = 0
+
+    def log(self, level: int, msg: str, *args) -> None:
+        if not self._logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next:
+                self._suppressed += 1
+                return
+            self._next = now + self.interval
+            suppressed, self._suppressed = self._suppressed, 0
+        if suppressed:
+            msg += " (%d similar messages suppressed)"
+            args += (suppressed,)
+        self._logger.log(level, msg, *args)
+
+    def info(self, msg: str, *args) -> None:
+        self.log(logging.INFO, msg, *args)
+
+    def debug(self, msg: str, *args) -> None:
+        self.log(logging.DEBUG, msg, *args)
@@ -1,4 +1,4 @@
-import sqlite3
+import threading
 from pathlib import Path
 import TYPES
 import SYSTEMErrImpl
@@ -7,10 +7,18 @@ import DATABASE_MODULE__POA
 from Acspy.Servants.ACSComponent import ACSComponent
 from Acspy.Servants.ContainerServices import ContainerServices
 from Acspy.Servants.ComponentLifecycle import ComponentLifecycle
+from AstroDatabase.ConnectionPool import ConnectionPool
+from AstroDatabase import FrameCodec
+from AstroDatabase.FrameStore import FrameStore
+from AstroDatabase.GroupCommitter import GroupCommitter
+from AstroDatabase.LogUtils import Payload, RateLimitedLog
+from AstroConfig import Config
+from AstroMetrics import Metrics
 
 
 DB_DIR   = Path(__file__).resolve().parent / "data"
 DB_DIR.mkdir(exist_ok=True)
+FRAME_DIR = DB_DIR.parent / "frames"
 
 STATUS_INITIAL_PROPOSAL = -1
 STATUS_QUEUED_PROPOSAL = 0
@@ -18,6 +26,26 @@ STATUS_RUNNING = 1
 STATUS_READY = 2
 STATUS_NO_SUCH_PROPOSAL = -999
 
+INVALID_PROPOSAL_ID = -1
+
+SCHEMA_VERSION = 2
+
+# Defaults of the attributes read from the component's CDB entry
+# (see AstroDatabase.xsd).
+DEFAULT_CONFIG = {
+    "groupCommit":      False,  # batch storeImage/setProposalStatus commits
+    "groupCommitSize":  64,     # flush after this many queued writes ...
+    "groupCommitDelay": 5.0,    # ... or this many milliseconds
+    "frameCodec":       "raw",  # FrameCodec used for newly stored images
+    "elevationLimit":   20.0,   # deg, lowest elevation getVisibleProposals accepts
+    **Metrics.DEFAULT_CONFIG,   # metrics, metricsInterval, metricsFile
+}
+
+# Commits of the write operations, group commit waits included
+WRITE = Metrics.operation("database_write", "SQLite write transactions")
+
+def _call(operation):
+    return Metrics.componentCall("ProposalHandler", operation)
 
 SCHEMA_SQL = """
 PRAGMA foreign_keys = ON;
@@ -41,15 +69,29 @@ CREATE TABLE IF NOT EXISTS target (
 );
 
 /* ---------- image (one per target, after obs) ---------- */
+/* the frame bytes live in the FrameStore, only their location is kept here */
 CREATE TABLE IF NOT EXISTS image (
     id           INTEGER PRIMARY KEY AUTOINCREMENT,
     proposal_id  INTEGER NOT NULL
                   REFERENCES proposal(id) ON DELETE CASCADE,
     target_id    INTEGER NOT NULL
                   REFERENCES target(id)   ON DELETE CASCADE,
-    image_array   BLOB    NOT NULL,              -- raw image bytes
+    path         TEXT    NOT NULL,              -- relative to FRAME_DIR
+    size         INTEGER NOT NULL,              -- raw frame bytes
+    checksum     TEXT    NOT NULL,              -- sha256 of the stored file
+    codec        TEXT    NOT NULL DEFAULT 'raw', -- FrameCodec of the stored file
     UNIQUE (proposal_id, target_id)
 );
+
+/* ---------- indexes ---------- */
+CREATE INDEX IF NOT EXISTS proposal_status_idx ON proposal(status);
+CREATE INDEX IF NOT EXISTS target_proposal_idx ON target(proposal_id);
+CREATE INDEX IF NOT EXISTS image_path_idx ON image(path);
+"""
+
+INSERT_TARGET_SQL = """
+INSERT INTO target (proposal_id, tid, az, el, exposure_time)
+VALUES (?,?,?,?,?)
 """
 
 class ProposalHandler(DATABASE_MODULE__POA.DataBase,
@@ -62,28 +104,143 @@ class ProposalHandler(DATABASE_MODULE__POA.DataBase,
         ContainerServices.__init__(self)
 
         self._logger = self.getLogger()
+        # storeImage and getProposals run once per frame / scheduler poll
+        self._imageLog = RateLimitedLog(self._logger)
+        self._pollLog = RateLimitedLog(self._logger)
 
         self.db_file  = DB_DIR / "proposals.sqlite"
         
-        self._db   = sqlite3.connect(self.db_file,
-                                    check_same_thread=False)
-        self._db.executescript(SCHEMA_SQL)
-        self._logger.info(f"SQLite initialised at {self.db_file}")
-        
+        self.frames = FrameStore(FRAME_DIR)
+
+        # Every ORB thread gets its own connection; WAL lets readers run
+        # next to the writer instead of queueing behind its commits.
+        self._pool = ConnectionPool(self.db_file)
+        db = self._pool.connection()
+        self._migrate(db)
+        db.executescript(SCHEMA_SQL)
+        db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._logger.info("SQLite initialised at %s", self.db_file)
+
+        # pid -> status of every stored proposal. The component is the only
+        # writer of the database, so the map is filled once here and then
+        # updated after every successful commit that changes a status.
+        self._statusLock = threading.Lock()
+        self._status = dict(db.execute("SELECT id, status FROM proposal"))
+
+        self._committer = None
+        self._metrics = None
+        self.codec = DEFAULT_CONFIG["frameCodec"]
+        self.elevationLimit = DEFAULT_CONFIG["elevationLimit"]
+
+    def initialize(self):
+        config = Config.componentConfig(self, DEFAULT_CONFIG)
+        self._metrics = Metrics.fromConfig(config, self._logger)
+        if config["frameCodec"] in FrameCodec.names():
+            self.codec = config["frameCodec"]
+        else:
+            self._logger.error("Unknown frame codec %s, storing images with %s",
+                               config["frameCodec"], self.codec)
+        if config["groupCommit"]:
+            self._committer = GroupCommitter(
+                self._pool,
+                max_batch=config["groupCommitSize"],
+                max_delay=config["groupCommitDelay"] / 1000.0)
+            self._logger.info(
+                "Group commit enabled: %d writes or %g ms per transaction",
+                config["groupCommitSize"], config["groupCommitDelay"])
+        self.elevationLimit = config["elevationLimit"]
+
+    def _warnIfNeverVisible(self, pid: int) -> None:
+        """Warns if proposal pid has a target getVisibleProposals filters out."""
+        outside, = self._pool.connection().execute(
+            "SELECT COUNT(*) FROM target WHERE proposal_id = ? AND el NOT BETWEEN ? AND 90",
+            (pid, self.elevationLimit)
+        ).fetchone()
+        if outside:
+            self._logger.warning(
+                "Proposal %d has %d targets outside %.1f..90 deg of elevation "
+                "and will not be observed", pid, outside, self.elevationLimit)
+
+    @WRITE
+    def _write(self, op):
+        """
+        Runs the write operation op(connection) and commits it, either
+        directly or as part of a group commit. Returns what op returns.
+        """
+        if self._committer is not None:
+            return self._committer.submit(op)
 
+        db = self._pool.connection()
+        try:
+            result = op(db)
+            db.commit()
+            return result
+        except Exception:
+            db.rollback()
+            raise
+
+    def _migrate(self, db) -> None:
+        """
+        Brings a database written by an older version up to SCHEMA_VERSION:
+        0 -> 1 moves frames from the image.image_array BLOB column into the
+        FrameStore, 1 -> 2 records the codec of every stored image.
+        """
+        version = db.execute("PRAGMA user_version").fetchone()[0]
+        columns = [row[1] for row in db.execute("PRAGMA table_info(image)")]
+        if version >= SCHEMA_VERSION or not columns:
+            return
+
+        if "codec" not in columns and "image_array" not in columns:
+            db.execute(
+                "ALTER TABLE image ADD COLUMN codec TEXT NOT NULL DEFAULT 'raw'")
+            db.commit()
+            return
+        if "image_array" not in columns:
+            return
+
+        self._logger.info("Moving stored images out of the database")
+        db.execute("ALTER TABLE image RENAME TO image_v0")
+        db.executescript(SCHEMA_SQL)
+        old = db.execute(
+            "SELECT id, proposal_id, target_id, image_array FROM image_v0")
+        paths = []
+        for iid, pid, tid, blob in old:
+            path, size, checksum = self.frames.put(blob)
+            paths.append(path)
+            db.execute(
+                """
+                INSERT INTO image (id, proposal_id, target_id, path, size, checksum)
+                VALUES (?,?,?,?,?,?)
+                """,
+                (iid, pid, tid, path, size, checksum)
+            )
+        db.execute("DROP TABLE image_v0")
+        db.commit()
+        for path in paths:
+            self.frames.unpin(path)
+
+    def _releaseFrames(self, db, paths) -> None:
+        """
+        Deletes frame files that no image row refers to anymore. A frame
+        another storeImage has put but not committed yet stays pinned.
+        """
+        def referenced(path):
+            return db.execute(
+                "SELECT 1 FROM image WHERE path = ? LIMIT 1", (path,)).fetchone() is not None
+
+        for path in set(paths):
+            self.frames.remove(path, referenced)
 
-    def execute(self):
-        self.cur = self._db.cursor()
-        
-        self._logger.info(f"Cursor was initialized inside the execute() method")
 
+    @_call("storeProposal")
     def storeProposal(self, targets: TYPES.TargetList) -> int:
         """
         Create a proposal in status 0 and its N targets;
         always commit on success, rollback on any exception.
         """
-        cur = self._db.cursor()
-        self._logger.info(f"Storing proposal with {len(targets)} targets")
+        db = self._pool.connection()
+        cur = db.cursor()
+        self._logger.info("Storing proposal with %d targets", len(targets))
         try:
 
             cur.execute(
@@ -92,88 +249,183 @@ class ProposalHandler(DATABASE_MODULE__POA.DataBase,
             )
             pid = cur.lastrowid
 
-            cur.executemany(
-                """
-                INSERT INTO target (proposal_id, tid, az, el, exposure_time)
-                VALUES (?,?,?,?,?)
-                """,
-                [
-                    (
-                        pid,
-                        t.tid,
-                        t.coordinates.az,
-                        t.coordinates.el,
-                        t.expTime
-                    )
-                    for t in targets
-                ]
-            )
+            cur.executemany(INSERT_TARGET_SQL, self._targetRows(pid, targets))
 
-            self._db.commit()
-            return pid
+            db.commit()
 
         except Exception as e:
-            self._db.rollback()
+            db.rollback()
             self._logger.error("Error with inserting proposal and targets")
             raise SYSTEMErrImpl.InvalidProposalStatusTransitionExImpl()
 
+        with self._statusLock:
+            self._status[pid] = STATUS_INITIAL_PROPOSAL
+        return pid
+
+    @_call("storeProposals")
+    def storeProposals(self, proposals) -> list:
+        """
+        Bulk version of storeProposal: creates one proposal per target list,
+        all in a single transaction. Returns the assigned pids in input
+        order; a target list with duplicate tids is skipped and gets
+        INVALID_PROPOSAL_ID instead of failing the whole batch.
+        """
+        self._logger.info("Storing %d proposals", len(proposals))
+        pids: list = []
+        for targets in proposals:
+            tids = [t.tid for t in targets]
+            pids.append(None if len(set(tids)) == len(tids) else INVALID_PROPOSAL_ID)
 
+        db = self._pool.connection()
+        try:
+            rows: list = []
+            for i, targets in enumerate(proposals):
+                if pids[i] == INVALID_PROPOSAL_ID:
+                    continue
+                pids[i] = db.execute(
+                    "INSERT INTO proposal(status) VALUES (?)",
+                    (STATUS_INITIAL_PROPOSAL,)
+                ).lastrowid
+                rows.extend(self._targetRows(pids[i], targets))
+
+            db.executemany(INSERT_TARGET_SQL, rows)
+            db.commit()
+
+        except Exception as e:
+            db.rollback()
+            self._logger.error("Error with inserting proposals and targets")
+            raise SYSTEMErrImpl.InvalidProposalStatusTransitionExImpl()
+
+        rejected = pids.count(INVALID_PROPOSAL_ID)
+        if rejected:
+            self._logger.warning(
+                "Rejected %d proposals with duplicate target ids", rejected)
+        with self._statusLock:
+            for pid in pids:
+                if pid != INVALID_PROPOSAL_ID:
+                    self._status[pid] = STATUS_INITIAL_PROPOSAL
+        return pids
+
+    @staticmethod
+    def _targetRows(pid: int, targets) -> list:
+        return [
+            (
+                pid,
+                t.tid,
+                t.coordinates.az,
+                t.coordinates.el,
+                t.expTime
+            )
+            for t in targets
+        ]
+
+    @_call("getProposalStatus")
     def getProposalStatus(self, pid: int) -> int:
-        self.cur = self._db.execute(
-            "SELECT status FROM proposal WHERE id=?", (pid,))
-        row = self.cur.fetchone()
-        return row[0] if row else STATUS_NO_SUCH_PROPOSAL
+        """Answered from the in-memory status map, without touching the database."""
+        return self._status.get(pid, STATUS_NO_SUCH_PROPOSAL)
 
+    @_call("removeProposal")
     def removeProposal(self, pid: int) -> None:
-        self._logger.info(f"Removing proposal {pid}")
-        self._db.execute("DELETE FROM proposal WHERE id=?", (pid,))
-        self._db.commit()
-
+        self._logger.info("Removing proposal %d", pid)
+        db = self._pool.connection()
+        paths = [row[0] for row in db.execute(
+            "SELECT path FROM image WHERE proposal_id=?", (pid,))]
+        db.execute("DELETE FROM proposal WHERE id=?", (pid,))
+        db.commit()
+        with self._statusLock:
+            self._status.pop(pid, None)
+        self._releaseFrames(db, paths)
+
+    @_call("storeImage")
     def storeImage(self, pid: int, tid: int, image: TYPES.ImageType) -> None:
         """
         Stores raw-image bytes for (proposal_id, target_id).
+        The bytes are encoded with the configured frame codec and go to the
+        FrameStore, the image row keeps their location and codec.
         Raises ImageAlreadyStoredEx on duplicate or FK error.
         """
-        self._logger.info(f"Storing image for proposal {pid} and target {tid} that looks like  {image} ")
-        self._logger.info(f"Image size is {len(image)} bytes and its type is {type(image)}")
-        try:
-            self.cur.execute(
+        self._imageLog.info("Storing image for proposal %d and target %d: %s",
+                            pid, tid, Payload(image))
+        codec = self.codec
+        path, _, checksum = self.frames.put(FrameCodec.encode(codec, image))
+
+        def insert(db):
+            db.execute(
                 """
-                INSERT INTO image (proposal_id, target_id, image_array)
-                VALUES (?,?,?)
+                INSERT INTO image (proposal_id, target_id, path, size, checksum, codec)
+                VALUES (?,?,?,?,?,?)
                 """,
-                (pid, tid, image)
+                (pid, tid, path, len(image), checksum, codec)
             )
-            self._db.commit()
+
+        try:
+            self._write(insert)
 
         except Exception as e:
-            self._db.rollback()
+            self.frames.unpin(path)
+            self._releaseFrames(self._pool.connection(), [path])
             raise SYSTEMErrImpl.ImageAlreadyStoredExImpl()
+        self.frames.unpin(path)
 
+    @_call("getProposalObservations")
     def getProposalObservations(self, pid: int) -> TYPES.ImageList:
         """
         Returns a TYPES.ImageList of raw-image bytes for a READY proposal.
         Raises ProposalNotYetReadyEx if status != STATUS_READY.
         """
+        img_list = list(self.iterProposalObservations(pid))
+        self._logger.info("Found %d images for proposal %d", len(img_list), pid)
+        return img_list
+
+    @_call("getProposalObservationsPage")
+    def getProposalObservationsPage(self, pid: int, offset: int,
+                                    count: int) -> TYPES.ImageList:
+        """
+        Returns at most count images of a READY proposal, starting with the
+        offset-th one (in storage order). An empty list means there are no
+        more images, and so does a count < 0. Raises ProposalNotYetReadyEx
+        if status != STATUS_READY.
+        """
+        if count < 0:
+            # LIMIT -1 would be "no limit": the whole proposal in one reply
+            self._logger.warning(
+                "Negative page size %d for proposal %d, returning no images", count, pid)
+            count = 0
+        return list(self.iterProposalObservations(pid, offset, count))
+
+    def iterProposalObservations(self, pid: int, offset: int = 0,
+                                 count: int = -1):
+        """
+        Yields the raw-image bytes of a READY proposal one frame at a time,
+        reading rows lazily from the cursor, so only the frame being
+        consumed is held in memory. count < 0 means all remaining frames.
+        Raises ProposalNotYetReadyEx if status != STATUS_READY.
+        """
         if self.getProposalStatus(pid) != STATUS_READY:
             raise SYSTEMErrImpl.ProposalNotYetReadyExImpl()
-
-        self.cur.execute(
-            "SELECT image_array FROM image WHERE proposal_id = ? ORDER BY id",
-            (pid,)
+        return self._iterFrames(pid, offset, count)
+
+    def _iterFrames(self, pid: int, offset: int, count: int):
+        cur = self._pool.connection().execute(
+            """
+            SELECT path, codec FROM image WHERE proposal_id = ?
+            ORDER BY id LIMIT ? OFFSET ?
+            """,
+            (pid, count, max(offset, 0))
         )
-        rows = self.cur.fetchall()
-        self._logger.info(f"Found {len(rows)} images for proposal {pid}")
-        self._logger.info(f"Rows look like {rows}")
-        img_list: list = []
-        for (blob,) in rows:
-            self._logger.info(f"Image blob size is {len(blob)} bytes")
-            img_list.append(blob)
-        
-        self._logger.info(f"Image list size is {len(img_list)}")
-        self._logger.info(f"Image list looks like {img_list}")
-        return img_list
-
+        for path, codec in cur:
+            # The stored frame is paged in from its memory map and decoded
+            # straight into the bytes object handed to the caller.
+            with self.frames.open(path) as frame:
+                try:
+                    image = FrameCodec.decode(codec, frame)
+                except ValueError as ex:
+                    self._logger.error("Cannot read image %s of proposal %d: %s",
+                                       path, pid, ex)
+                    raise
+            yield image
+
+    @_call("setProposalStatus")
     def setProposalStatus(self, pid: int, status: int) -> None:
         """
         Set the proposal status, allowing only:
@@ -183,83 +435,126 @@ class ProposalHandler(DATABASE_MODULE__POA.DataBase,
 
         Raises InvalidProposalStatusTransitionEx otherwise.
         """
-
-        self.cur.execute(
-            "SELECT status FROM proposal WHERE id = ?",
-            (pid,)
-        )
-        row = self.cur.fetchone()
-        if row is None:
+        with self._statusLock:
+            current = self._status.get(pid)
+        if current is None:
             raise SYSTEMErrImpl.InvalidProposalStatusTransitionExImpl(
                 f"No proposal with id={pid}"
             )
 
-        current = row[0]
-
         if not ((current == -1 and status == 0) or
                 (current == 0  and status == 1) or
                 (current == 1  and status == 2)):
             raise SYSTEMErrImpl.InvalidProposalStatusTransitionExImpl()
 
+        def update(db):
+            # Only move on from the status that was validated above, so two
+            # callers racing on the same proposal cannot both succeed.
+            cur = db.execute(
+                "UPDATE proposal SET status = ? WHERE id = ? AND status = ?",
+                (status, pid, current)
+            )
+            if cur.rowcount != 1:
+                raise SYSTEMErrImpl.InvalidProposalStatusTransitionExImpl()
+
+        self._write(update)
+        with self._statusLock:
+            # removeProposal may have dropped it since the update committed
+            if pid in self._status:
+                self._status[pid] = status
+        if status == STATUS_QUEUED_PROPOSAL:
+            self._warnIfNeverVisible(pid)
         self._logger.info(
-            f"The status of the proposal {pid} is changed from {current} to {status}"
-        )
-        self.cur.execute(
-            "UPDATE proposal SET status = ? WHERE id = ?",
-            (status, pid)
+            "The status of the proposal %d is changed from %d to %d",
+            pid, current, status
         )
-        self._db.commit()
 
+    @_call("getProposals")
     def getProposals(self) -> list:
         """
         Return a list of Proposal structs for all proposals in the queued state (status = 0).
         If none are queued, returns an empty list.
+
+        Proposals and their targets are loaded with a single joined query
+        ordered by (proposal, target), so the Proposal/Target structs are
+        built in one pass over the cursor.
         """
-        self._logger.info("Getting all proposals in the queued state")
-        
-        self.cur.execute(
-            "SELECT id, status FROM proposal WHERE status = ? ORDER BY id",
+        cur = self._pool.connection().execute(
+            """
+            SELECT p.id, p.status, t.id, t.az, t.el, t.exposure_time
+            FROM proposal AS p
+            LEFT JOIN target AS t ON t.proposal_id = p.id
+            WHERE p.status = ?
+            ORDER BY p.id, t.id
+            """,
             (STATUS_QUEUED_PROPOSAL,)
         )
+        proposals = self._proposalStructs(cur)
+        self._pollLog.info("Found %d proposals in the queued state", len(proposals))
+        return proposals
+
+    @_call("getVisibleProposals")
+    def getVisibleProposals(self) -> list:
+        """
+        Like getProposals, restricted to the proposals whose targets all
+        have an elevation between elevationLimit and the zenith. Targets
+        are fixed (az, el) pointings the telescope slews to, so this is a
+        plain filter on the stored elevations, in the same query.
+        """
+        cur = self._pool.connection().execute(
+            """
+            SELECT p.id, p.status, t.id, t.az, t.el, t.exposure_time
+            FROM proposal AS p
+            LEFT JOIN target AS t ON t.proposal_id = p.id
+            WHERE p.status = ? AND NOT EXISTS (
+                SELECT 1 FROM target AS o
+                WHERE o.proposal_id = p.id AND o.el NOT BETWEEN ? AND 90)
+            ORDER BY p.id, t.id
+            """,
+            (STATUS_QUEUED_PROPOSAL, self.elevationLimit)
+        )
+        proposals = self._proposalStructs(cur)
+        self._pollLog.info("Found %d visible proposals in the queued state", len(proposals))
+        return proposals
+
+    @staticmethod
+    def _proposalStructs(cur) -> list:
+        """Proposal structs from (pid, status, tid, az, el, exposure time) rows ordered by pid."""
         proposals: list = []
-        
-        for pid, status in self.cur.fetchall():
-            self._logger.info(f"Found queued proposal {pid}")
-            
-            self.cur.execute(
-                """
-                SELECT id, az, el, exposure_time
-                FROM target
-                WHERE proposal_id = ?
-                ORDER BY id
-                """,
-                (pid,)
-            )
-            targets = []
-            for tid, az, el, exp_time in self.cur.fetchall():
-                pos = TYPES.Position(az, el)
-                tgt = TYPES.Target(tid, pos, exp_time)
-                targets.append(tgt)
+        prop = None
 
-            prop = TYPES.Proposal(pid, targets, status)
-            self._logger.info(f"Proposal looks like {prop}")
-            proposals.append(prop)
-        self._logger.info(f"Proposal list looks like {proposals}")
+        for pid, status, tid, az, el, exp_time in cur:
+            if prop is None or prop.pid != pid:
+                prop = TYPES.Proposal(pid, [], status)
+                proposals.append(prop)
+            if tid is not None:
+                pos = TYPES.Position(az, el)
+                prop.targets.append(TYPES.Target(tid, pos, exp_time))
         return proposals
 
+    @_call("clean")
     def clean(self) -> None:
         """
         Clean all the proposals (and their targets/images via ON DELETE CASCADE).
         """
         self._logger.info("Cleaning all proposals from the database")
-        self.cur.execute("DELETE FROM proposal")
-        self._db.commit()
+        db = self._pool.connection()
+        db.execute("DELETE FROM proposal")
+        db.commit()
+        with self._statusLock:
+            self._status.clear()
+        self.frames.clear()
     
     def cleanUp(self):
         self._logger.info("Cleaning up the database")
         try:
+            if self._committer is not None:
+                self._committer.close()
             self.clean()
-            self._db.close()
+            self._pool.close()
         except:
             pass
+        if self._metrics is not None:
+            self._metrics.close()
+            self._metrics = None
         super().cleanUp()
@@ -0,0 +1,38 @@
+"""
+Configuration of the Python components from their CDB entries.
+
+Each component keeps a DEFAULT_CONFIG dict of its attributes (those of
+its xsd) and their values when missing, and reads them in one go:
+
+    config = Config.componentConfig(self, DEFAULT_CONFIG)
+
+Attributes are read as strings and converted to the type of their
+default, so the dict also documents the expected types.
+"""
+
+def readConfig(dao, defaults):
+    """
+    defaults with the values present in the CDB entry dao. Attributes are
+    read as strings and converted to the type of their default.
+    """
+    config = dict(defaults)
+    for key, default in defaults.items():
+        try:
+            value = dao.get_string(key)
+        except Exception:
+            continue
+        if isinstance(default, bool):
+            config[key] = value.strip().lower() in ("true", "1")
+        else:
+            config[key] = type(default)(value)
+    return config
+
+def componentConfig(component, defaults):
+    """readConfig() of the component's CDB entry, defaults if it has none."""
+    try:
+        # Imported here so that the module works without ACS
+        from Acspy.Util.ACSCorba import cdb
+        dao = cdb().get_DAO_Servant("alma/" + component.getName())
+    except Exception:
+        return dict(defaults)
+    return readConfig(dao, defaults)
@@ -0,0 +1,377 @@
+"""
+Latency histograms, counters and in-flight gauges for the Python
+components, reported as periodic log snapshots and as a Prometheus text
+format file (for node_exporter's textfile collector or any scraper).
+
+All metrics of a process live in one registry, so the components of a
+container share it. Modules create their metrics once, at import time:
+
+    REQUEST = Metrics.operation("stellarium_request", "Stellarium HTTP requests")
+
+    @REQUEST
+    def send(...): ...
+
+    with Metrics.operation("database_call", "...", operation="storeImage").time():
+        ...
+
+An operation is a <name>_seconds histogram, a <name>_in_flight gauge and
+a <name>_errors_total counter sharing the same labels.
+
+Nothing is recorded until a component starts reporting (start(), usually
+through fromComponent() with the CDB attributes in DEFAULT_CONFIG), and
+recording stops again when the last one stops. While disabled, the
+decorator calls straight through and time() returns a shared no-op
+context, so instrumented code pays about a global lookup per call.
+"""
+import bisect
+import functools
+import os
+import threading
+import time
+from pathlib import Path
+
+from AstroConfig import Config
+
+# Upper bounds (s) of the latency buckets: 50 us to ~52 s, doubling
+BUCKETS = tuple(50e-6 * 2**i for i in range(21))
+
+# Seconds between two reports
+INTERVAL = 60.0
+
+# Attributes read from a component's CDB entry (see AstroConfig.Config)
+DEFAULT_CONFIG = {
+    "metrics":         False,   # record and report metrics
+    "metricsInterval": INTERVAL,
+    "metricsFile":     "",      # Prometheus text file, none if empty
+}
+
+_enabled = False
+
+def enabled():
+    return _enabled
+
+class Counter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        if _enabled:
+            self._add(amount)
+
+    def _add(self, amount):
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name, labels):
+        return [(name, labels, self.value)]
+
+    def summary(self):
+        return f"{self.value}" if self.value else None
+
+class Gauge(Counter):
+    def dec(self, amount=1):
+        if _enabled:
+            self._add(-amount)
+
+    def set(self, value):
+        if _enabled:
+            self.value = value
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.bounds = tuple(buckets)
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(self.bounds) + 1)    # last one: +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        if _enabled:
+            self._observe(value)
+
+    def _observe(self, value):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def quantile(self, q):
+        """Estimate of the q quantile, interpolated within its bucket."""
+        with self._lock:
+            counts = list(self.counts)
+            count = self.count
+            top = self.max
+        if count == 0:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for i, n in enumerate(counts):
+            if n and seen + n >= rank:
+                low = self.bounds[i - 1] if i > 0 else 0.0
+                high = self.bounds[i] if i < len(self.bounds) else top
+                return min(low + (high - low) * (rank - seen) / n, top)
+            seen += n
+        return top
+
+    def samples(self, name, labels):
+        with self._lock:
+            counts = list(self.counts)
+            count, total = self.count, self.sum
+        samples = []
+        cumulative = 0
+        for bound, n in zip(self.bounds + (float("inf"),), counts):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else f"{bound:.6g}"
+            samples.append((f"{name}_bucket", labels + (("le", le),), cumulative))
+        samples.append((f"{name}_sum", labels, total))
+        samples.append((f"{name}_count", labels, count))
+        return samples
+
+    def summary(self):
+        if self.count == 0:
+            return None
+        return (f"{self.count} calls, p50 {self.quantile(0.5) * 1000:.2f} ms, "
+                f"p99 {self.quantile(0.99) * 1000:.2f} ms, max {self.max * 1000:.2f} ms")
+
+class _Family:
+    def __init__(self, kind, help, factory):
+        self.kind = kind
+        self.help = help
+        self.factory = factory
+        self.children = {}            # labels -> metric
+
+_families = {}                        # name -> _Family
+_registryLock = threading.Lock()
+
+def _metric(kind, name, help, factory, labels):
+    key = tuple(sorted(labels.items()))
+    family = _families.get(name)
+    if family is not None:
+        metric = family.children.get(key)
+        if metric is not None:
+            return metric
+    with _registryLock:
+        family = _families.setdefault(name, _Family(kind, help, factory))
+        if family.kind != kind:
+            raise ValueError(f"Metric {name} is a {family.kind}, not a {kind}")
+        return family.children.setdefault(key, family.factory())
+
+def counter(name, help, **labels):
+    return _metric("counter", name, help, Counter, labels)
+
+def gauge(name, help, **labels):
+    return _metric("gauge", name, help, Gauge, labels)
+
+def histogram(name, help, buckets=BUCKETS, **labels):
+    return _metric("histogram", name, help, lambda: Histogram(buckets), labels)
+
+class _Timer:
+    __slots__ = ("operation", "start")
+
+    def __init__(self, operation):
+        self.operation = operation
+
+    def __enter__(self):
+        self.operation.inFlight._add(1)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        # Recorded even if reporting stopped meanwhile, to keep the gauge balanced
+        self.operation.seconds._observe(time.perf_counter() - self.start)
+        self.operation.inFlight._add(-1)
+        if kind is not None:
+            self.operation.errors._add(1)
+        return False
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class Operation:
+    """Latency, calls in flight and failures of one kind of call."""
+    def __init__(self, name, help, **labels):
+        self.seconds = histogram(f"{name}_seconds", f"{help}: latency", **labels)
+        self.inFlight = gauge(f"{name}_in_flight", f"{help}: calls in progress", **labels)
+        self.errors = counter(f"{name}_errors_total", f"{help}: calls that raised", **labels)
+
+    def time(self):
+        """Context manager timing its body; a no-op while disabled."""
+        return _Timer(self) if _enabled else _NULL_TIMER
+
+    def __call__(self, function):
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _Timer(self):
+                return function(*args, **kwargs)
+        return timed
+
+_operations = {}
+
+def operation(name, help, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    op = _operations.get(key)
+    if op is None:
+        # Racing creators get the same underlying metrics anyway
+        op = _operations.setdefault(key, Operation(name, help, **labels))
+    return op
+
+def componentCall(component, name):
+    """Operation timing the calls of operation name of a component class."""
+    return operation("component_call", "Component operation calls",
+                     component=component, operation=name)
+
+# Export
+def _labels(labels):
+    if not labels:
+        return ""
+    values = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+                      for k, v in labels)
+    return "{" + values + "}"
+
+def prometheus():
+    """All metrics in the Prometheus text exposition format."""
+    with _registryLock:
+        families = sorted((name, family, list(family.children.items()))
+                          for name, family in _families.items())
+    lines = []
+    for name, family, children in families:
+        lines.append(f"# HELP {name} {family.help}")
+        lines.append(f"# TYPE {name} {family.kind}")
+        for labels, metric in children:
+            for sample, sampleLabels, value in metric.samples(name, labels):
+                lines.append(f"{sample}{_labels(sampleLabels)} {value}")
+    return "\n".join(lines) + "\n"
+
+def snapshot():
+    """One line per metric with activity, for the logs."""
+    with _registryLock:
+        families = sorted((name, list(family.children.items()))
+                          for name, family in _families.items())
+    lines = []
+    for name, children in families:
+        for labels, metric in children:
+            summary = metric.summary()
+            if summary is not None:
+                lines.append(f"{name}{_labels(labels)}: {summary}")
+    return lines
+
+def write(path):
+    """Writes prometheus() to path atomically, so scrapers never see half a file."""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(prometheus())
+    os.replace(tmp, path)
+
+# Reporting
+class _Reporter:
+    """Process-wide reporting thread shared by every started Handle."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.handles = []
+        self.stop = threading.Event()
+        self.thread = None
+
+    def interval(self):
+        with self.lock:
+            return min((h.interval for h in self.handles), default=INTERVAL)
+
+    def run(self, stop):
+        while not stop.wait(self.interval()):
+            self.report()
+
+    def report(self, handles=None, log=True):
+        if handles is None:
+            with self.lock:
+                handles = list(self.handles)
+        if not handles:
+            return
+        logger = handles[0].logger
+        if log:
+            for line in snapshot():
+                logger.info(f"Metrics: {line}")
+        for path in {h.path for h in handles if h.path}:
+            try:
+                write(path)
+            except OSError as ex:
+                logger.error(f"Could not write metrics to {path}: {ex}")
+
+    def add(self, handle):
+        global _enabled
+        with self.lock:
+            self.handles.append(handle)
+            _enabled = True
+            if self.thread is None:
+                # A fresh event: a thread still exiting keeps its own, set one
+                self.stop = threading.Event()
+                self.thread = threading.Thread(target=self.run, args=(self.stop,),
+                                               name="metrics", daemon=True)
+                self.thread.start()
+
+    def remove(self, handle):
+        global _enabled
+        with self.lock:
+            self.handles.remove(handle)
+            last = not self.handles
+            if last:
+                _enabled = False
+                thread, self.thread = self.thread, None
+                self.stop.set()
+        if last:
+            thread.join()
+        # Final values go to the handle's file, and to the log once, with the last handle
+        self.report([handle], log=last)
+
+_reporter = _Reporter()
+
+class Handle:
+    """Keeps metrics recorded and reported until closed."""
+    def __init__(self, logger, interval, path):
+        self.logger = logger
+        self.interval = interval
+        self.path = path
+        self.closed = False
+
+    def close(self):
+        """Reports one last time; recording stops with the last open handle."""
+        if not self.closed:
+            self.closed = True
+            _reporter.remove(self)
+
+def start(logger, interval=INTERVAL, path=None):
+    """
+    Enables recording and reports every interval seconds to logger and,
+    if path is given, to a Prometheus text file. With several handles the
+    shortest interval wins and every file is written.
+    """
+    handle = Handle(logger, interval, path)
+    _reporter.add(handle)
+    return handle
+
+def fromComponent(component):
+    """fromConfig() with the component's CDB attributes and logger."""
+    return fromConfig(Config.componentConfig(component, DEFAULT_CONFIG),
+                      component.getLogger())
+
+def fromConfig(config, logger):
+    """start() with the given configuration, None if metrics are off."""
+    if not config["metrics"]:
+        return None
+    path = config["metricsFile"] or None
+    logger.info(f"Metrics enabled: report every {config['metricsInterval']} s"
+                + (f" to {path}" if path else ""))
+    return start(logger, config["metricsInterval"], path)
@@ -0,0 +1,47 @@
+
+#*******************************************************************************
+# PPPPPPPP
+#
+# "@(#) $Id$"
+#
+# Makefile of ........
+#
+# who       when      what
+# --------  --------  ----------------------------------------------
+# acsuser  08/05/25  created
+#
+
+# ALMA - Atacama Large Millimeter Array
+# Copyright (c) ESO - European Southern Observatory, 2014
+# (in the framework of the ALMA collaboration).
+# All rights reserved.
+# 
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# 
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307  USA
+#*******************************************************************************
+
+#*******************************************************************************
+# This Makefile follows ALMA/ACS Standards (see Makefile(5) for more).
+#*******************************************************************************
+# REMARKS
+#    None
+#------------------------------------------------------------------------
+
+MAKEID:=acs
+MAKEDIR:=$(patsubst %/,%,$(dir $(abspath $(lastword $(MAKEFILE_LIST)))))
+MOD_PATH:=$(patsubst %/,%,$(abspath $(MAKEDIR)/..))
+MOD_NAME:=$(if $(filter ws,$(notdir $(MOD_PATH))),$(notdir $(patsubst %/,%,$(dir $(MOD_PATH)))),$(notdir $(MOD_PATH)))
+MAKEDIRTMP:=$(if $(wildcard $(MAKEDIR)/../include/InclusiveMakefile.mk),$(abspath $(MAKEDIR)/..),$(shell searchFile include/InclusiveMakefile.mk))/include
+$(if $(filter #error#%,$(MAKEDIRTMP)),$(error "InclusiveMakefile.mk was not found."),$(eval include $(MAKEDIRTMP)/InclusiveMakefile.mk))
+$(eval $(call genModule,$(MOD_NAME),$(MOD_PATH)))
@@ -0,0 +1,89 @@
+"""
+Observation order minimizing telescope travel.
+
+Positions are (az, el) tuples in degrees. The cost of a slew is the
+travel of the slower axis, max(|d_el|, |d_az|), with the azimuth
+difference taken the short way round (both axes move at once).
+"""
+
+def delta_azm(cmd, cur):
+    """Shortest signed azimuth difference cmd - cur, in (-180, 180]."""
+    delta = (cmd % 360 - cur % 360) % 360
+    return delta - 360 if delta > 180 else delta
+
+def slew_cost(a, b):
+    return max(abs(b[1] - a[1]), abs(delta_azm(b[0], a[0])))
+
+def route_cost(start, points, order):
+    """Total slew cost of visiting points[order] from start."""
+    cost = 0.0
+    here = start
+    for i in order:
+        cost += slew_cost(here, points[i])
+        here = points[i]
+    return cost
+
+def nearest_neighbour(start, points):
+    """Greedy order: always go to the closest point not visited yet."""
+    left = list(range(len(points)))
+    order = []
+    here = start
+    while left:
+        best = min(left, key=lambda i: slew_cost(here, points[i]))
+        left.remove(best)
+        order.append(best)
+        here = points[best]
+    return order
+
+def two_opt(start, points, order, max_passes=50):
+    """
+    Improves an open route from start by reversing segments while that
+    shortens it (2-opt). The end of the route is free.
+    """
+    path = [start] + [points[i] for i in order]
+    order = list(order)
+    n = len(path)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n - 1):
+            for j in range(i + 1, n):
+                # Reversing path[i..j] replaces the edges (i-1, i) and (j, j+1)
+                before = slew_cost(path[i - 1], path[i])
+                after = slew_cost(path[i - 1], path[j])
+                if j + 1 < n:
+                    before += slew_cost(path[j], path[j + 1])
+                    after += slew_cost(path[i], path[j + 1])
+                if after < before - 1e-9:
+                    path[i:j + 1] = path[i:j + 1][::-1]
+                    order[i - 1:j] = order[i - 1:j][::-1]
+                    improved = True
+        if not improved:
+            break
+    return order
+
+def plan_route(start, points):
+    """Order of points (indices) to visit from start: nearest neighbour, then 2-opt."""
+    if len(points) < 2:
+        return list(range(len(points)))
+    return two_opt(start, points, nearest_neighbour(start, points))
+
+def target_positions(proposal):
+    return [(t.coordinates.az, t.coordinates.el) for t in proposal.targets]
+
+def next_proposal(start, proposals):
+    """
+    Picks the proposal to observe next from start, the one with the target
+    closest to it, and plans the order of its targets.
+    Returns (proposal, target order, cost) or None if there are none.
+    """
+    best = None
+    for proposal in proposals:
+        points = target_positions(proposal)
+        distance = min((slew_cost(start, p) for p in points), default=0.0)
+        if best is None or distance < best[0]:
+            best = (distance, proposal, points)
+    if best is None:
+        return None
+    _, proposal, points = best
+    order = plan_route(start, points)
+    return proposal, order, route_cost(start, points, order)
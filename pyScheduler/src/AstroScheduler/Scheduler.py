@@ -0,0 +1,215 @@
+import threading
+import time
+import SYSTEMErrImpl
+import SCHEDULER_MODULE__POA
+from Acspy.Servants.ACSComponent import ACSComponent
+from Acspy.Servants.ContainerServices import ContainerServices
+from Acspy.Servants.ComponentLifecycle import ComponentLifecycle
+from AstroConfig import Config
+from AstroMetrics import Metrics
+from AstroScheduler import Route
+
+STATUS_RUNNING = 1
+STATUS_READY = 2
+
+# Seconds to wait before asking the database again when nothing is queued
+POLL_INTERVAL = 5.0
+
+# Component attributes (CDB) and their values when missing
+DEFAULT_CONFIG = {
+    "database":  "DATABASE",    # names of the components used
+    "telescope": "TELESCOPE",
+    "camera":    "CAMERA",      # optional, only told what to prefetch
+    **Metrics.DEFAULT_CONFIG,   # metrics, metricsInterval, metricsFile
+}
+
+DECISION = Metrics.operation("scheduler_decision",
+                             "Choices of the next proposal, queue query included")
+OBSERVE = Metrics.operation("scheduler_observe", "Telescope observe calls")
+STORE = Metrics.operation("scheduler_store", "Database storeImage calls")
+# 0.1 s to about 55 min, doubling: a proposal takes its exposures and slews
+PROPOSAL_BUCKETS = tuple(0.1 * 2**i for i in range(16))
+PROPOSAL_OBSERVE = Metrics.histogram(
+    "scheduler_proposal_observe_seconds",
+    "Time spent in observe calls per proposal", PROPOSAL_BUCKETS)
+PROPOSAL_STORE = Metrics.histogram(
+    "scheduler_proposal_store_seconds",
+    "Time spent in storeImage calls per proposal", PROPOSAL_BUCKETS)
+
+class Scheduler(SCHEDULER_MODULE__POA.Scheduler,
+                ACSComponent,
+                ContainerServices,
+                ComponentLifecycle):
+    """
+    Observes the queued proposals in an order that keeps telescope slews
+    short.
+
+    A worker thread repeatedly takes the queued proposals whose targets
+    are all above the elevation limit from the database, picks the one
+    with a target closest to where the telescope is, plans the order of
+    its targets (nearest neighbour + 2-opt, see Route) and observes them,
+    moving the proposal from queued to running to ready. New proposals
+    are taken into account at every decision. While a target is observed
+    the CAMERA, if there is one, is told the next one so it can fetch its
+    image during the slew. The names of the three components come from
+    the CDB (see AstroScheduler.xsd).
+    """
+
+    def __init__(self):
+        ACSComponent.__init__(self)
+        ContainerServices.__init__(self)
+        self._logger = self.getLogger()
+        self.database = None
+        self.telescope = None
+        self.camera = None
+        self._metrics = None
+        self._position = (0.0, 0.0)       # (az, el) of the last target
+        self._current = None              # pid under execution
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def initialize(self):
+        config = Config.componentConfig(self, DEFAULT_CONFIG)
+        self._metrics = Metrics.fromConfig(config, self._logger)
+        self.database = self.getComponent(config["database"])
+        self.telescope = self.getComponent(config["telescope"])
+        try:
+            position = self.telescope.getCurrentPosition()
+            self._position = (position.az, position.el)
+        except Exception as ex:
+            self._logger.warning(f"Could not read the telescope position: {ex}")
+        try:
+            self.camera = self.getComponent(config["camera"])
+        except Exception as ex:
+            # Only used for prefetching
+            self._logger.info(f"No camera to prefetch frames from: {ex}")
+
+    def cleanUp(self):
+        self._halt()
+        for component in (self.database, self.telescope, self.camera):
+            if component is not None:
+                self.releaseComponent(component._get_name())
+        self.database = None
+        self.telescope = None
+        self.camera = None
+        self._closeMetrics()
+
+    def aboutToAbort(self):
+        self._stop.set()
+        self.database = None
+        self.telescope = None
+        self.camera = None
+        self._closeMetrics()
+
+    def _closeMetrics(self):
+        if self._metrics is not None:
+            self._metrics.close()
+            self._metrics = None
+
+    # Scheduler interface
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                raise SYSTEMErrImpl.SchedulerAlreadyRunningExImpl()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run,
+                                            name="scheduler",
+                                            daemon=True)
+            self._thread.start()
+        self._logger.info("Scheduler started")
+
+    def stop(self):
+        with self._lock:
+            if self._thread is None:
+                raise SYSTEMErrImpl.SchedulerAlreadyStoppedExImpl()
+        # Returns once the proposal being observed is finished
+        self._halt()
+        self._logger.info("Scheduler stopped")
+
+    def proposalUnderExecution(self):
+        pid = self._current
+        if pid is None:
+            raise SYSTEMErrImpl.NoProposalExecutingExImpl()
+        return pid
+
+    # Worker
+    def _halt(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        self._stop.set()
+        if thread is not None:
+            thread.join()
+
+    @DECISION
+    def _decide(self):
+        """(proposal, order, cost) to observe next, None if nothing is visible."""
+        # Only proposals whose targets are all above the elevation limit
+        proposals = self.database.getVisibleProposals()
+        return Route.next_proposal(self._position, proposals)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                choice = self._decide()
+            except Exception as ex:
+                self._logger.error(f"Could not choose the next proposal: {ex}")
+                self._stop.wait(POLL_INTERVAL)
+                continue
+
+            if choice is None:
+                self._stop.wait(POLL_INTERVAL)
+                continue
+            proposal, order, cost = choice
+            self._logger.info(
+                f"Next proposal {proposal.pid}: {len(order)} targets, "
+                f"{cost:.1f} deg of slew")
+            self._observe(proposal, order)
+
+    def _observe(self, proposal, order):
+        """Observes the targets of proposal in the given order; never stops halfway."""
+        pid = proposal.pid
+        try:
+            self.database.setProposalStatus(pid, STATUS_RUNNING)
+        except Exception as ex:
+            # Taken or removed by someone else in the meantime
+            self._logger.warning(f"Could not start proposal {pid}: {ex}")
+            return
+
+        self._current = pid
+        observing = storing = 0.0
+        try:
+            targets = [proposal.targets[index] for index in order]
+            for n, target in enumerate(targets):
+                self._prefetch(targets[n:n + 2])
+                try:
+                    start = time.perf_counter()
+                    with OBSERVE.time():
+                        image = self.telescope.observe(target.coordinates, target.expTime)
+                    observed = time.perf_counter()
+                    observing += observed - start
+                    self._position = (target.coordinates.az, target.coordinates.el)
+                    with STORE.time():
+                        self.database.storeImage(pid, target.tid, image)
+                    storing += time.perf_counter() - observed
+                except Exception as ex:
+                    self._logger.error(
+                        f"Proposal {pid}: target {target.tid} failed: {ex}")
+            PROPOSAL_OBSERVE.observe(observing)
+            PROPOSAL_STORE.observe(storing)
+            self.database.setProposalStatus(pid, STATUS_READY)
+            self._logger.info(f"Proposal {pid} is ready: {observing:.1f} s observing, "
+                              f"{storing:.2f} s storing")
+        except Exception as ex:
+            self._logger.error(f"Could not finish proposal {pid}: {ex}")
+        finally:
+            self._current = None
+
+    def _prefetch(self, targets):
+        """Tells the camera which targets come next; only a hint."""
+        if self.camera is None:
+            return
+        try:
+            self.camera.prefetch(targets)
+        except Exception as ex:
+            self._logger.warning(f"Could not prefetch frames: {ex}")
@@ -0,0 +1,255 @@
+"""
+Append-only, write-once archive of observations in fixed-size segments.
+
+A segment file holds records back to back:
+
+    header   magic "OBS1", pid, image count, target count, body length,
+             crc32 of the body
+    body     targets (tid, az, el, expTime) * target count
+             image lengths * image count
+             images
+
+When the next record would not fit in SEGMENT_SIZE the segment is sealed
+by appending a footer with the (pid, offset) of all its records and a
+trailer (magic "SEGF", count, footer offset), and a new segment is
+started. At startup the index is rebuilt from the footers alone; only the
+last, unsealed segment is scanned, and anything after its last complete
+record (an interrupted write) is cut off. Reads go through read-only
+mmaps of the segments.
+"""
+import mmap
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+
+HEADER = struct.Struct("<4sqIIQI")
+TARGET = struct.Struct("<iddi")
+LENGTH = struct.Struct("<Q")
+ENTRY = struct.Struct("<qQ")
+TRAILER = struct.Struct("<4sIQ")
+
+RECORD_MAGIC = b"OBS1"
+FOOTER_MAGIC = b"SEGF"
+
+SEGMENT_SIZE = 256 * 1024**2
+
+class DuplicateObservation(Exception):
+    """The archive is write-once: a pid can only be stored once."""
+
+class Archive:
+    def __init__(self, directory, segment_size=SEGMENT_SIZE, fsync=True):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_size = segment_size
+        self.fsync = fsync
+        self._index = {}            # pid -> (segment number, offset)
+        self._maps = {}             # segment number -> (mmap, size)
+        self._lock = threading.Lock()        # writers
+        self._mapLock = threading.Lock()
+        self._file = None           # active segment, opened for appending
+        self._active = None
+        self._activePids = []
+        self._load()
+
+    # Segments
+    def _path(self, number):
+        return self.directory / f"segment-{number:06d}.seg"
+
+    def _segments(self):
+        return sorted(int(p.stem.split("-")[1]) for p in self.directory.glob("segment-*.seg"))
+
+    def _load(self):
+        segments = self._segments()
+        for number in segments:
+            if not self._loadFooter(number):
+                if number != segments[-1]:
+                    # A crash while sealing: recover it and seal it properly
+                    self._scan(number)
+                    self._open(number)
+                    self._seal()
+                else:
+                    self._scan(number)
+        if segments and self._active is None:
+            last = segments[-1]
+            if not self._sealed(last):
+                self._open(last)
+
+    def _sealed(self, number):
+        path = self._path(number)
+        size = path.stat().st_size
+        if size < TRAILER.size:
+            return False
+        with open(path, "rb") as f:
+            f.seek(size - TRAILER.size)
+            magic, _, _ = TRAILER.unpack(f.read(TRAILER.size))
+        return magic == FOOTER_MAGIC
+
+    def _loadFooter(self, number):
+        """Indexes a sealed segment from its footer; False if it has none."""
+        path = self._path(number)
+        size = path.stat().st_size
+        if size < TRAILER.size:
+            return False
+        with open(path, "rb") as f:
+            f.seek(size - TRAILER.size)
+            magic, count, offset = TRAILER.unpack(f.read(TRAILER.size))
+            if magic != FOOTER_MAGIC or offset + count * ENTRY.size + TRAILER.size != size:
+                return False
+            f.seek(offset)
+            entries = f.read(count * ENTRY.size)
+        for pid, record in ENTRY.iter_unpack(entries):
+            self._index[pid] = (number, record)
+        return True
+
+    def _scan(self, number):
+        """Indexes an unsealed segment record by record, cutting off a torn tail."""
+        path = self._path(number)
+        offset = 0
+        with open(path, "r+b") as f:
+            size = os.fstat(f.fileno()).st_size
+            while offset + HEADER.size <= size:
+                f.seek(offset)
+                magic, pid, _, _, length, crc = HEADER.unpack(f.read(HEADER.size))
+                end = offset + HEADER.size + length
+                if magic != RECORD_MAGIC or end > size:
+                    break
+                if zlib.crc32(f.read(length)) != crc:
+                    break
+                self._index[pid] = (number, offset)
+                offset = end
+            if offset != size:
+                f.truncate(offset)
+
+    def _open(self, number):
+        self._file = open(self._path(number), "ab")
+        self._active = number
+        self._activePids = [pid for pid, (segment, _) in self._index.items()
+                            if segment == number]
+
+    def _seal(self):
+        """Writes the footer of the active segment and closes it."""
+        entries = b"".join(ENTRY.pack(pid, self._index[pid][1])
+                           for pid in self._activePids)
+        offset = self._file.tell()
+        self._file.write(entries)
+        self._file.write(TRAILER.pack(FOOTER_MAGIC, len(entries) // ENTRY.size, offset))
+        self._flush()
+        self._file.close()
+        self._file = None
+        self._active = None
+        self._activePids = []
+
+    def _flush(self):
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    # Records
+    @staticmethod
+    def _encode(pid, targets, images):
+        parts = [TARGET.pack(*target) for target in targets]
+        parts.extend(LENGTH.pack(len(image)) for image in images)
+        parts.extend(images)
+        body = b"".join(parts)
+        header = HEADER.pack(RECORD_MAGIC, pid, len(images), len(targets),
+                             len(body), zlib.crc32(body))
+        return header + body
+
+    def store(self, pid, targets, images):
+        """
+        Appends an observation: targets as (tid, az, el, expTime) tuples
+        and the images as bytes. Raises DuplicateObservation if pid is
+        already archived.
+        """
+        record = self._encode(pid, targets, images)
+        with self._lock:
+            if pid in self._index:
+                raise DuplicateObservation(pid)
+            if self._file is not None and self._file.tell() > 0 and \
+                    self._file.tell() + len(record) + TRAILER.size + \
+                    ENTRY.size * (len(self._activePids) + 1) > self.segment_size:
+                self._seal()
+            if self._file is None:
+                segments = self._segments()
+                self._open(segments[-1] + 1 if segments else 1)
+            offset = self._file.tell()
+            self._file.write(record)
+            self._flush()
+            self._index[pid] = (self._active, offset)
+            self._activePids.append(pid)
+
+    def _map(self, number, end):
+        """Read-only mmap of a segment covering at least end bytes."""
+        with self._mapLock:
+            mapped = self._maps.get(number)
+            if mapped is None or mapped[1] < end:
+                # The active segment grew: map it again. The old map is not
+                # closed, a reader may still be slicing it.
+                with open(self._path(number), "rb") as f:
+                    size = os.fstat(f.fileno()).st_size
+                    mapped = (mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ), size)
+                self._maps[number] = mapped
+            return mapped[0]
+
+    def _record(self, pid):
+        """(mmap, header fields, body offset) of pid's record, or None."""
+        location = self._index.get(pid)
+        if location is None:
+            return None
+        number, offset = location
+        view = self._map(number, offset + HEADER.size)
+        fields = HEADER.unpack_from(view, offset)
+        view = self._map(number, offset + HEADER.size + fields[4])
+        return view, fields, offset + HEADER.size
+
+    def targets(self, pid):
+        """[(tid, az, el, expTime)] of an archived observation, or None."""
+        found = self._record(pid)
+        if found is None:
+            return None
+        view, (_, _, _, n_targets, _, _), body = found
+        return [TARGET.unpack_from(view, body + i * TARGET.size) for i in range(n_targets)]
+
+    def images(self, pid):
+        """Images of an archived observation as bytes, or None if unknown."""
+        found = self._record(pid)
+        if found is None:
+            return None
+        view, (_, _, n_images, n_targets, _, _), body = found
+        position = body + n_targets * TARGET.size
+        lengths = [LENGTH.unpack_from(view, position + i * LENGTH.size)[0]
+                   for i in range(n_images)]
+        position += n_images * LENGTH.size
+        images = []
+        for length in lengths:
+            images.append(view[position:position + length])
+            position += length
+        return images
+
+    def __contains__(self, pid):
+        return pid in self._index
+
+    def pids(self):
+        return list(self._index)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._active = None
+                self._activePids = []
+        with self._mapLock:
+            for view, _ in self._maps.values():
+                view.close()
+            self._maps.clear()
+
+    def clear(self):
+        """Deletes every segment."""
+        self.close()
+        with self._lock:
+            for number in self._segments():
+                self._path(number).unlink()
+            self._index.clear()
@@ -0,0 +1,98 @@
+import threading
+from pathlib import Path
+import STORAGE_MODULE__POA
+from Acspy.Servants.ACSComponent import ACSComponent
+from Acspy.Servants.ContainerServices import ContainerServices
+from Acspy.Servants.ComponentLifecycle import ComponentLifecycle
+from AstroConfig import Config
+from AstroStorage.Archive import Archive, DuplicateObservation, SEGMENT_SIZE
+
+
+ARCHIVE_DIR = Path(__file__).resolve().parent / "archive"
+
+# Component attributes (CDB) and their values when missing
+DEFAULT_CONFIG = {
+    "archiveDir":  "",            # directory of the segments, ARCHIVE_DIR if empty
+    "segmentSize": SEGMENT_SIZE,  # bytes per segment file
+    "fsync":       True,          # fsync every stored observation
+}
+
+class Storage(STORAGE_MODULE__POA.Storage,
+              ACSComponent,
+              ContainerServices,
+              ComponentLifecycle):
+    """
+    Write-once, read-many archive of completed observations, kept in an
+    append-only segmented Archive: storing is a sequential write, reading
+    an index lookup and an mmap slice per image.
+    """
+
+    def __init__(self):
+        ACSComponent.__init__(self)
+        ContainerServices.__init__(self)
+        self._logger = self.getLogger()
+        self.archive = None
+        self._idLock = threading.Lock()
+        self._nextId = 1
+
+    def initialize(self):
+        config = Config.componentConfig(self, DEFAULT_CONFIG)
+        directory = Path(config["archiveDir"]) if config["archiveDir"] else ARCHIVE_DIR
+        self.archive = Archive(directory, segment_size=config["segmentSize"],
+                               fsync=config["fsync"])
+        self._nextId = max(self.archive.pids(), default=0) + 1
+        self._logger.info(
+            f"Archive at {directory} holds {len(self.archive.pids())} observations")
+
+    def cleanUp(self):
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None
+        super().cleanUp()
+
+    def getNextValidId(self) -> int:
+        """
+        Returns an id not used by any archived observation nor handed out before.
+        """
+        with self._idLock:
+            pid = self._nextId
+            self._nextId += 1
+        return pid
+
+    def storeObservation(self, prop, images) -> None:
+        """
+        Archives a completed proposal with one image per target. An
+        observation can only be stored once.
+        """
+        if len(images) != len(prop.targets):
+            self._logger.error(
+                f"Proposal {prop.pid} has {len(prop.targets)} targets but "
+                f"{len(images)} images, not archived")
+            return
+        targets = [(t.tid, t.coordinates.az, t.coordinates.el, t.expTime)
+                   for t in prop.targets]
+        try:
+            self.archive.store(prop.pid, targets, images)
+        except DuplicateObservation:
+            self._logger.error(f"Proposal {prop.pid} is already archived")
+            return
+        with self._idLock:
+            self._nextId = max(self._nextId, prop.pid + 1)
+        self._logger.info(f"Archived proposal {prop.pid} with {len(images)} images")
+
+    def clearAllData(self) -> None:
+        self._logger.info("Wiping the archive")
+        self.archive.clear()
+        with self._idLock:
+            self._nextId = 1
+
+    def getObservation(self, pid) -> list:
+        """
+        Returns the images of an archived proposal, an empty list if there
+        is none.
+        """
+        images = self.archive.images(pid)
+        if images is None:
+            self._logger.warning(f"Proposal {pid} is not archived")
+            return []
+        return images